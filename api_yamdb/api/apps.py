@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from api_yamdb.db import check_connections, release_connections
+
+        from . import signals  # noqa: F401
+
+        # После close_old_connections Django: проверяются только
+        # соединения, оставшиеся открытыми.
+        request_started.connect(check_connections)
+        request_finished.connect(release_connections)
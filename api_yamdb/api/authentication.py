@@ -0,0 +1,145 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import get_shared_cache
+from .timing import timed
+
+
+def user_version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def get_user_version(user_id):
+    """Версия пользователя в общем для воркеров хранилище."""
+    return get_shared_cache().get(user_version_key(user_id))
+
+
+def bump_user_version(user_id):
+    """Делает записи пользователя в кешах всех воркеров устаревшими.
+    Версия хранится дольше записей кеша, после ее вытеснения записи
+    тоже не совпадают по версии."""
+    get_shared_cache().set(
+        user_version_key(user_id), uuid.uuid4().hex,
+        settings.AUTH_USER_CACHE_TTL * 2
+    )
+
+
+def is_privileged(user):
+    return user.is_superuser or user.is_admin() or user.is_moderator()
+
+
+class UserCache:
+    """LRU кеш пользователей в памяти процесса с временем жизни записей.
+
+    Запись хранится с версией пользователя из общего хранилища
+    и выдается, только пока версия не изменилась: сохранение
+    и удаление пользователя в любом воркере меняют версию
+    (api/signals.py).
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, user_id, version=None):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic() and (
+                entry[2] == version
+            ):
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id, user, version=None):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.entries[user_id] = (
+                time.monotonic() + self.ttl, user, version
+            )
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self.entries),
+            }
+
+
+user_cache = UserCache(
+    settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL
+)
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """JWT аутентификация с замером времени для Server-Timing.
+
+    Пользователь берется из user_cache, без запроса к базе на каждый
+    запрос. Неактивные пользователи не кешируются: для них
+    simplejwt выбрасывает AuthenticationFailed. Администраторы
+    и модераторы тоже читаются из базы на каждый запрос: изменение
+    роли или is_active через QuerySet.update() не отправляет сигналов,
+    и права не должны сохраняться до истечения записи.
+    """
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                'Token contained no recognizable user identification'
+            )
+        version = get_user_version(user_id)
+        user = user_cache.get(user_id, version)
+        if user is None:
+            user = super().get_user(validated_token)
+            if not is_privileged(user):
+                user_cache.set(user_id, user, version)
+        # Каждый запрос получает свою копию: изменения request.user
+        # (например, в /users/me/) не должны попадать в кеш.
+        request_user = copy.copy(user)
+        request_user._state = copy.copy(user._state)
+        return request_user
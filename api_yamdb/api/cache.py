@@ -0,0 +1,153 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from api_yamdb.replicas import replica_may_be_stale
+
+HITS_KEY = 'stats:hits'
+MISSES_KEY = 'stats:misses'
+
+
+def new_version():
+    """Версия данных: время изменения и случайный суффикс."""
+    return f'{time.time():.6f}-{uuid.uuid4().hex[:12]}'
+
+
+def get_modified_time(versions):
+    """Время последнего изменения по набору версий (unix time)."""
+    return max(float(version.split('-', 1)[0]) for version in versions)
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def get_shared_cache():
+    """Хранилище версий, общее для всех воркеров (SHARED_CACHE_ALIAS).
+
+    Сброс версии одним воркером сразу виден остальным, поэтому ни
+    кеш ответов, ни условные запросы не отдают устаревших данных,
+    даже если тела ответов хранятся в памяти каждого воркера.
+    """
+    return caches[settings.SHARED_CACHE_ALIAS]
+
+
+def get_versions(*namespaces, check=None):
+    """Текущие версии пространств имен кеша.
+
+    Отсутствующая версия создается заново, поэтому потеря записи
+    (вытеснение, истечение, перезапуск) приводит только к промаху,
+    а не к устаревшему ответу. Перед созданием вызывается check:
+    он может убедиться, что объект из URL существует (и выбросить
+    Http404), чтобы запросы к произвольным id не создавали записей.
+    """
+    cache = get_shared_cache()
+    keys = [f'version:{namespace}' for namespace in namespaces]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing and check is not None:
+        check()
+    for key in missing:
+        version = new_version()
+        cache.add(key, version, settings.API_CACHE_VERSION_TIMEOUT)
+        versions[key] = cache.get(key, version)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*namespaces):
+    """Инвалидирует все ответы, закешированные в пространствах имен."""
+    get_shared_cache().set_many(
+        {f'version:{namespace}': new_version() for namespace in namespaces},
+        settings.API_CACHE_VERSION_TIMEOUT
+    )
+
+
+def _increment(key):
+    cache = get_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснили между add и incr - не критично.
+        cache.set(key, 1, None)
+
+
+def get_stats():
+    """Счетчики попаданий и промахов кеша ответов."""
+    stats = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': stats.get(HITS_KEY, 0),
+        'misses': stats.get(MISSES_KEY, 0),
+    }
+
+
+def get_response_key(request, namespaces, versions=None):
+    """Ключ ответа: версии данных, путь и отсортированные параметры."""
+    query = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    if versions is None:
+        versions = get_versions(*namespaces)
+    raw = '|'.join([
+        *versions,
+        request.path,
+        '&'.join(f'{name}={value}' for name, value in query),
+    ])
+    return 'response:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+class CachedResponseMixin:
+    """Кеширует данные успешных ответов на безопасные запросы.
+
+    Ключ зависит от версий пространств имен cache_namespaces, которые
+    хранятся в общем хранилище и сбрасываются сигналами при изменении
+    моделей (api/signals.py).
+    """
+
+    cache_namespaces = ()
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        versions = get_versions(*self.cache_namespaces)
+        key = get_response_key(request, self.cache_namespaces, versions)
+        data = cache.get(key)
+        if data is not None:
+            _increment(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _increment(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        # Ответ с отстающей реплики не кешируется под новой версией.
+        if response.status_code == 200 and not replica_may_be_stale(
+            get_modified_time(versions)
+        ):
+            cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
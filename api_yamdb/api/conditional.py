@@ -0,0 +1,79 @@
+import hashlib
+import time
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from api_yamdb.replicas import replica_may_be_stale
+
+from .cache import get_modified_time, get_versions
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list и retrieve по версиям данных.
+
+    Версии хранятся в общем для воркеров хранилище и сбрасываются
+    сигналами при записи (api/signals.py), поэтому проверка
+    If-None-Match/If-Modified-Since не выполняет ни запросов к базе,
+    ни сериализации.
+
+    Версии объектов из URL создаются, только когда объект найден
+    (check_versioned_object): иначе каждый запрос к несуществующему
+    id оставлял бы запись в общем хранилище.
+
+    Last-Modified точен до секунды, поэтому он отдается, только когда
+    секунда изменения прошла: две записи в одну секунду иначе дали бы
+    одинаковый Last-Modified и неверный 304 на If-Modified-Since.
+    """
+
+    def get_version_namespaces(self):
+        raise NotImplementedError
+
+    def check_versioned_object(self):
+        """Проверяет, что объект, чьи версии отсутствуют в хранилище,
+        существует; по умолчанию версии не зависят от URL."""
+
+    def get_validators(self, request):
+        versions = get_versions(
+            *self.get_version_namespaces(),
+            check=self.check_versioned_object
+        )
+        raw = '|'.join([*versions, request.get_full_path()])
+        etag = '"{}"'.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
+        return etag, get_modified_time(versions)
+
+    def get_last_modified(self, modified):
+        """Last-Modified версии или None, если в ту же секунду
+        возможна следующая запись."""
+        if int(modified) < int(time.time()):
+            return int(modified)
+        return None
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag, modified = self.get_validators(request)
+        last_modified = self.get_last_modified(modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            # Ответ с реплики мог не увидеть последнее изменение:
+            # без валидаторов клиент не закрепит его за новой версией.
+            if response.status_code != 200 or replica_may_be_stale(
+                modified
+            ):
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
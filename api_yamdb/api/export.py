@@ -0,0 +1,221 @@
+import csv
+import json
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import compress_sequence
+from rest_framework.exceptions import ValidationError
+from reviews.models import Comment, GenreTitle, Review, Title
+
+GZIP_RE = re.compile(r'\bgzip\b')
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку,
+    не накапливая ее."""
+
+    def write(self, value):
+        return value
+
+
+class Export:
+    """Потоковая выгрузка таблицы в NDJSON или CSV.
+
+    Строки читаются порциями по первичному ключу (pk > последнего
+    выгруженного, LIMIT chunk_size), поэтому память не зависит от
+    размера таблицы, а каждый запрос короткий и идет по индексу.
+    """
+
+    model = None
+    # (колонка, путь для values_list); первой идет первичный ключ.
+    columns = ()
+    # Поле даты для ?since=, None - фильтр не поддерживается.
+    since_field = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_queryset(self):
+        return self.model.objects.order_by('pk')
+
+    def filter(self, queryset, params):
+        """Фильтры ?since_id= (pk больше) и ?since= (дата не раньше)."""
+        since_id = params.get('since_id')
+        if since_id is not None:
+            # isdigit() верно и для '²', который int() не разбирает.
+            if not (since_id.isascii() and since_id.isdigit()):
+                raise ValidationError(
+                    {'since_id': 'Ожидается целое число.'}
+                )
+            queryset = queryset.filter(pk__gt=int(since_id))
+        since = params.get('since')
+        if since is None:
+            return queryset
+        if self.since_field is None:
+            raise ValidationError(
+                {'since': 'Фильтр по дате не поддерживается, '
+                          'используйте since_id.'}
+            )
+        moment = parse_datetime(since) or parse_date(since)
+        if moment is None:
+            raise ValidationError(
+                {'since': 'Ожидается дата в формате ISO 8601.'}
+            )
+        return queryset.filter(**{f'{self.since_field}__gte': moment})
+
+    def chunks(self, queryset, chunk_size):
+        lookups = [lookup for _, lookup in self.columns]
+        last = None
+        while True:
+            chunk = queryset if last is None else queryset.filter(
+                pk__gt=last
+            )
+            chunk = list(chunk.values_list(*lookups)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last = chunk[-1][0]
+
+    def represent(self, chunk):
+        """Словари строк порции: {колонка: значение}."""
+        names = [name for name, _ in self.columns]
+        return [dict(zip(names, row)) for row in chunk]
+
+    def rows(self, queryset, chunk_size=None):
+        for chunk in self.chunks(
+            queryset, chunk_size or settings.EXPORT_CHUNK_SIZE
+        ):
+            yield from self.represent(chunk)
+
+    @property
+    def fieldnames(self):
+        return [name for name, _ in self.columns]
+
+    def render_ndjson(self, rows):
+        for row in rows:
+            yield json.dumps(
+                row, cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
+
+    def render_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.fieldnames)
+        for row in rows:
+            yield writer.writerow([
+                csv_value(row[name]) for name in self.fieldnames
+            ])
+
+    def response(self, request):
+        """StreamingHttpResponse выгрузки; формат - ?output=ndjson|csv,
+        сжатие gzip - по заголовку Accept-Encoding."""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({
+                'output': f'Допустимые форматы: {", ".join(EXPORT_FORMATS)}.'
+            })
+        # Фильтры проверяются до начала потока, чтобы ошибка пришла
+        # обычным ответом 400.
+        rows = self.rows(
+            self.filter(self.get_queryset(), request.query_params)
+        )
+        content_type, extension = EXPORT_FORMATS[output]
+        content = (
+            line.encode('utf-8')
+            for line in getattr(self, f'render_{output}')(rows)
+        )
+        gzip = GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if gzip:
+            content = compress_sequence(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.name}.{extension}"'
+        )
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        return ','.join(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class TitleExport(Export):
+    model = Title
+    columns = (
+        ('id', 'pk'),
+        ('name', 'name'),
+        ('year', 'year'),
+        ('description', 'description'),
+        ('category', 'category__slug'),
+        ('rating', 'rating'),
+        ('reviews_count', 'reviews_count'),
+    )
+
+    @property
+    def fieldnames(self):
+        return [*super().fieldnames, 'genre']
+
+    def represent(self, chunk):
+        """Жанры порции - одним запросом к промежуточной таблице."""
+        genres = defaultdict(list)
+        for title_id, slug in GenreTitle.objects.filter(
+            title_id__in=[row[0] for row in chunk]
+        ).order_by('genre__slug').values_list('title_id', 'genre__slug'):
+            genres[title_id].append(slug)
+        rows = super().represent(chunk)
+        for row in rows:
+            row['genre'] = genres[row['id']]
+        return rows
+
+
+class ReviewExport(Export):
+    model = Review
+    columns = (
+        ('id', 'pk'),
+        ('title', 'title_id'),
+        ('author', 'author__username'),
+        ('score', 'score'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('comments_count', 'comments_count'),
+    )
+    since_field = 'pub_date'
+
+
+class CommentExport(Export):
+    model = Comment
+    columns = (
+        ('id', 'pk'),
+        ('title', 'review__title_id'),
+        ('review', 'review_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+    )
+    since_field = 'pub_date'
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+EXPORTS = {
+    name: export_class(name) for name, export_class in (
+        ('titles', TitleExport),
+        ('reviews', ReviewExport),
+        ('comments', CommentExport),
+    )
+}
@@ -1,13 +1,89 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from reviews import genre_index
 from reviews.models import Title
+from reviews.search import search
+
+
+class SlugListFilter(filters.BaseInFilter, filters.CharFilter):
+    """Список слагов через запятую."""
 
 
 class TitleFilter(filters.FilterSet):
-    genre = filters.CharFilter(field_name='genre__slug')
+    """Фильтры списка произведений. ?genre= принимает несколько слагов
+    через запятую: genre_mode=all - произведения со всеми жанрами,
+    any (по умолчанию) - хотя бы с одним. Отбор идет по маске жанров
+    произведения (reviews/genre_index.py), без join с жанрами."""
+
+    genre = SlugListFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(
+        choices=[(mode, mode) for mode in genre_index.MODES],
+        method='filter_genre_mode'
+    )
     category = filters.CharFilter(field_name='category__slug')
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
     year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_max = filters.NumberFilter(field_name='rating', lookup_expr='lte')
 
     class Meta:
         model = Title
         fields = ('name', 'year', 'category', 'genre',)
+
+    def filter_genre(self, queryset, name, value):
+        slugs = [slug for slug in value if slug]
+        if not slugs:
+            return queryset
+        mode = self.form.cleaned_data.get('genre_mode') or genre_index.ANY
+        return genre_index.filter_titles(queryset, slugs, mode)
+
+    def filter_genre_mode(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+class StableOrderingFilter(OrderingFilter):
+    """Сортировка по параметру ?ordering= с id в конце: при равных
+    значениях порядок строк и страниц не меняется между запросами.
+
+    Если у view задан ordering_combinations, принимаются только
+    перечисленные сочетания полей (или они же в обратном направлении) -
+    те, что поддержаны индексами; для остальных, как и для неизвестных
+    полей, действует порядок по умолчанию.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        combinations = getattr(view, 'ordering_combinations', None)
+        if ordering and combinations is not None and not any(
+            tuple(ordering) in (combination, reverse_ordering(combination))
+            for combination in combinations
+        ):
+            ordering = self.get_default_ordering(view)
+        if not ordering or any(
+            field.lstrip('-') in ('id', 'pk') for field in ordering
+        ):
+            return ordering
+        return [*ordering, '-id' if ordering[-1].startswith('-') else 'id']
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по параметру ?search= с сортировкой
+    по релевантности (GIN на PostgreSQL, обратный индекс на SQLite)."""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search(queryset, query)
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api_yamdb.replicas import current_replica, replicas
+
+from . import timing as request_timing
+from .throttling import database_latency, get_setting
+
+logger = logging.getLogger('api.performance')
+
+
+class ServerTimingMiddleware:
+    """Замеры времени запроса в заголовке Server-Timing и в логе.
+
+    Считает общее время, число и время SQL запросов, время
+    аутентификации, view и рендеринга, а также отмечает повторяющиеся
+    запросы (признак N+1). Включается настройкой PERFORMANCE_TIMING.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = settings.PERFORMANCE_DUPLICATE_QUERIES
+
+    def __call__(self, request):
+        timing, token = request_timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.record_query)
+                    )
+                response = self.get_response(request)
+            # Ответ DRF рендерится после process_template_response.
+            rendered = timing.marks.get('view_finished')
+            if rendered is not None:
+                timing.add('render', time.perf_counter() - rendered)
+            self.report(request, response, timing)
+        finally:
+            request_timing.finish(token)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request_timing.current().marks['view_started'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = request_timing.current()
+        now = time.perf_counter()
+        if 'view_started' in timing.marks:
+            timing.add('view', now - timing.marks['view_started'])
+        timing.marks['view_finished'] = now
+        return response
+
+    def report(self, request, response, timing):
+        total = timing.total()
+        duplicates = timing.duplicates(self.duplicate_threshold)
+        metrics = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={timing.sql_time * 1000:.1f};desc="{timing.queries} '
+            f'queries"',
+        ]
+        metrics.extend(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in timing.spans.items()
+        )
+        if duplicates:
+            metrics.append(f'n1;desc="{len(duplicates)} repeated queries"')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(timing.sql_time * 1000, 1),
+            'queries': timing.queries,
+            **{
+                f'{name}_ms': round(duration * 1000, 1)
+                for name, duration in timing.spans.items()
+            },
+        }
+        if duplicates:
+            record['duplicates'] = [
+                {'sql': sql[:200], 'count': count}
+                for sql, count in duplicates
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class DatabaseLatencyMiddleware:
+    """Замеряет среднее время SQL запроса в каждом запросе и обновляет
+    database_latency, по которому LoadSheddingThrottle решает, пора ли
+    отклонять низкоприоритетные изменения. Включается настройкой
+    REST_FRAMEWORK['LOAD_SHEDDING']['DB_LATENCY_THRESHOLD_MS'].
+    """
+
+    def __init__(self, get_response):
+        options = get_setting('LOAD_SHEDDING', {})
+        if options.get('DB_LATENCY_THRESHOLD_MS') is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {'queries': 0, 'time': 0.0}
+
+        def measure(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['time'] += time.perf_counter() - started
+                stats['queries'] += 1
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(measure))
+            try:
+                return self.get_response(request)
+            finally:
+                if stats['queries']:
+                    database_latency.record(
+                        stats['time'] / stats['queries']
+                    )
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтения безопасных запросов к view с replica_reads
+    на реплики (api_yamdb/replicas.py), а после успешного изменения
+    данных на STICKY_SECONDS закрепляет клиента за основной базой.
+    Клиент получает подписанную отметку с временем записи в cookie
+    и в заголовке STICKY_HEADER и узнается по ней в любом воркере;
+    клиент с заголовком Authorization, не вернувший отметку, - по
+    записи в общем хранилище. Не используется, если реплики
+    не настроены.
+    """
+
+    signer = signing.TimestampSigner(salt='api.middleware.primary_reads')
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_replica.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self.stick_to_primary(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if (request.method in SAFE_METHODS
+                and getattr(view_class, 'replica_reads', False)
+                and not self.is_sticky(request)):
+            current_replica.set(replicas.choose())
+
+    def process_exception(self, request, exception):
+        alias = current_replica.get()
+        if alias is not None and isinstance(exception, DatabaseError):
+            replicas.mark_down(alias)
+
+    def sticky_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode('utf-8')).hexdigest()
+        return f'replicas:sticky:{digest}'
+
+    def has_sticky_mark(self, request):
+        options = settings.DATABASE_REPLICAS
+        header = 'HTTP_' + options['STICKY_HEADER'].upper().replace('-', '_')
+        for mark in (
+            request.COOKIES.get(options['STICKY_COOKIE']),
+            request.META.get(header),
+        ):
+            if not mark:
+                continue
+            try:
+                self.signer.unsign(mark, max_age=options['STICKY_SECONDS'])
+            except signing.BadSignature:
+                continue
+            return True
+        return False
+
+    def is_sticky(self, request):
+        if self.has_sticky_mark(request):
+            return True
+        key = self.sticky_key(request)
+        return key is not None and sticky_cache().get(key) is not None
+
+    def stick_to_primary(self, request, response):
+        options = settings.DATABASE_REPLICAS
+        seconds = options['STICKY_SECONDS']
+        mark = self.signer.sign('primary')
+        response[options['STICKY_HEADER']] = mark
+        response.set_cookie(
+            options['STICKY_COOKIE'], mark,
+            max_age=seconds, httponly=True, samesite='Lax'
+        )
+        key = self.sticky_key(request)
+        if key is not None:
+            sticky_cache().set(key, 1, seconds)
+
+
+def sticky_cache():
+    return caches[settings.DATABASE_REPLICAS['CACHE_ALIAS']]
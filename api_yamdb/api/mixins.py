@@ -1,9 +1,77 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from .pagination import KeysetPagination
+
 
 class CreateDestroyListMixin(
     CreateModelMixin, ListModelMixin, DestroyModelMixin, GenericViewSet
 ):
     pass
+
+
+class KeysetPaginationMixin:
+    """Курсорная пагинация по запросу с параметром ?pagination=cursor.
+
+    По умолчанию используется обычная постраничная пагинация,
+    чтобы не ломать существующих клиентов.
+    """
+
+    keyset_pagination_class = KeysetPagination
+    keyset_pagination_param = 'pagination'
+
+    def use_keyset_pagination(self):
+        request = getattr(self, 'request', None)
+        return request is not None and (
+            request.query_params.get(self.keyset_pagination_param)
+            == 'cursor'
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_keyset_pagination():
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
+
+
+class ParentObjectMixin:
+    """Родительский объект вложенного ресурса (произведение отзыва,
+    отзыв комментария) загружается один раз за запрос.
+
+    parent_lookups - соответствие "поле родителя - параметр URL".
+    """
+
+    parent_model = None
+    parent_lookups = {}
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.parent_model, **{
+                field: self.kwargs[kwarg]
+                for field, kwarg in self.parent_lookups.items()
+            })
+        return self._parent
+
+
+class ProjectionListMixin:
+    """Быстрый путь для list: ответ строится из values() через
+    projection (api/projections.py) без экземпляров моделей и
+    сериализаторов. Отключается настройкой API_PROJECTIONS.
+    """
+
+    projection = None
+
+    def list(self, request, *args, **kwargs):
+        if self.projection is None or not settings.API_PROJECTIONS:
+            return super().list(request, *args, **kwargs)
+        queryset = self.projection.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.projection.represent(queryset))
+        return self.get_paginated_response(self.projection.represent(page))
@@ -0,0 +1,176 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def get_value(item, field_name):
+    """Значение поля у объекта модели или у словаря из values()."""
+    if isinstance(item, dict):
+        return item[field_name]
+    return getattr(item, field_name)
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная (keyset) пагинация по составному ключу.
+
+    Страница выбирается условием вида
+    (pub_date, id) < (последняя pub_date, последний id)
+    без OFFSET и COUNT, поэтому время ответа не зависит от глубины.
+    Ключ - порядок, уже заданный view (например, ?ordering=
+    с замыкающим id), а без него - ordering. Курсоры непрозрачны для
+    клиента: это base64 от позиции и направления обхода.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Некорректный курсор.'
+    invalid_ordering_message = (
+        'Курсорная пагинация поддерживает только сортировку по полям '
+        'с id в конце.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_base_ordering(queryset)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(
+                ordering, self.parse_position(queryset, position)
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_base_ordering(self, queryset):
+        """Порядок queryset как ключ: поля модели, последнее - id."""
+        ordering = queryset.query.order_by
+        if not ordering:
+            return self.ordering
+        fields = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        if not all(
+            isinstance(field, str) and field.lstrip('-') in fields
+            for field in ordering
+        ) or ordering[-1].lstrip('-') != 'id':
+            raise ValidationError({'ordering': self.invalid_ordering_message})
+        return tuple(ordering)
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    def get_keyset_filter(self, ordering, position):
+        """Условие "строго после позиции" для лексикографического
+        порядка: a >= x AND ((a > x) OR (a = x AND b > y) OR ...).
+
+        Отдельная граница на первое поле нужна базе, чтобы читать
+        индекс диапазоном от позиции: по одной цепочке OR она
+        перебирает все строки до нее, и страница дорожает с глубиной.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first, value = ordering[0], position[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': value}) & condition
+
+    def get_position(self, item):
+        return [
+            get_value(item, field.lstrip('-')) for field in self.ordering
+        ]
+
+    def parse_position(self, queryset, position):
+        options = queryset.model._meta
+        try:
+            return [
+                options.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = data['p'], bool(data['r'])
+            if not isinstance(position, list) or (
+                len(position) != len(self.ordering)
+            ):
+                raise ValueError('Позиция не соответствует сортировке.')
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, item, reverse):
+        position = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self.get_position(item)
+        ]
+        data = json.dumps({'p': position, 'r': int(reverse)})
+        encoded = urlsafe_b64encode(data.encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.base_url, self.cursor_query_param
+            )
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,30 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Построчный JSON (application/x-ndjson): по объекту на строку.
+
+    Возвращает список объектов; пустые строки пропускаются.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        number = 1
+        try:
+            for number, line in enumerate(
+                codecs.getreader(encoding)(stream), 1
+            ):
+                if line.strip():
+                    items.append(json.loads(line))
+        except ValueError as error:
+            raise ParseError(f'Строка {number}: {error}')
+        return items
@@ -1,17 +1,124 @@
-from django.shortcuts import get_object_or_404
+import json
+
+from django.db import connections, router, transaction
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from reviews.models import (
-    CustomUser, Genre, Category, Title, GenreTitle, Review, Comment
+    CustomUser, Genre, Category, Title, GenreTitle, Review, Comment,
+    GenreStats, CategoryStats
 )
-from reviews.validators import (validate_username_not_me,
+from reviews.genre_index import add_genres, assign_bits, rebuild_masks
+from reviews.search import index_objects
+from reviews.signals import bulk_genre_links
+from reviews.stats import mark_stale
+from reviews.validators import (validate_slug_not_reserved,
+                                validate_username_not_me,
                                 RegexUsernameValidator)
 
+from .signals import invalidate
+
+
+def get_or_create_genres(genres_data):
+    """Жанры по слагам: существующие выбираются одним запросом,
+    недостающие создаются одной вставкой. Возвращает словарь
+    слаг - жанр."""
+    names = {genre['slug']: genre['name'] for genre in genres_data}
+    genres = Genre.objects.in_bulk(list(names), field_name='slug')
+    missing = [
+        Genre(name=name, slug=slug)
+        for slug, name in names.items() if slug not in genres
+    ]
+    if missing:
+        # Жанр мог быть создан параллельным запросом, поэтому конфликты
+        # игнорируются, а id перечитываются.
+        Genre.objects.bulk_create(missing, ignore_conflicts=True)
+        assign_bits()
+        genres.update(Genre.objects.in_bulk(
+            [genre.slug for genre in missing], field_name='slug'
+        ))
+        invalidate('genres', 'titles')
+    return genres
+
+
+def create_genre_links(titles, genres_data, genres):
+    """Связывает произведения с жанрами одной вставкой."""
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genres[slug])
+        for title, title_genres in zip(titles, genres_data)
+        for slug in dict.fromkeys(genre['slug'] for genre in title_genres)
+    )
+    # bulk_create не отправляет post_save.
+    title_ids = [title.pk for title in titles]
+    rebuild_masks(Title.objects.filter(pk__in=title_ids))
+    mark_stale(titles=title_ids)
+
 
 class GenreTitleSerializer(serializers.ModelSerializer):
+    """Жанр в составе произведения. Существующий жанр находится
+    по слагу, поэтому проверка уникальности слага отключена."""
 
     class Meta:
         model = Genre
         fields = ('name', 'slug')
+        extra_kwargs = {
+            'slug': {'validators': [validate_slug_not_reserved]}
+        }
+
+
+class CategorySlugField(serializers.SlugRelatedField):
+    """Категория по слагу. При пакетной загрузке категории выбираются
+    заранее одним запросом (см. TitleListSerializer)."""
+
+    def to_internal_value(self, data):
+        categories = self.context.get('categories')
+        if categories is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            self.fail('invalid')
+        if data not in categories:
+            self.fail(
+                'does_not_exist',
+                slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+        return categories[data]
+
+
+class TitleListSerializer(serializers.ListSerializer):
+    """Пакетное создание произведений: категории и жанры всех
+    произведений выбираются одним запросом, произведения и связи
+    с жанрами вставляются пакетно в одной транзакции."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            slugs = {
+                item.get('category') for item in data
+                if isinstance(item, dict)
+                and isinstance(item.get('category'), str)
+            }
+            self.context['categories'] = Category.objects.in_bulk(
+                list(slugs), field_name='slug'
+            )
+        return super().to_internal_value(data)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        genres_data = [item.pop('genre') for item in validated_data]
+        genres = get_or_create_genres(
+            genre for title_genres in genres_data for genre in title_genres
+        )
+        titles = [Title(**item) for item in validated_data]
+        connection = connections[router.db_for_write(Title)]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+            # bulk_create не отправляет post_save.
+            index_objects(titles)
+            invalidate('titles')
+        else:
+            for title in titles:
+                title.save()
+        create_genre_links(titles, genres_data, genres)
+        return titles
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -76,12 +183,54 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
+class GroupStatsSerializer(serializers.ModelSerializer):
+    """Предрассчитанная статистика жанра или категории.
+
+    stale - статистика помечена для пересчета и может отставать
+    от данных; updated - время последнего пересчета.
+    """
+
+    name = serializers.CharField(source='group.name')
+    slug = serializers.SlugField(source='group.slug')
+    average_score = serializers.FloatField()
+    top_titles = serializers.SerializerMethodField()
+    stale = serializers.BooleanField(source='dirty')
+
+    class Meta:
+        fields = (
+            'name',
+            'slug',
+            'titles_count',
+            'reviews_count',
+            'average_score',
+            'top_titles',
+            'updated',
+            'stale',
+        )
+        read_only_fields = fields
+
+    def get_top_titles(self, obj):
+        return json.loads(obj.top_titles)
+
+
+class GenreStatsSerializer(GroupStatsSerializer):
+
+    class Meta(GroupStatsSerializer.Meta):
+        model = GenreStats
+
+
+class CategoryStatsSerializer(GroupStatsSerializer):
+
+    class Meta(GroupStatsSerializer.Meta):
+        model = CategoryStats
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
     """Сериализатор для безопасных запросов по произведениям."""
 
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True)
-    rating = serializers.SerializerMethodField(read_only=True)
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
@@ -96,32 +245,20 @@ class TitleReadSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('__all__',)
 
-    def get_rating(self, obj):
-        sum = 0
-        count = 0
-
-        for review in obj.reviews.all():
-            sum += review.score
-            count += 1
-
-        if count == 0:
-            return int(0)
-
-        return int(sum / count)
-
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления/изменения произведений."""
 
-    category = serializers.SlugRelatedField(
+    category = CategorySlugField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
 
-    genre = GenreSerializer(many=True)
+    genre = GenreTitleSerializer(many=True)
 
     class Meta:
         model = Title
+        list_serializer_class = TitleListSerializer
         fields = (
             'id',
             'name',
@@ -131,94 +268,59 @@ class TitleWriteSerializer(serializers.ModelSerializer):
             'category',
         )
 
+    @transaction.atomic
     def create(self, validated_data):
-        """Создадим запись о новом произведении и внесем данные по жанрам.
-        Если жанр новый - создадим новую запись в модели Жанра."""
-        print("=====CREATE")
-        genres = validated_data.pop('genre')
-
+        """Создает произведение; жанры находятся по слагу, новые
+        жанры создаются."""
+        genres_data = validated_data.pop('genre')
+        genres = get_or_create_genres(genres_data)
         title = Title.objects.create(**validated_data)
-
-        for genre in genres:
-            print("=====genre====")
-            current_genre, status = Genre.objects.get_or_create(**genre)
-            GenreTitle.objects.create(
-                genre=current_genre,
-                title=title
-            )
+        create_genre_links([title], [genres_data], genres)
         return title
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Изменим существующую запись произведения."""
-
-        # Если изменяется категория произведения - удалим все
-        # связанные записи в промежуточной таблице GenreTitle, и
-        # заново создадим записи из переданных данных.
-        if validated_data.get('genre', -1) != -1:
-
-            # Найдем все существующие связанные жанры и удалим их
-            # после создания новых (нужна валидация полученных данных).
-            genre_items_to_delete = GenreTitle.objects.filter(
-                title__id=instance.id
+        """Изменяет произведение. Жанры заменяются по разнице с текущими
+        связями: новые добавляются одной вставкой, лишние удаляются
+        одним запросом, остальные не трогаются. Индекс жанров и
+        статистика обновляются один раз на все измененные связи."""
+        genres_data = validated_data.pop('genre', None)
+        if genres_data is not None:
+            genres = get_or_create_genres(genres_data)
+            wanted = {genre.pk for genre in genres.values()}
+            links = GenreTitle.objects.filter(title=instance)
+            current = set(links.values_list('genre_id', flat=True))
+            added, removed = wanted - current, current - wanted
+            GenreTitle.objects.bulk_create(
+                GenreTitle(title=instance, genre_id=genre_id)
+                for genre_id in added
             )
-            print("====GENRE ITEMS TO DELETE: ", genre_items_to_delete)
-
-            # Непонятно почему без этой строчки все жанры
-            # произведения удаляются.
-            print('====Genre items to delete: ', len(genre_items_to_delete))
-
-            # Создадим новые записи в таблице GenreTitle
-            genres = validated_data.get('genre')
-            for genre in genres:
-                current_genre, status = Genre.objects.get_or_create(
-                    name=genre['name'],
-                    slug=genre['slug'])
-                GenreTitle.objects.create(
-                    genre=current_genre,
-                    title=instance)
-
-            # Если новые записи созданы успешно, то удаляем старые:
-            if len(genre_items_to_delete) > 0:
-                for item in genre_items_to_delete:
-                    item.delete()
-
-        instance.name = validated_data.get('name', instance.name)
-        instance.year = validated_data.get('year', instance.year)
-        instance.description = validated_data.get(
-            'description',
-            instance.description
-        )
-        instance.category = validated_data.get('category', instance.category)
-        instance.save()
-
-        return instance
+            if removed:
+                with bulk_genre_links():
+                    links.filter(genre_id__in=removed).delete()
+                rebuild_masks(Title.objects.filter(pk=instance.pk))
+            else:
+                add_genres([instance.pk], added)
+            mark_stale(genres=added | removed)
+        return super().update(instance, validated_data)
 
 
 class ReviewSerializer(serializers.ModelSerializer):
-    """Сериализатор для запросов по обзорам."""
+    """Сериализатор для запросов по обзорам.
 
-    author = serializers.SlugRelatedField(
-        slug_field='username', read_only=True)
-
-    def validate(self, data):
-        """Проверка, что у пользователя еще нет отзыва на это произведение."""
+    Повторный отзыв автора на произведение отсекается ограничением
+    author_title_connection при вставке (см. ReviewViewSet).
+    """
 
-        if self.context.get('request').method != 'POST':
-            return data
-        print('=========Self.Context in Validation=======')
-        print(f'self.context: {self.context}')
-        title_id = self.context.get('view').kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        user = self.context.get('request').user
-        message = 'Вы уже оставляли отзыв на это произведение.'
+    duplicate_message = 'Вы уже оставляли отзыв на это произведение.'
 
-        if Review.objects.filter(title=title, author=user).exists():
-            raise serializers.ValidationError(message)
-        return data
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True)
 
     class Meta:
         model = Review
-        fields = ('id', 'text', 'author', 'score', 'pub_date',)
+        fields = ('id', 'text', 'author', 'score', 'pub_date',
+                  'comments_count',)
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import (Category, Comment, CustomUser, Genre, GenreTitle,
+                            Review, Title)
+
+from .authentication import bump_user_version, user_cache
+from .cache import bump_versions
+
+# Какие версии данных меняются при изменении записи модели:
+# произведения включают жанры, категорию и рейтинг по отзывам.
+INVALIDATES = {
+    Title: lambda title: ('titles', f'title:{title.pk}'),
+    GenreTitle: lambda link: ('titles', f'title:{link.title_id}'),
+    Review: lambda review: (
+        'titles', f'title:{review.title_id}', f'reviews:{review.title_id}'
+    ),
+    # Число комментариев входит в представление отзыва.
+    Comment: lambda comment: (
+        f'comments:{comment.review_id}', *review_namespaces(comment)
+    ),
+    Genre: lambda genre: ('genres', 'titles'),
+    Category: lambda category: ('categories', 'titles'),
+}
+
+
+def review_namespaces(comment):
+    """Версия списка отзывов произведения, к которому относится
+    комментарий. Отзыв обычно уже загружен (perform_create), иначе -
+    один запрос; при каскадном удалении отзыва его может уже не быть."""
+    if Comment.review.is_cached(comment):
+        title_id = comment.review.title_id
+    else:
+        title_id = Review.objects.filter(pk=comment.review_id).values_list(
+            'title_id', flat=True
+        ).first()
+    return () if title_id is None else (f'reviews:{title_id}',)
+
+
+def invalidate(*namespaces):
+    """Сбрасывает версии сразу и повторно после коммита: иначе ответ,
+    прочитанный до коммита, мог бы закешироваться под новой версией."""
+    bump_versions(*namespaces)
+    transaction.on_commit(lambda: bump_versions(*namespaces))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    get_namespaces = INVALIDATES.get(sender)
+    if get_namespaces:
+        invalidate(*get_namespaces(instance))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_on_genres_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate('titles', f'title:{instance.pk}')
+    elif pk_set:
+        invalidate('titles', *(f'title:{pk}' for pk in pk_set))
+    else:
+        invalidate('titles', 'genres')
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбрасывает пользователя в кеше аутентификации этого воркера
+    и меняет его версию для остальных (роль, is_active, is_staff
+    могли измениться). Повторно - после коммита, чтобы параллельный
+    запрос не закешировал старую запись."""
+    user_id = instance.pk
+
+    def invalidate_user():
+        user_cache.invalidate(user_id)
+        bump_user_version(user_id)
+
+    invalidate_user()
+    transaction.on_commit(invalidate_user)
@@ -0,0 +1,231 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_setting(name, default=None):
+    """Настройки ограничения запросов, которых нет в api_settings DRF."""
+    return getattr(settings, 'REST_FRAMEWORK', {}).get(name, default)
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60): размер корзины и период ее наполнения."""
+    number, period = rate.split('/')
+    return int(number), DURATIONS[period[0]]
+
+
+def take_token(state, capacity, period, now):
+    """Наполняет корзину за прошедшее время и берет из нее токен.
+
+    Возвращает (разрешено, ожидание до следующего токена,
+    новое состояние).
+    """
+    refill = capacity / period
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return True, 0, (tokens - 1, now)
+    return False, (1 - tokens) / refill, (tokens, now)
+
+
+class BucketStore:
+    """Состояние корзин токенов: общий кеш, а если он недоступен -
+    словарь в памяти процесса.
+
+    Чтение и запись корзины в кеше не атомарны: при одновременных
+    запросах корзина может отдать на несколько токенов больше, как
+    и встроенные throttle-классы DRF.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = {}
+
+    def get_cache(self):
+        return caches[get_setting(
+            'THROTTLE_CACHE_ALIAS', settings.SHARED_CACHE_ALIAS
+        )]
+
+    def consume(self, key, capacity, period, now=None):
+        """Берет токен из корзины. Возвращает (разрешено, ожидание)."""
+        now = time.time() if now is None else now
+        try:
+            cache = self.get_cache()
+            state = cache.get(key)
+        except Exception:
+            with self.lock:
+                allowed, wait, self.local[key] = take_token(
+                    self.local.get(key), capacity, period, now
+                )
+            return allowed, wait
+        allowed, wait, state = take_token(state, capacity, period, now)
+        try:
+            # Через период корзина заведомо полна - запись не нужна.
+            cache.set(key, state, math.ceil(period))
+        except Exception:
+            with self.lock:
+                self.local[key] = state
+        return allowed, wait
+
+
+bucket_store = BucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ограничение запросов корзиной токенов.
+
+    Скорость задается в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] по
+    scope в формате 'число/период': корзина вмещает "число" токенов
+    и полностью наполняется за период, поэтому короткие всплески
+    допускаются, а средняя скорость ограничена.
+    """
+
+    scope = None
+    store = bucket_store
+
+    def get_ident_key(self, request, view):
+        """Идентификатор клиента или None, если ограничение
+        к запросу не применяется."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        ident = self.get_ident_key(request, view)
+        if rate is None or ident is None:
+            return True
+        capacity, period = parse_rate(rate)
+        allowed, self.wait_time = self.store.consume(
+            f'throttle:{self.scope}:{ident}', capacity, period
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+    def get_user_or_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    """Все запросы с одного IP."""
+
+    scope = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    """Все запросы одного пользователя."""
+
+    scope = 'user'
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    """Изменяющие запросы пользователя (или IP для анонимов)."""
+
+    scope = 'write'
+
+    def get_ident_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return self.get_user_or_ident(request)
+
+
+class AuthRateThrottle(TokenBucketThrottle):
+    """Регистрация и получение токена: с одного IP."""
+
+    scope = 'auth'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервис перегружен, повторите запрос позже.'
+    default_code = 'service_overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        # Обработчик исключений DRF выставляет по нему Retry-After.
+        self.wait = wait
+
+
+class DatabaseLatency:
+    """Скользящее среднее (EWMA) времени SQL запроса в процессе.
+
+    Значение обновляется после каждого запроса к API
+    (api.middleware.DatabaseLatencyMiddleware) и устаревает, если
+    новых замеров не было дольше window секунд.
+    """
+
+    def __init__(self, alpha=0.2, window=10):
+        self.alpha = alpha
+        self.window = window
+        self.lock = threading.Lock()
+        self.value = None
+        self.updated = 0.0
+
+    def record(self, query_time, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.value is None or now - self.updated > self.window:
+                self.value = query_time
+            else:
+                self.value += self.alpha * (query_time - self.value)
+            self.updated = now
+
+    def current(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.value is None or now - self.updated > self.window:
+                return None
+            return self.value
+
+    def reset(self):
+        with self.lock:
+            self.value = None
+
+
+database_latency = DatabaseLatency()
+
+
+class LoadSheddingThrottle(BaseThrottle):
+    """Отклоняет низкоприоритетные изменяющие запросы с 503 и
+    Retry-After, пока среднее время SQL запроса выше порога
+    REST_FRAMEWORK['LOAD_SHEDDING']['DB_LATENCY_THRESHOLD_MS'].
+
+    Запросы администраторов и безопасные запросы не отклоняются.
+    """
+
+    def allow_request(self, request, view):
+        options = get_setting('LOAD_SHEDDING', {})
+        threshold = options.get('DB_LATENCY_THRESHOLD_MS')
+        if threshold is None or request.method in SAFE_METHODS:
+            return True
+        user = request.user
+        if user and user.is_authenticated and user.is_admin():
+            return True
+        latency = database_latency.current()
+        if latency is not None and latency * 1000 > threshold:
+            raise ServiceOverloaded(options.get('RETRY_AFTER', 5))
+        return True
@@ -0,0 +1,68 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса: этапы обработки и SQL."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.marks = {}
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+
+    def add(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def record_query(self, execute, sql, params, many, context):
+        """Обертка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            # Текст запроса с плейсхолдерами одинаков для N+1 запросов.
+            self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        return [
+            (sql, count) for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def start():
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """Замеряет блок кода, если для запроса включены замеры."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from api.views import (CategoryViewSet, GenreViewSet,
                        TitleViewSet, UsersViewSet,
                        ReviewViewSet, CommentViewSet,
-                       user_signup, user_auth)
+                       user_signup, user_auth, export, db_pool)
 
 app_name = 'api'
 
@@ -27,5 +27,7 @@ router_v1.register(
 urlpatterns = [
     path('v1/auth/signup/', user_signup),
     path('v1/auth/token/', user_auth),
+    path('v1/export/<slug:resource>/', export),
+    path('v1/db-pool/', db_pool),
     path('v1/', include(router_v1.urls)),
 ]
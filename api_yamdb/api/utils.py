@@ -1,7 +1,7 @@
 import random
 
-from django.core.mail import EmailMessage
 from rest_framework_simplejwt.tokens import AccessToken
+from reviews.outbox import enqueue_email
 
 from api_yamdb.settings import (CONFIRMATION_CODE_CHARACTERS,
                                 CONFIRMATION_CODE_LENGTH)
@@ -18,15 +18,16 @@ def create_confirmation_code():
 
 
 def send_email(name, email, confirmation_code):
-    """Отправка пользователю в консоль письма с кодом подтверждения."""
-    print("=====SEND_EMAIL=====")
+    """Постановка в очередь письма с кодом подтверждения.
 
-    mail = EmailMessage(
+    Письмо отправляет команда send_queued_emails, поэтому ответ
+    на регистрацию не ждет почтовый сервер.
+    """
+    enqueue_email(
         'Регистрация на сайте.',
         f'Здравствуйте, {name}. Ваш код подтверждения: {confirmation_code}',
-        to=[email]
+        email
     )
-    mail.send()
 
 
 def get_token_for_user(user):
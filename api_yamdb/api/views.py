@@ -1,26 +1,50 @@
+import os
+
+from django.db import transaction
+from django.db.models import Prefetch
 from django.db.utils import IntegrityError
 from django.shortcuts import get_object_or_404
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from api_yamdb.db import get_pool_setting, pool_stats
 from reviews.models import (
     CustomUser, Genre, Category, Title, Review)
 from .permissions import (
     IsAdmin, IsAdminUserOrReadOnly, IsAuthorAdminModeratorOrReadOnly)
-from .mixins import CreateDestroyListMixin
+from .cache import CachedListMixin, CachedRetrieveMixin
+from .conditional import ConditionalGetMixin
+from .export import EXPORTS
+from .mixins import (CreateDestroyListMixin, KeysetPaginationMixin,
+                     ParentObjectMixin, ProjectionListMixin)
+from .parsers import NDJSONParser
+from .projections import Projection
+from .throttling import (AuthRateThrottle, IPRateThrottle,
+                         LoadSheddingThrottle)
 from .serializers import (SignUpSerializer, CustomUserSerializer,
                           AccountSerializer, CategorySerializer,
                           GenreSerializer, TitleReadSerializer,
                           TitleWriteSerializer, TokenSerializer,
-                          ReviewSerializer, CommentSerializer)
-from .filters import TitleFilter
+                          ReviewSerializer, CommentSerializer,
+                          GenreStatsSerializer, CategoryStatsSerializer)
+from .filters import (FullTextSearchFilter, StableOrderingFilter,
+                      TitleFilter)
 from .utils import create_confirmation_code, send_email, get_token_for_user
 
+# Порядок жанров произведения: общий для сериализатора и projection.
+GENRE_ORDERING = ('slug',)
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([IPRateThrottle, AuthRateThrottle, LoadSheddingThrottle])
 def user_signup(request):
     """Регистрация пользователя и отправка кода подтверждения на почту."""
 
@@ -52,6 +76,9 @@ def user_signup(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+# Получение токена не отклоняется при перегрузке: без него клиенты
+# не смогут работать и после ее окончания.
+@throttle_classes([IPRateThrottle, AuthRateThrottle])
 def user_auth(request):
     """Получение юзером токена."""
 
@@ -69,6 +96,30 @@ def user_auth(request):
     return Response(response, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export(request, resource):
+    """Потоковая выгрузка произведений, отзывов или комментариев
+    целиком в NDJSON или CSV (api/export.py)."""
+
+    if resource not in EXPORTS:
+        raise NotFound(f'Доступные выгрузки: {", ".join(EXPORTS)}.')
+    return EXPORTS[resource].response(request)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def db_pool(request):
+    """Счетчики соединений с базой процесса, обработавшего запрос
+    (api_yamdb/db.py)."""
+
+    return Response({
+        'pid': os.getpid(),
+        'max_connections': get_pool_setting('MAX_CONNECTIONS'),
+        **pool_stats.snapshot(),
+    })
+
+
 class UsersViewSet(viewsets.ModelViewSet):
     """Обработка профиля пользователя."""
 
@@ -102,13 +153,45 @@ class UsersViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CategoryGenreViewSet(CreateDestroyListMixin, viewsets.GenericViewSet):
+class CategoryGenreViewSet(CachedListMixin, CreateDestroyListMixin,
+                           viewsets.GenericViewSet):
     """Базовый класс для CategoryViewSet и GenreViewSet."""
 
     permission_classes = (IsAdminUserOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    replica_reads = True
+    # Сериализатор статистики и поле жанра (категории) в ее модели.
+    stats_serializer_class = None
+    stats_group = None
+
+    @action(detail=False, url_path='stats')
+    def stats(self, request):
+        """Статистика всех жанров (категорий) из предрассчитанной
+        таблицы (reviews/stats.py)."""
+        model = self.stats_serializer_class.Meta.model
+        queryset = model.objects.select_related(self.stats_group).order_by(
+            f'{self.stats_group}__slug'
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(
+                self.stats_serializer_class(queryset, many=True).data
+            )
+        return self.get_paginated_response(
+            self.stats_serializer_class(page, many=True).data
+        )
+
+    @action(detail=True, url_path='stats', url_name='stats-detail')
+    def group_stats(self, request, slug=None):
+        """Статистика одного жанра (категории). Для еще не посчитанной
+        возвращаются нули с признаком stale."""
+        group = self.get_object()
+        model = self.stats_serializer_class.Meta.model
+        stats = model.objects.filter(pk=group.pk).first() or model()
+        setattr(stats, self.stats_group, group)
+        return Response(self.stats_serializer_class(stats).data)
 
 
 class CategoryViewSet(CategoryGenreViewSet):
@@ -116,6 +199,9 @@ class CategoryViewSet(CategoryGenreViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    stats_serializer_class = CategoryStatsSerializer
+    stats_group = 'category'
+    cache_namespaces = ('categories',)
 
 
 class GenreViewSet(CategoryGenreViewSet):
@@ -123,67 +209,93 @@ class GenreViewSet(CategoryGenreViewSet):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    stats_serializer_class = GenreStatsSerializer
+    stats_group = 'genre'
+    cache_namespaces = ('genres',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedListMixin, CachedRetrieveMixin,
+                   ProjectionListMixin, viewsets.ModelViewSet):
     """Обработка запросов к произведениям."""
 
-    queryset = Title.objects.all()
+    # Категория подтягивается join'ом, жанры - одним запросом на
+    # страницу, рейтинг хранится в самой таблице: число запросов
+    # не зависит от размера страницы.
+    queryset = Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', queryset=Genre.objects.order_by(*GENRE_ORDERING))
+    ).order_by('-rating', 'name')
+    projection = Projection(
+        TitleReadSerializer, ordering={'genre': GENRE_ORDERING}
+    )
     # serializer_class = TitleWriteSerializer
-    ordering = ['-rating', 'name']
+    cache_namespaces = ('titles',)
+    ordering = ('-rating', 'name')
+    ordering_fields = ('rating', 'year', 'name', 'reviews_count', 'id')
+    # Сочетания ?ordering= (в обоих направлениях), для каждого из
+    # которых есть индекс (поля..., id) в Title.Meta.indexes:
+    # список читается по индексу без сортировки всей таблицы.
+    ordering_combinations = (
+        ('-rating', 'name'), ('rating',), ('year',), ('name',),
+        ('reviews_count',), ('id',),
+    )
+    replica_reads = True
     permission_classes = (IsAdminUserOrReadOnly,)
+    filter_backends = (
+        DjangoFilterBackend, StableOrderingFilter, FullTextSearchFilter
+    )
     filterset_class = TitleFilter
+    bulk_max_items = 1000
 
-    def create(self, request, *args, **kwargs):
-        genre = request.data.pop('genre')
-        # to pass validation for genre:
-        request.data['genre'] = [{"name": "name", "slug": "slug"}]
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-
-        self.perform_create(serializer, genre)
-        headers = self.get_success_headers(serializer.data)
+    @action(
+        methods=['POST'],
+        detail=False,
+        permission_classes=(IsAdmin,),
+        parser_classes=(JSONParser, NDJSONParser)
+    )
+    def bulk(self, request):
+        """Пакетное создание произведений из JSON массива или NDJSON.
+
+        Все произведения проверяются за один проход; при ошибках
+        не создается ни одно, а ошибки возвращаются с индексами.
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': 'Ожидается список произведений.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > self.bulk_max_items:
+            return Response(
+                {'detail': 'Слишком много произведений в одном запросе, '
+                           f'максимум {self.bulk_max_items}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(
+                {'errors': [
+                    {'index': index, 'errors': errors}
+                    for index, errors in enumerate(serializer.errors)
+                    if errors
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        titles = serializer.save()
+        created = self.queryset.filter(
+            pk__in=[title.pk for title in titles]
+        ).order_by('pk')
         return Response(
-            serializer.data,
-            status=status.HTTP_201_CREATED, headers=headers)
-
-    def perform_create(self, serializer, data):
-        serializer.save(genre=data)
-
-    def update(self, request, *args, **kwargs):
-        partial = kwargs.pop('partial', False)
-        instance = self.get_object()
-        if 'genre' in request.data.keys():
-            genre = request.data.pop('genre')
-            request.data['genre'] = [{"name": "name", "slug": "slug"}]
-            serializer = self.get_serializer(
-                instance, data=request.data, partial=partial)
-            serializer.is_valid(raise_exception=True)
-            self.perform_update2(serializer, genre)
-        else:
-            serializer = self.get_serializer(
-                instance, data=request.data, partial=partial)
-            serializer.is_valid(raise_exception=True)
-            self.perform_update1(serializer)
-
-        if getattr(instance, '_prefetched_objects_cache', None):
-            # If 'prefetch_related' has been applied to a queryset, we need to
-            # forcibly invalidate the prefetch cache on the instance.
-            instance._prefetched_objects_cache = {}
-
-        return Response(serializer.data)
-
-    def perform_update1(self, serializer):
-        """Если нет переданного жанра."""
-        serializer.save()
+            TitleReadSerializer(created, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
 
-    def perform_update2(self, serializer, data):
-        """Если обновляется жанр."""
-        serializer.save(genre=data)
+    def get_version_namespaces(self):
+        if self.action == 'retrieve':
+            return (f'title:{self.kwargs["pk"]}', 'genres', 'categories')
+        return ('titles',)
 
-    def partial_update(self, request, *args, **kwargs):
-        kwargs['partial'] = True
-        return self.update(request, *args, **kwargs)
+    def check_versioned_object(self):
+        if self.action == 'retrieve':
+            self.get_object()
 
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от типа запроса."""
@@ -192,49 +304,90 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleWriteSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, KeysetPaginationMixin,
+                    ParentObjectMixin, ProjectionListMixin,
+                    viewsets.ModelViewSet):
     """Обработка зарпосов к обзорам."""
 
     serializer_class = ReviewSerializer
+    projection = Projection(ReviewSerializer)
+    replica_reads = True
+    # Поиск сортирует по релевантности, а ?ordering= - при равной.
+    filter_backends = (StableOrderingFilter, FullTextSearchFilter)
+    ordering_fields = ('pub_date', 'score', 'comments_count')
+    ordering = ('-pub_date', '-id')
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorAdminModeratorOrReadOnly,
     )
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
+
+    def get_version_namespaces(self):
+        return (f'reviews:{self.kwargs["title_id"]}',)
+
+    def check_versioned_object(self):
+        self.get_parent()
 
     def get_title(self):
         """Получает из запроса объект Title."""
-        return get_object_or_404(Title, id=self.kwargs.get('title_id'))
+        return self.get_parent()
 
     def perform_create(self, serializer):
-        """Создание обзора к произведению."""
-        serializer.save(author=self.request.user, title=self.get_title())
+        """Создание обзора к произведению.
+
+        Повторный отзыв отсекается уникальным ограничением при вставке,
+        без предварительной проверки, поэтому одновременные запросы
+        тоже получают 400, а не 500.
+        """
+        title = self.get_title()
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title=title)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=title, author=self.request.user
+            ).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    ReviewSerializer.duplicate_message
+                ]
+            })
 
     def get_queryset(self):
         """Возращает список обзоров к произведению."""
         return self.get_title().reviews.all()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, KeysetPaginationMixin,
+                     ParentObjectMixin, ProjectionListMixin,
+                     viewsets.ModelViewSet):
     """Обработка зарпосов к комментариям."""
 
     serializer_class = CommentSerializer
+    projection = Projection(CommentSerializer)
+    replica_reads = True
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorAdminModeratorOrReadOnly,
     )
+    parent_model = Review
+    parent_lookups = {'title_id': 'title_id', 'pk': 'review_id'}
+
+    def get_version_namespaces(self):
+        return (f'comments:{self.kwargs["review_id"]}',)
+
+    def check_versioned_object(self):
+        self.get_parent()
 
     def get_review(self):
         """Получает из запроса объект Review."""
-        return get_object_or_404(
-            Review,
-            title_id=self.kwargs.get('title_id'),
-            pk=self.kwargs.get('review_id')
-        )
+        return self.get_parent()
 
     def perform_create(self, serializer):
         """Создание комментария к обзору."""
-        serializer.save(author=self.request.user,
-                        review_id=self.get_review().id)
+        serializer.save(author=self.request.user, review=self.get_review())
 
     def get_queryset(self):
         """Возращает список комментариев к обзору."""
@@ -0,0 +1,97 @@
+import logging
+import time
+
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from reviews.models import Title
+
+from .filters import TitleFilter
+from .serializers import (AccountSerializer, CategorySerializer,
+                          CommentSerializer, CustomUserSerializer,
+                          GenreSerializer, ReviewSerializer,
+                          TitleReadSerializer, TitleWriteSerializer)
+
+logger = logging.getLogger('api.performance')
+
+SERIALIZERS = (
+    TitleReadSerializer, TitleWriteSerializer, ReviewSerializer,
+    CommentSerializer, CategorySerializer, GenreSerializer,
+    CustomUserSerializer, AccountSerializer,
+)
+# Справочники, ответы на которые кладутся в кеш ответов.
+WARM_URLS = ('api:category-list', 'api:genre-list', 'api:title-list')
+
+
+def build_resolver():
+    """Компилирует шаблоны URL и заполняет кеши reverse и resolve."""
+    for name in WARM_URLS:
+        resolve(reverse(name))
+
+
+def build_fields(serializer):
+    """Строит поля сериализатора, включая вложенные: при этом
+    заполняются кеши метаданных моделей и сопоставления полей."""
+    for field in serializer.fields.values():
+        child = getattr(field, 'child', field)
+        if hasattr(child, 'fields'):
+            build_fields(child)
+
+
+def build_serializers():
+    for serializer_class in SERIALIZERS:
+        build_fields(serializer_class())
+
+
+def build_filtersets():
+    return TitleFilter(data={}, queryset=Title.objects.none()).form
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def fill_caches():
+    """Запрашивает справочники: ответы и версии попадают в кеш."""
+    factory = RequestFactory()
+    for name in WARM_URLS:
+        path = reverse(name)
+        match = resolve(path)
+        # Отдельный адрес, чтобы не расходовать лимиты клиентов.
+        request = factory.get(path, REMOTE_ADDR='warmup')
+        response = match.func(request, *match.args, **match.kwargs)
+        response.render()
+
+
+STEPS = (
+    ('resolver', build_resolver),
+    ('serializers', build_serializers),
+    ('filtersets', build_filtersets),
+    ('connections', open_connections),
+    ('caches', fill_caches),
+)
+
+
+def warm_up(database=True):
+    """Прогревает процесс до первого запроса. Возвращает время шагов
+    в секундах.
+
+    С database=False шаги, обращающиеся к базе, пропускаются: так
+    прогревается мастер gunicorn с preload_app перед fork, чтобы
+    воркеры не унаследовали его соединения. Ошибка шага не мешает
+    запуску воркера.
+    """
+    timings = {}
+    for name, step in STEPS:
+        if not database and name in ('connections', 'caches'):
+            continue
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Ошибка прогрева: %s', name)
+        timings[name] = time.perf_counter() - started
+    if not database:
+        connections.close_all()
+    return timings
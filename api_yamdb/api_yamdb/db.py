@@ -0,0 +1,208 @@
+"""Управление соединениями с базой данных в процессе воркера.
+
+Соединения живут между запросами (CONN_MAX_AGE). Перед повторным
+использованием соединение, простоявшее дольше HEALTH_CHECK_AFTER
+секунд, проверяется запросом SELECT 1 и при ошибке закрывается,
+чтобы Django открыл новое. Одновременно открытых соединений в процессе
+не больше MAX_CONNECTIONS: остальные потоки ждут освобождения до
+TIMEOUT секунд. Ограничение встраивается в драйвер через класс
+соединения (OPTIONS), поэтому ENGINE остается стандартным. Место
+освобождается при закрытии соединения, а если его не закрыли (поток
+завершился, обертку Django удалили) - когда соединение удаляет
+сборщик мусора.
+"""
+import gc
+import threading
+import time
+import weakref
+
+POSTGRESQL = 'django.db.backends.postgresql'
+SQLITE = 'django.db.backends.sqlite3'
+
+
+class PoolStats:
+    """Счетчики соединений процесса."""
+
+    COUNTERS = (
+        'connects', 'closes', 'checkouts', 'waits', 'timeouts',
+        'health_checks', 'reconnects',
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+            self.open = 0
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def opened(self):
+        with self.lock:
+            self.counters['connects'] += 1
+            self.open += 1
+
+    def closed(self):
+        with self.lock:
+            self.counters['closes'] += 1
+            self.open -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.counters, 'open': self.open}
+
+
+pool_stats = PoolStats()
+
+
+def get_pool_setting(name):
+    from django.conf import settings
+
+    return settings.DATABASE_POOL[name]
+
+
+class ConnectionSlots:
+    """Ограничение числа одновременно открытых соединений процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.semaphore = None
+        self.size = None
+
+    def get_semaphore(self):
+        size = get_pool_setting('MAX_CONNECTIONS')
+        with self.lock:
+            if self.semaphore is None or self.size != size:
+                self.semaphore = threading.BoundedSemaphore(size)
+                self.size = size
+            return self.semaphore
+
+    def acquire(self, error):
+        semaphore = self.get_semaphore()
+        if semaphore.acquire(blocking=False):
+            return semaphore
+        pool_stats.add('waits')
+        # Обертки Django с соединениями завершившихся потоков входят
+        # в циклы ссылок: их места освобождает только сборщик мусора.
+        gc.collect()
+        if semaphore.acquire(timeout=get_pool_setting('TIMEOUT')):
+            return semaphore
+        pool_stats.add('timeouts')
+        raise error(
+            f'Нет свободных соединений с базой: открыто {self.size}.'
+        )
+
+    def reset(self):
+        with self.lock:
+            self.semaphore = None
+
+
+connection_slots = ConnectionSlots()
+
+
+def release_slot(slot):
+    slot.release()
+    pool_stats.closed()
+
+
+def limited_connection(connection_class, error):
+    """Класс соединения драйвера, занимающий место в connection_slots
+    на время жизни соединения. error - OperationalError драйвера:
+    Django превращает его в django.db.OperationalError."""
+
+    class LimitedConnection(connection_class):
+
+        def __init__(self, *args, **kwargs):
+            slot = connection_slots.acquire(error)
+            try:
+                super().__init__(*args, **kwargs)
+            except BaseException:
+                slot.release()
+                raise
+            pool_stats.opened()
+            # Вызывается один раз: из close() или при удалении
+            # незакрытого соединения.
+            self._release_slot = weakref.finalize(self, release_slot, slot)
+
+        def close(self):
+            try:
+                super().close()
+            finally:
+                self._release_slot()
+
+    LimitedConnection.__name__ = LimitedConnection.__qualname__ = (
+        f'Limited{connection_class.__name__}'
+    )
+    return LimitedConnection
+
+
+def connection_options(engine):
+    """OPTIONS базы с классом соединения, соблюдающим ограничение."""
+    if engine == POSTGRESQL:
+        import psycopg2
+        import psycopg2.extensions
+
+        return {'connection_factory': limited_connection(
+            psycopg2.extensions.connection, psycopg2.OperationalError
+        )}
+    if engine == SQLITE:
+        import sqlite3
+
+        return {'factory': limited_connection(
+            sqlite3.Connection, sqlite3.OperationalError
+        )}
+    return {}
+
+
+def ping(connection):
+    """Проверяет соединение запросом к базе в обход Django."""
+    try:
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+    except connection.Database.Error:
+        return False
+    return True
+
+
+def check_connections(**kwargs):
+    """В начале запроса: открытые соединения выдаются повторно,
+    простоявшие дольше HEALTH_CHECK_AFTER - после проверки."""
+    from django.db import Error, connections
+
+    threshold = get_pool_setting('HEALTH_CHECK_AFTER')
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        pool_stats.add('checkouts')
+        released = getattr(connection, 'pool_released_at', None)
+        if threshold is None or (
+            released is not None and now - released < threshold
+        ):
+            continue
+        pool_stats.add('health_checks')
+        if ping(connection):
+            continue
+        pool_stats.add('reconnects')
+        try:
+            connection.close()
+        except Error:
+            # Соединение уже разорвано; Django все равно его забудет.
+            pass
+
+
+def release_connections(**kwargs):
+    """В конце запроса запоминает, когда соединения освободились."""
+    from django.db import connections
+
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.pool_released_at = now
@@ -0,0 +1,163 @@
+"""Чтение с реплик базы данных.
+
+ReplicaRoutingMiddleware (api/middleware.py) для безопасных запросов
+к view с replica_reads = True выбирает реплику, и ReplicaRouter
+направляет на нее все чтения запроса; запись всегда идет в основную
+базу. Клиент, только что изменивший данные, в течение STICKY_SECONDS
+читает из основной базы.
+
+Реплика исключается из ротации на RETRY_AFTER секунд, если к ней
+не удалось подключиться или запрос к ней завершился ошибкой базы,
+и пока ее отставание больше MAX_LAG_SECONDS. Отставание оценивается
+по отметке ReplicationHeartbeat, которую основная база обновляет раз
+в CHECK_INTERVAL секунд, поэтому точность оценки - CHECK_INTERVAL.
+"""
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+current_replica = ContextVar('current_replica', default=None)
+
+
+def get_replica_setting(name):
+    return settings.DATABASE_REPLICAS[name]
+
+
+def replica_may_be_stale(modified):
+    """Мог ли ответ, прочитанный с реплики, не увидеть изменение
+    данных, сделанное в modified (unix time). Такой ответ нельзя
+    кешировать под версией, появившейся после этого изменения."""
+    return current_replica.get() is not None and (
+        time.time() - modified < get_replica_setting('MAX_LAG_SECONDS')
+    )
+
+
+class ReplicaRouter:
+    """Чтения запроса - на выбранную для него реплику, остальное -
+    в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        # Таблица общего кеша (DatabaseCache) читается только из
+        # основной базы: версия с реплики могла не увидеть сброса.
+        if model._meta.app_label == 'django_cache':
+            return DEFAULT_DB_ALIAS
+        return current_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+
+class ReplicaPool:
+    """Состояние реплик процесса: отставание и исключение из ротации."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checked = None
+            self.down_until = {}
+            self.lag = {}
+
+    @property
+    def aliases(self):
+        return get_replica_setting('ALIASES')
+
+    def available(self, now=None):
+        now = time.monotonic() if now is None else now
+        max_lag = get_replica_setting('MAX_LAG_SECONDS')
+        with self.lock:
+            return [
+                alias for alias in self.aliases
+                if self.down_until.get(alias, 0) <= now
+                and self.lag.get(alias, 0) <= max_lag
+            ]
+
+    def choose(self):
+        """Следующая по кругу доступная реплика или None."""
+        self.check()
+        available = self.available()
+        if not available:
+            return None
+        return available[next(self.counter) % len(available)]
+
+    def mark_down(self, alias):
+        with self.lock:
+            self.down_until[alias] = (
+                time.monotonic() + get_replica_setting('RETRY_AFTER')
+            )
+        # Соединение могло остаться в неисправном состоянии.
+        try:
+            connections[alias].close()
+        except DatabaseError:
+            pass
+
+    def check(self):
+        """Раз в CHECK_INTERVAL секунд измеряет отставание реплик
+        и обновляет отметку в основной базе."""
+        now = time.monotonic()
+        with self.lock:
+            if (self.checked is not None and now - self.checked
+                    < get_replica_setting('CHECK_INTERVAL')):
+                return
+            self.checked = now
+        from reviews.models import ReplicationHeartbeat
+
+        primary = ReplicationHeartbeat.objects.using(
+            DEFAULT_DB_ALIAS
+        ).order_by('pk').values_list('beat', flat=True).first()
+        for alias in self.aliases:
+            if self.down_until.get(alias, 0) > now:
+                continue
+            try:
+                beat = ReplicationHeartbeat.objects.using(alias).order_by(
+                    'pk'
+                ).values_list('beat', flat=True).first()
+            except DatabaseError:
+                self.mark_down(alias)
+                continue
+            with self.lock:
+                self.lag[alias] = lag_seconds(primary, beat)
+        touch_heartbeat()
+
+
+def lag_seconds(primary, replica):
+    if primary is None:
+        return 0
+    if replica is None:
+        return float('inf')
+    return max(0, (primary - replica).total_seconds())
+
+
+def touch_heartbeat():
+    """Обновляет отметку в основной базе, если она старше
+    CHECK_INTERVAL: несколько воркеров не пишут ее одновременно."""
+    from django.utils import timezone
+    from reviews.models import ReplicationHeartbeat
+
+    now = timezone.now()
+    heartbeats = ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS)
+    updated = heartbeats.filter(
+        pk=1,
+        beat__lte=now - timedelta(
+            seconds=get_replica_setting('CHECK_INTERVAL')
+        )
+    ).update(beat=now)
+    if not updated and not heartbeats.filter(pk=1).exists():
+        heartbeats.bulk_create(
+            [ReplicationHeartbeat(pk=1, beat=now)], ignore_conflicts=True
+        )
+
+
+replicas = ReplicaPool()
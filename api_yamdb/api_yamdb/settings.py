@@ -2,6 +2,8 @@ import os
 from datetime import timedelta
 from dotenv import load_dotenv
 
+from .db import connection_options
+
 # UPDATED IMAGE!!! WITH CHECK LATEST!!! 100
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -32,11 +34,15 @@ INSTALLED_APPS = [
     # 'django-filters',
     'rest_framework',
     'rest_framework_simplejwt',
-    'reviews',
-    'api',
+    'reviews.apps.ReviewsConfig',
+    'api.apps.ApiConfig',
+    'benchmarks.apps.BenchmarksConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'api.middleware.DatabaseLatencyMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,15 +78,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.postgresql')
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv('DB_NAME', 'postgres'),
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', '123'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', '5432')
+        'PORT': os.getenv('DB_PORT', '5432'),
+        # Соединение переиспользуется между запросами воркера.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 300)),
+        'OPTIONS': connection_options(DB_ENGINE),
+    }
+}
+
+# Реплики только для чтения (api_yamdb/replicas.py): хосты через запятую,
+# остальные параметры - как у основной базы.
+DB_REPLICA_HOSTS = [
+    host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host
+]
+for number, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['api_yamdb.replicas.ReplicaRouter']
+
+# После изменения данных клиент STICKY_SECONDS читает из основной базы:
+# его узнают по подписанной отметке в cookie STICKY_COOKIE или в
+# заголовке STICKY_HEADER, которые он присылает обратно, и по отметке
+# для заголовка Authorization в общем хранилище (SHARED_CACHE_ALIAS).
+# Реплика с отставанием больше MAX_LAG_SECONDS или с ошибкой исключается
+# из ротации (с ошибкой - на RETRY_AFTER секунд); отставание проверяется
+# раз в CHECK_INTERVAL секунд.
+DATABASE_REPLICAS = {
+    'ALIASES': [
+        f'replica{number}' for number in range(1, len(DB_REPLICA_HOSTS) + 1)
+    ],
+    'STICKY_SECONDS': int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10)),
+    'STICKY_COOKIE': 'primary_reads',
+    'STICKY_HEADER': 'X-Primary-Reads',
+    'CACHE_ALIAS': 'shared',
+    'MAX_LAG_SECONDS': float(os.getenv('DB_REPLICA_MAX_LAG', 10)),
+    'CHECK_INTERVAL': float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5)),
+    'RETRY_AFTER': float(os.getenv('DB_REPLICA_RETRY_AFTER', 30)),
+}
+
+# Соединения воркера (api_yamdb/db.py): не больше MAX_CONNECTIONS
+# открытых одновременно (ожидание свободного - до TIMEOUT секунд),
+# проверка SELECT 1 перед повторным использованием, если соединение
+# простояло дольше HEALTH_CHECK_AFTER секунд (None - без проверки).
+DATABASE_POOL = {
+    'MAX_CONNECTIONS': int(os.getenv('DB_POOL_MAX_CONNECTIONS', 4)),
+    'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+    'HEALTH_CHECK_AFTER': float(os.getenv('DB_HEALTH_CHECK_AFTER', 1)),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -124,22 +179,148 @@ CONFIRMATION_CODE_CHARACTERS = (
 )
 CONFIRMATION_CODE_LENGTH = 20
 
+# Хранилище, общее для всех воркеров и контейнеров: версии данных
+# кеша ответов и условных запросов (api/cache.py), корзины ограничения
+# запросов (api/throttling.py), закрепление клиентов за основной базой
+# (api/middleware.py). В docker-compose - Redis; без него хранилище
+# остается в памяти процесса, а не в основной базе: иначе каждый
+# запрос писал бы в таблицу кеша. gunicorn с несколькими воркерами
+# без Redis или memcached не запускается (gunicorn.conf.py).
+SHARED_CACHE_ALIAS = 'shared'
+
+# Кеш ответов публичных справочников (произведения, жанры, категории).
+# Ключ ответа включает версии данных из общего хранилища, поэтому
+# кеш в памяти каждого воркера не отдает устаревших ответов.
+API_CACHE_ALIAS = 'api'
+
+# Время жизни версий данных в общем хранилище, с запасом больше
+# времени жизни ответов (API_CACHE_TIMEOUT): истекшая версия создается
+# заново и дает только промах, а версии удаленных объектов не копятся.
+API_CACHE_VERSION_TIMEOUT = int(
+    os.getenv('API_CACHE_VERSION_TIMEOUT', 24 * 60 * 60)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    SHARED_CACHE_ALIAS: {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', 'shared'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 100000)),
+        },
+    },
+    API_CACHE_ALIAS: {
+        'BACKEND': os.getenv(
+            'API_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('API_CACHE_LOCATION', 'api-responses'),
+        'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', 5000)),
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.JWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+
+    # Корзины токенов (api/throttling.py): 'число/период' - размер
+    # корзины и время ее наполнения.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.IPRateThrottle',
+        'api.throttling.UserRateThrottle',
+        'api.throttling.WriteRateThrottle',
+        'api.throttling.LoadSheddingThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'ip': os.getenv('THROTTLE_RATE_IP', '600/min'),
+        'user': os.getenv('THROTTLE_RATE_USER', '1200/min'),
+        'write': os.getenv('THROTTLE_RATE_WRITE', '60/min'),
+        'auth': os.getenv('THROTTLE_RATE_AUTH', '10/min'),
+    },
+    # Перед приложением один прокси (nginx), адрес клиента - последний
+    # в X-Forwarded-For; без заголовка - REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+    # Корзины в общем хранилище: лимиты общие на все воркеры.
+    'THROTTLE_CACHE_ALIAS': os.getenv(
+        'THROTTLE_CACHE_ALIAS', SHARED_CACHE_ALIAS
+    ),
+    # Отклонение низкоприоритетных изменений (503 и Retry-After),
+    # пока среднее время SQL запроса выше порога. None - отключено.
+    'LOAD_SHEDDING': {
+        'DB_LATENCY_THRESHOLD_MS': 200,
+        'RETRY_AFTER': 5,
+    },
 }
 
+# Кеш пользователей в памяти процесса для JWT аутентификации
+# (api/authentication.py): только пользователи без привилегий,
+# с проверкой версии в общем хранилище. Размер 0 отключает кеш.
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 5))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
 
+# Быстрый путь для списков произведений, отзывов и комментариев
+# (api/projections.py): ответ из values() без сериализаторов.
+API_PROJECTIONS = os.getenv('API_PROJECTIONS', 'True') == 'True'
+
+# Сколько лучших произведений хранить в статистике жанров и категорий
+# (reviews/stats.py).
+STATS_TOP_TITLES = int(os.getenv('STATS_TOP_TITLES', 5))
+
+# Размер порции строк потоковой выгрузки (api/export.py).
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Начиная с какого числа строк списки админки без фильтров показывают
+# оценку числа строк из статистики базы вместо COUNT (reviews/admin.py).
+ADMIN_ESTIMATED_COUNT_FROM = int(
+    os.getenv('ADMIN_ESTIMATED_COUNT_FROM', 100000)
+)
+
+# Прогрев воркеров gunicorn перед первым запросом (api/warmup.py,
+# gunicorn.conf.py).
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'False') == 'True'
+
+# Замеры времени запросов (заголовок Server-Timing и лог api.performance).
+PERFORMANCE_TIMING = os.getenv('PERFORMANCE_TIMING', 'False') == 'True'
+# Сколько одинаковых SQL запросов за запрос считать признаком N+1.
+PERFORMANCE_DUPLICATE_QUERIES = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Конфигурация полнотекстового поиска PostgreSQL (reviews/search.py).
+SEARCH_CONFIG = 'russian'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
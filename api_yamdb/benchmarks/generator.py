@@ -0,0 +1,168 @@
+import random
+from datetime import datetime, timedelta
+
+from django.db.models import Max
+from reviews.aggregates import rebuild_aggregates
+from reviews.bulk import BulkLoader
+from reviews.models import (Category, Comment, CustomUser, Genre, GenreTitle,
+                            Review, Title)
+from reviews.search import rebuild_search_index
+
+WORDS = (
+    'звезда', 'ночь', 'город', 'море', 'дорога', 'тайна', 'война', 'мир',
+    'любовь', 'время', 'песня', 'сон', 'огонь', 'лес', 'дом', 'небо',
+    'star', 'night', 'city', 'road', 'secret', 'dream', 'fire', 'home',
+)
+
+
+class DatasetGenerator:
+    """Воспроизводимый синтетический набор данных заданного размера.
+
+    Популярность произведений распределена по закону Ципфа: небольшая
+    часть произведений собирает большинство отзывов, а комментарии
+    так же концентрируются на ранних отзывах популярных произведений.
+    Данные пишутся потоком через BulkLoader, поэтому объем не
+    ограничен памятью.
+    """
+
+    def __init__(self, users=2000, titles=1000, reviews=10000,
+                 comments=50000, genres=30, categories=10, skew=1.1,
+                 seed=42, batch_size=5000, stdout=None):
+        self.sizes = {
+            'users': users, 'titles': titles, 'reviews': reviews,
+            'comments': comments, 'genres': genres,
+            'categories': categories,
+        }
+        self.skew = skew
+        self.random = random.Random(seed)
+        self.loader = BulkLoader(batch_size=batch_size)
+        self.now = datetime(2023, 1, 1)
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def text(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(5 * 365 * 24 * 3600)
+        )
+
+    def first_id(self, model):
+        return (model.objects.aggregate(value=Max('pk'))['value'] or 0) + 1
+
+    def generate(self):
+        """Создает все таблицы, возвращает число строк по моделям."""
+        self.counts = {}
+        self.ids = {}
+        for model, rows in (
+            (CustomUser, self.users),
+            (Category, self.categories),
+            (Genre, self.genres),
+            (Title, self.titles),
+            (GenreTitle, self.genre_titles),
+            (Review, self.reviews),
+            (Comment, self.comments),
+        ):
+            self.ids[model] = self.first_id(model)
+            self.counts[model] = self.loader.load(model, rows())
+            self.log(f'{model._meta.db_table}: {self.counts[model]}')
+        self.loader.reset_sequences(list(self.counts))
+        rebuild_aggregates()
+        rebuild_search_index()
+        return {
+            model._meta.model_name: count
+            for model, count in self.counts.items()
+        }
+
+    def id_range(self, model):
+        start = self.ids[model]
+        return range(start, start + self.counts[model])
+
+    def users(self):
+        start = self.ids[CustomUser]
+        for number in range(self.sizes['users']):
+            pk = start + number
+            yield CustomUser(
+                id=pk, username=f'bench{pk}', email=f'bench{pk}@yamdb.fake',
+                confirmation_code=f'code{pk}', date_joined=self.now
+            )
+
+    def categories(self):
+        start = self.ids[Category]
+        for number in range(self.sizes['categories']):
+            pk = start + number
+            yield Category(id=pk, name=f'Категория {pk}', slug=f'cat-{pk}')
+
+    def genres(self):
+        start = self.ids[Genre]
+        for number in range(self.sizes['genres']):
+            pk = start + number
+            yield Genre(id=pk, name=f'Жанр {pk}', slug=f'genre-{pk}')
+
+    def titles(self):
+        categories = self.id_range(Category)
+        start = self.ids[Title]
+        for number in range(self.sizes['titles']):
+            yield Title(
+                id=start + number,
+                name=self.text(self.random.randint(1, 4)).capitalize(),
+                description=self.text(self.random.randint(5, 30)),
+                year=self.random.randint(1900, 2022),
+                category_id=self.random.choice(categories),
+            )
+
+    def genre_titles(self):
+        genres = self.id_range(Genre)
+        pk = self.ids[GenreTitle]
+        for title_id in self.id_range(Title):
+            count = min(self.random.randint(1, 3), len(genres))
+            for genre_id in self.random.sample(genres, count):
+                yield GenreTitle(id=pk, title_id=title_id, genre_id=genre_id)
+                pk += 1
+
+    def review_counts(self):
+        """Число отзывов на каждое произведение по закону Ципфа.
+
+        Отзывов на произведение не больше, чем пользователей, так как
+        автор может оставить только один отзыв."""
+        titles = self.id_range(Title)
+        ranks = range(1, len(titles) + 1)
+        weights = [1 / rank ** self.skew for rank in ranks]
+        total = sum(weights)
+        users = self.counts[CustomUser]
+        for title_id, weight in zip(titles, weights):
+            count = round(self.sizes['reviews'] * weight / total)
+            yield title_id, min(count, users)
+
+    def reviews(self):
+        users = self.id_range(CustomUser)
+        pk = self.ids[Review]
+        for title_id, count in self.review_counts():
+            for author_id in self.random.sample(users, count):
+                yield Review(
+                    id=pk, title_id=title_id, author_id=author_id,
+                    text=self.text(self.random.randint(5, 50)),
+                    score=self.random.randint(1, 10), pub_date=self.date(),
+                )
+                pk += 1
+
+    def comments(self):
+        users = self.id_range(CustomUser)
+        reviews = self.id_range(Review)
+        if not reviews:
+            return
+        start = self.ids[Comment]
+        # Степенное смещение к первым отзывам (популярным произведениям).
+        power = 1 + self.skew
+        for number in range(self.sizes['comments']):
+            index = int(len(reviews) * self.random.random() ** power)
+            yield Comment(
+                id=start + number, review_id=reviews[index],
+                author_id=self.random.choice(users),
+                text=self.text(self.random.randint(3, 20)),
+                pub_date=self.date(),
+            )
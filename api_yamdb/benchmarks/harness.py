@@ -0,0 +1,239 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.urls import reverse
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Category, CustomUser, Genre, Review, Title
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Scenario:
+    """Тип запроса к API: метод, построитель URL и тела, вес в смеси."""
+
+    def __init__(self, name, method, build, weight=1, auth=False):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.weight = weight
+        self.auth = auth
+
+
+class Harness:
+    """Нагрузочный прогон по реальным маршрутам api/urls.py.
+
+    Запросы выполняются параллельно потоками через функцию send
+    (по умолчанию - HTTP через requests). Для каждого сценария
+    считаются пропускная способность и задержки p50/p95/p99.
+    """
+
+    def __init__(self, base_url='', concurrency=8, seed=42, send=None,
+                 sample_size=1000):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.send = send or self.http_send
+        self.sample_size = sample_size
+        self.local = threading.local()
+
+    def http_send(self, method, path, data=None, token=None):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = session.request(
+            method, self.base_url + path, json=data, headers=headers
+        )
+        return response.status_code
+
+    def load_fixtures(self):
+        """Случайные id и пользователи для построения запросов."""
+        def sample(queryset, field='pk'):
+            ids = list(queryset.order_by('-pk').values_list(
+                field, flat=True
+            )[:self.sample_size])
+            return ids or [None]
+
+        self.title_ids = sample(Title.objects)
+        self.title_pages = range(
+            1, max(Title.objects.count() - 1, 0) // api_settings.PAGE_SIZE + 2
+        )
+        self.reviews = list(Review.objects.order_by('-pk').values_list(
+            'title_id', 'pk'
+        )[:self.sample_size]) or [(None, None)]
+        self.genres = sample(Genre.objects, 'slug')
+        self.categories = sample(Category.objects, 'slug')
+        self.users = list(CustomUser.objects.exclude(
+            confirmation_code=None
+        ).order_by('-pk')[:self.sample_size])
+        self.tokens = [str(AccessToken.for_user(user)) for user in self.users]
+
+    def choice(self, values):
+        with self.lock:
+            return self.random.choice(values)
+
+    def scenarios(self):
+        def title_list():
+            params = self.choice((
+                '', f'?genre={self.choice(self.genres)}',
+                f'?category={self.choice(self.categories)}',
+                f'?year={self.choice(range(1950, 2023))}',
+                f'?page={self.choice(self.title_pages)}',
+            ))
+            return reverse('api:title-list') + params, None
+
+        def title_detail():
+            return reverse('api:title-detail', kwargs={
+                'pk': self.choice(self.title_ids)
+            }), None
+
+        def review_list():
+            return reverse('api:review-list', kwargs={
+                'title_id': self.choice(self.title_ids)
+            }), None
+
+        def comment_list():
+            title_id, review_id = self.choice(self.reviews)
+            return reverse('api:comment-list', kwargs={
+                'title_id': title_id, 'review_id': review_id
+            }), None
+
+        def signup():
+            number = self.choice(range(10 ** 9))
+            return '/api/v1/auth/signup/', {
+                'username': f'load{number}',
+                'email': f'load{number}@yamdb.fake',
+            }
+
+        def token():
+            user = self.choice(self.users)
+            return '/api/v1/auth/token/', {
+                'username': user.username,
+                'confirmation_code': user.confirmation_code,
+            }
+
+        def review_create():
+            return reverse('api:review-list', kwargs={
+                'title_id': self.choice(self.title_ids)
+            }), {'text': 'Нагрузочный отзыв', 'score': 7}
+
+        def comment_create():
+            title_id, review_id = self.choice(self.reviews)
+            return reverse('api:comment-list', kwargs={
+                'title_id': title_id, 'review_id': review_id
+            }), {'text': 'Нагрузочный комментарий'}
+
+        return [
+            Scenario('titles_list', 'GET', title_list, weight=30),
+            Scenario('title_detail', 'GET', title_detail, weight=20),
+            Scenario('reviews_list', 'GET', review_list, weight=20),
+            Scenario('comments_list', 'GET', comment_list, weight=15),
+            Scenario('auth_signup', 'POST', signup, weight=2),
+            Scenario('auth_token', 'POST', token, weight=3),
+            Scenario('review_create', 'POST', review_create, weight=5,
+                     auth=True),
+            Scenario('comment_create', 'POST', comment_create, weight=5,
+                     auth=True),
+        ]
+
+    def run(self, total=1000, duration=None, only=None):
+        """Выполняет прогон и возвращает отчет в виде словаря."""
+        self.load_fixtures()
+        scenarios = [
+            scenario for scenario in self.scenarios()
+            if not only or scenario.name in only
+        ]
+        if not self.tokens:
+            scenarios = [scenario for scenario in scenarios
+                         if not scenario.auth]
+        weights = [scenario.weight for scenario in scenarios]
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        deadline = time.monotonic() + duration if duration else None
+        remaining = [total]
+
+        def worker():
+            while True:
+                with self.lock:
+                    if deadline is None:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                    elif time.monotonic() >= deadline:
+                        return
+                    scenario = self.random.choices(scenarios, weights)[0]
+                path, data = scenario.build()
+                token = self.choice(self.tokens) if scenario.auth else None
+                started = time.perf_counter()
+                try:
+                    status = self.send(scenario.method, path, data, token)
+                except Exception:
+                    status = 'error'
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    latencies[scenario.name].append(elapsed * 1000)
+                    statuses[scenario.name][str(status)] += 1
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for _ in range(self.concurrency):
+                executor.submit(worker)
+        elapsed = time.monotonic() - started
+        return self.report(latencies, statuses, elapsed)
+
+    def report(self, latencies, statuses, elapsed):
+        endpoints = {}
+        for name, values in sorted(latencies.items()):
+            endpoints[name] = {
+                'requests': len(values),
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'statuses': dict(statuses[name]),
+            }
+        total = sum(len(values) for values in latencies.values())
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'base_url': self.base_url,
+            'concurrency': self.concurrency,
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+            'endpoints': endpoints,
+        }
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def compare_reports(current, baseline):
+    """Изменение p95 и пропускной способности относительно прошлого
+    прогона, по эндпоинтам."""
+    changes = {}
+    for name, metrics in current['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous:
+            changes[name] = {
+                'p95_ms': round(metrics['p95_ms'] - previous['p95_ms'], 2),
+                'throughput_rps': round(
+                    metrics['throughput_rps'] - previous['throughput_rps'], 2
+                ),
+            }
+    return changes
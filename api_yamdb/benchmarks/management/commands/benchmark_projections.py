@@ -0,0 +1,32 @@
+from benchmarks.projections import compare_paths
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость построения списков сериализаторами DRF '
+        'и через projection (api/projections.py).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size', type=int, action='append', dest='page_sizes',
+            help='Размер страницы (по умолчанию 10, 100 и 1000).'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        results = compare_paths(
+            page_sizes=options['page_sizes'] or (10, 100, 1000),
+            repeat=options['repeat'],
+        )
+        if not results:
+            self.stdout.write('Нет данных: создайте их generate_dataset.')
+        for result in results:
+            self.stdout.write(
+                f'{result["endpoint"]:<10} {result["page_size"]:>5}: '
+                f'сериализатор {result["serializer_rows_per_second"]:>8} '
+                f'строк/с, projection '
+                f'{result["projection_rows_per_second"]:>8} строк/с '
+                f'(x{result["speedup"]})'
+            )
@@ -0,0 +1,46 @@
+from benchmarks.generator import DatasetGenerator
+from django.core.management.base import BaseCommand, CommandError
+from reviews.bulk import Timer
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетический набор данных для нагрузочного '
+        'тестирования. При одинаковом --seed данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ('users', 2000), ('titles', 1000), ('reviews', 10000),
+            ('comments', 50000), ('genres', 30), ('categories', 10),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Число записей ({default} по умолчанию).'
+            )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель закона Ципфа для популярности произведений.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['titles'], options['genres'],
+               options['categories'], options['batch_size']) < 1:
+            raise CommandError(
+                'Размеры справочников и пакета должны быть положительными.'
+            )
+        generator = DatasetGenerator(
+            users=options['users'], titles=options['titles'],
+            reviews=options['reviews'], comments=options['comments'],
+            genres=options['genres'], categories=options['categories'],
+            skew=options['skew'], seed=options['seed'],
+            batch_size=options['batch_size'], stdout=self.stdout,
+        )
+        with Timer() as timer:
+            counts = generator.generate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {sum(counts.values())} '
+            f'за {timer.elapsed:.1f} с'
+        ))
@@ -0,0 +1,62 @@
+from benchmarks.startup import measure_startup
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет запуск приложения в новом процессе: время импорта '
+        'модулей (-X importtime), настройки Django и первого запроса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/api/v1/titles/',
+            help='URL первого запроса.'
+        )
+        parser.add_argument(
+            '--warmup', action='store_true',
+            help='Выполнить прогрев (api/warmup.py) перед запросами.'
+        )
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько самых долгих импортов показать.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = measure_startup(
+                options['path'], options['warmup'], cwd=settings.BASE_DIR
+            )
+        except RuntimeError as error:
+            raise CommandError(f'Приложение не запустилось:\n{error}')
+
+        imports = result['imports']
+        self.stdout.write(
+            f'Импорт модулей: {len(imports)}, по убыванию суммарного '
+            f'времени (собственное / суммарное, мс):'
+        )
+        slowest = sorted(
+            imports.items(), key=lambda item: item[1][1], reverse=True
+        )[:options['top']]
+        for module, (own, cumulative) in slowest:
+            self.stdout.write(
+                f'  {module:<50} {own * 1000:8.1f} {cumulative * 1000:8.1f}'
+            )
+        self.stdout.write(f'Настройка Django: {result["setup"] * 1000:.0f} мс')
+        if 'warmup' in result:
+            self.stdout.write(
+                f'Прогрев: {result["warmup"] * 1000:.0f} мс'
+            )
+        for name, title in (
+            ('first_request', 'Первый запрос'),
+            ('second_request', 'Второй запрос'),
+        ):
+            self.stdout.write(
+                f'{title}: {result[name] * 1000:.0f} мс '
+                f'(ответ {result[name + "_status"]})'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'До ответа на первый запрос: '
+            f'{(result["total"] - result["second_request"]) * 1000:.0f} мс'
+        ))
@@ -0,0 +1,74 @@
+import json
+
+from benchmarks.harness import Harness, compare_reports, save_report
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер запросами к API и сохраняет '
+        'пропускную способность и задержки p50/p95/p99 в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Адрес сервера.'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Общее число запросов.'
+        )
+        parser.add_argument(
+            '--duration', type=float,
+            help='Длительность прогона в секундах (вместо --requests).'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запускать только указанные сценарии.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл для результатов.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Результаты прошлого прогона для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency должен быть положительным.')
+        harness = Harness(
+            base_url=options['url'], concurrency=options['concurrency'],
+            seed=options['seed'],
+        )
+        report = harness.run(
+            total=options['requests'], duration=options['duration'],
+            only=options['scenarios'],
+        )
+        save_report(report, options['output'])
+
+        changes = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                changes = compare_reports(report, json.load(file))
+        for name, metrics in report['endpoints'].items():
+            line = (
+                f'{name}: {metrics["throughput_rps"]} rps, '
+                f'p50 {metrics["p50_ms"]} мс, p95 {metrics["p95_ms"]} мс, '
+                f'p99 {metrics["p99_ms"]} мс'
+            )
+            if name in changes:
+                line += (
+                    f' (p95 {changes[name]["p95_ms"]:+} мс, '
+                    f'{changes[name]["throughput_rps"]:+} rps)'
+                )
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {report["requests"]} запросов, '
+            f'{report["throughput_rps"]} rps. '
+            f'Результаты сохранены в {options["output"]}'
+        ))
@@ -0,0 +1,64 @@
+import time
+
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Comment, Review
+
+# Эндпоинт, view и queryset списка, как их строит view.
+ENDPOINTS = (
+    ('titles', TitleViewSet, lambda: TitleViewSet.queryset.all()),
+    ('reviews', ReviewViewSet,
+     lambda: Review.objects.order_by('-pub_date', '-id')),
+    ('comments', CommentViewSet,
+     lambda: Comment.objects.order_by('-pub_date', '-id')),
+)
+
+
+def serializer_path(view, queryset):
+    serializer_class = getattr(view, 'serializer_class', None)
+    if serializer_class is None:
+        serializer_class = view.projection.serializer_class
+    return JSONRenderer().render(
+        serializer_class(list(queryset), many=True).data
+    )
+
+
+def projection_path(view, queryset):
+    projection = view.projection
+    return JSONRenderer().render(
+        projection.represent(projection.values(queryset))
+    )
+
+
+def measure(path, view, queryset, repeat):
+    """Лучшее из repeat время построения ответа, в секундах."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        path(view, queryset)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare_paths(page_sizes=(10, 100, 1000), repeat=5):
+    """Строк в секунду у сериализаторов и projection на страницах
+    разного размера, на данных текущей базы (включая запросы)."""
+    results = []
+    for name, view, get_queryset in ENDPOINTS:
+        for size in page_sizes:
+            page = get_queryset()[:size]
+            rows = page.count()
+            if not rows:
+                continue
+            serializer = measure(serializer_path, view, page, repeat)
+            projection = measure(projection_path, view, page, repeat)
+            results.append({
+                'endpoint': name,
+                'page_size': size,
+                'rows': rows,
+                'serializer_rows_per_second': round(rows / serializer),
+                'projection_rows_per_second': round(rows / projection),
+                'speedup': round(serializer / projection, 2),
+            })
+    return results
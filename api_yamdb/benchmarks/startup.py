@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+
+# Выполняется в отдельном интерпретаторе с -X importtime: импорт
+# приложения как в gunicorn, затем два запроса тестовым клиентом.
+SCRIPT = '''
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+from api_yamdb.wsgi import application
+result = {'setup': time.perf_counter() - started}
+if sys.argv[2] == 'warmup':
+    from api.warmup import warm_up
+    moment = time.perf_counter()
+    result['warmup_steps'] = warm_up()
+    result['warmup'] = time.perf_counter() - moment
+from django.conf import settings
+from django.test import Client
+hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+client = Client(
+    REMOTE_ADDR='startup', HTTP_HOST=(hosts or ['localhost'])[0].lstrip('.')
+)
+for name in ('first_request', 'second_request'):
+    moment = time.perf_counter()
+    try:
+        result[name + '_status'] = client.get(sys.argv[1]).status_code
+    except Exception as error:
+        result[name + '_status'] = repr(error)
+    result[name] = time.perf_counter() - moment
+result['total'] = time.perf_counter() - started
+print(json.dumps(result))
+'''
+
+
+def parse_importtime(output):
+    """Строки '-X importtime' -> {модуль: (собственное, суммарное)}
+    в секундах."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        module = fields[2].strip()
+        modules[module] = (
+            int(fields[0]) / 1e6, int(fields[1]) / 1e6
+        )
+    return modules
+
+
+def measure_startup(path='/api/v1/titles/', warmup=False, cwd=None):
+    """Запускает приложение в новом процессе и возвращает время
+    импорта модулей, настройки Django и первых запросов."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, path,
+         'warmup' if warmup else 'cold'],
+        capture_output=True, text=True, cwd=cwd or os.getcwd(),
+        env={**os.environ, 'PYTHONPATH': cwd or os.getcwd()},
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr[-2000:])
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(process.stderr)
+    return result
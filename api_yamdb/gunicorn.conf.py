@@ -0,0 +1,53 @@
+# Настройки gunicorn; файл подхватывается автоматически из рабочего
+# каталога (/app в контейнере).
+import os
+
+# Загрузка приложения в мастере до fork: воркеры стартуют с уже
+# импортированными модулями.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False') == 'True'
+
+
+def on_starting(server):
+    # Версии кеша, корзины ограничения запросов и закрепление за
+    # основной базой должны быть общими для всех воркеров.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    from django.conf import settings
+
+    # Хранилище в базе или в файлах добавляло бы запросы к каждому
+    # обращению к API, поэтому нужен Redis или memcached.
+    backend = settings.CACHES[settings.SHARED_CACHE_ALIAS]['BACKEND']
+    if server.cfg.workers > 1 and not backend.endswith(
+        ('RedisCache', 'MemcachedCache', 'PyLibMCCache')
+    ):
+        raise RuntimeError(
+            f'Хранилище {backend} не подходит как общее для '
+            f'{server.cfg.workers} воркеров: укажите в SHARED_CACHE_BACKEND '
+            'Redis или memcached.'
+        )
+
+
+def when_ready(server):
+    from django.conf import settings
+
+    if preload_app and settings.WARMUP_ON_START:
+        from api.warmup import warm_up
+
+        # Без обращений к базе: соединения не должны наследоваться
+        # воркерами.
+        log_warmup(server.log, 'мастер', warm_up(database=False))
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if settings.WARMUP_ON_START:
+        from api.warmup import warm_up
+
+        log_warmup(worker.log, f'воркер {worker.pid}', warm_up())
+
+
+def log_warmup(log, name, timings):
+    log.info('Прогрев (%s): %s', name, ', '.join(
+        f'{step} {duration * 1000:.0f} мс'
+        for step, duration in timings.items()
+    ))
@@ -1,11 +1,108 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
 
 from .models import (
-    CustomUser, Genre, Category, Title, Review, Comment)
+    CustomUser, Genre, Category, Title, Review, Comment, OutgoingEmail)
+
+
+def estimate_count(queryset):
+    """Число строк таблицы по статистике базы (pg_class.reltuples,
+    sqlite_stat1 после ANALYZE) или None, если статистики нет."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списков админки: для списка без фильтров и поиска
+    по большой таблице число строк берется из статистики базы, а не
+    COUNT по всей таблице. Оценка приблизительна, поэтому последние
+    страницы могут быть неполными."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_count(self.object_list)
+            if (estimate is not None
+                    and estimate >= settings.ADMIN_ESTIMATED_COUNT_FROM):
+                return estimate
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """Базовая админка: без второго COUNT по всей таблице
+    (show_full_result_count) и с оценкой числа строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class SelectedObjectFilter(admin.SimpleListFilter):
+    """Фильтр по связанному объекту, который не выводит в боковую
+    панель все объекты связанной таблицы: виден только выбранный
+    (?<parameter_name>=<id>), без параметра фильтра нет."""
+
+    related_model = None
+
+    def get_label(self, obj):
+        return str(obj)
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return ()
+        obj = self.related_model.objects.filter(pk=value).first()
+        return ((value, self.get_label(obj) if obj else value),)
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(**{self.parameter_name: value})
+        return queryset
+
+
+class AuthorFilter(SelectedObjectFilter):
+    title = 'Автор'
+    parameter_name = 'author'
+    related_model = CustomUser
+
+
+class TitleObjectFilter(SelectedObjectFilter):
+    title = 'Произведение'
+    parameter_name = 'title'
+    related_model = Title
+
+
+class ReviewObjectFilter(SelectedObjectFilter):
+    title = 'Обзор'
+    parameter_name = 'review'
+    related_model = Review
+
+    def get_label(self, obj):
+        return f'#{obj.pk}'
 
 
 @admin.register(CustomUser)
-class UserClass(admin.ModelAdmin):
+class UserClass(ScalableModelAdmin):
     """Админка юзеров."""
 
     list_display = (
@@ -45,7 +142,7 @@ class UserClass(admin.ModelAdmin):
 
 
 @admin.register(Genre)
-class GenreClass(admin.ModelAdmin):
+class GenreClass(ScalableModelAdmin):
     """Админка жанров."""
 
     list_display = (
@@ -62,7 +159,7 @@ class GenreClass(admin.ModelAdmin):
 
 
 @admin.register(Category)
-class CategoryClass(admin.ModelAdmin):
+class CategoryClass(ScalableModelAdmin):
     """Админка категорий."""
 
     list_display = (
@@ -79,7 +176,7 @@ class CategoryClass(admin.ModelAdmin):
 
 
 @admin.register(Title)
-class TitleClass(admin.ModelAdmin):
+class TitleClass(ScalableModelAdmin):
     """Админка произведений."""
 
     list_display = (
@@ -88,7 +185,9 @@ class TitleClass(admin.ModelAdmin):
         'description',
         'year',
         'category',
+        'rating',
     )
+    list_select_related = ('category',)
     list_filter = (
         'year',
         'category',
@@ -99,16 +198,13 @@ class TitleClass(admin.ModelAdmin):
         'description',
         'year',
     )
-    search_fields = (
-        'year',
-        'category',
-        'genre',
-    )
+    search_fields = ('name',)
+    autocomplete_fields = ('category',)
     empty_value_display = '-пусто-'
 
 
 @admin.register(Review)
-class ReviewClass(admin.ModelAdmin):
+class ReviewClass(ScalableModelAdmin):
     """Админка обзоров."""
 
     list_display = (
@@ -119,22 +215,20 @@ class ReviewClass(admin.ModelAdmin):
         'score',
         'pub_date',
     )
+    list_select_related = ('author',)
     list_filter = (
-        'title_id',
-        'author',
+        TitleObjectFilter,
+        AuthorFilter,
         'pub_date',
     )
     list_editable = ('text',)
-    search_fields = (
-        'title',
-        'author',
-        'pub_date',
-    )
+    search_fields = ('=author__username',)
+    autocomplete_fields = ('title', 'author')
     empty_value_display = '-пусто-'
 
 
 @admin.register(Comment)
-class CommentClass(admin.ModelAdmin):
+class CommentClass(ScalableModelAdmin):
     """Админка комментов."""
 
     list_display = (
@@ -144,15 +238,34 @@ class CommentClass(admin.ModelAdmin):
         'author',
         'pub_date',
     )
+    # Обзор в списке выводится с автором и произведением.
+    list_select_related = ('author', 'review__author', 'review__title')
     list_filter = (
-        'review',
-        'author',
+        ReviewObjectFilter,
+        AuthorFilter,
         'pub_date',
     )
     list_editable = ('text',)
-    search_fields = (
-        'review',
-        'author',
-        'pub_date',
+    search_fields = ('=author__username',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('review',)
+    empty_value_display = '-пусто-'
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailClass(ScalableModelAdmin):
+    """Админка очереди писем."""
+
+    list_display = (
+        'pk',
+        'to',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt',
+        'sent_at',
     )
+    list_filter = ('status',)
+    search_fields = ('to',)
+    readonly_fields = ('created', 'sent_at', 'last_error')
     empty_value_display = '-пусто-'
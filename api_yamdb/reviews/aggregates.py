@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models import (Case, Count, ExpressionWrapper, F, IntegerField,
+                              OuterRef, Q, Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce
+
+from .genre_index import assign_bits, rebuild_masks
+from .models import Comment, Review, Title
+from .stats import mark_stale, refresh_stats
+
+
+def _rating(score_sum, reviews_count, empty):
+    """Средний рейтинг (целая часть), 0 если отзывов нет."""
+    return Case(
+        When(empty, then=Value(0)),
+        default=ExpressionWrapper(
+            score_sum / reviews_count,
+            output_field=IntegerField()
+        ),
+        output_field=IntegerField()
+    )
+
+
+def apply_rating_delta(title_id, score_delta, count_delta):
+    """Сдвигает сумму оценок и число отзывов произведения на дельту.
+
+    Обновление выполняется одним UPDATE с F-выражениями, поэтому
+    конкурентные отзывы не перетирают друг друга. Рейтинг считается
+    в том же запросе по новым значениям агрегатов. Статистика жанров
+    и категорий произведения помечается для пересчета.
+    """
+    new_sum = F('rating_sum') + score_delta
+    new_count = F('reviews_count') + count_delta
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=new_sum,
+        reviews_count=new_count,
+        rating=_rating(new_sum, new_count, Q(reviews_count=-count_delta))
+    )
+    mark_stale(titles=[title_id])
+
+
+def rebuild_ratings(titles=None):
+    """Пересчитывает агрегаты рейтинга с нуля по таблице отзывов."""
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    score_sum = reviews.annotate(value=Sum('score')).values('value')
+    reviews_count = reviews.annotate(value=Count('pk')).values('value')
+
+    with transaction.atomic():
+        titles.update(
+            rating_sum=Coalesce(
+                Subquery(score_sum, output_field=IntegerField()), 0
+            ),
+            reviews_count=Coalesce(
+                Subquery(reviews_count, output_field=IntegerField()), 0
+            )
+        )
+        return titles.update(rating=_rating(
+            F('rating_sum'), F('reviews_count'), Q(reviews_count=0)
+        ))
+
+
+def recalculate_rating(title_id):
+    """Пересчитывает агрегаты рейтинга одного произведения."""
+    rebuild_ratings(Title.objects.filter(pk=title_id))
+    mark_stale(titles=[title_id])
+
+
+def apply_comments_delta(review_id, delta):
+    """Сдвигает число комментариев отзыва одним UPDATE с F-выражением.
+    Если отзыв уже удален (каскадное удаление), запрос ничего
+    не меняет."""
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def rebuild_comment_counts(reviews=None):
+    """Пересчитывает число комментариев отзывов с нуля."""
+    if reviews is None:
+        reviews = Review.objects.all()
+    comments_count = Comment.objects.filter(
+        review=OuterRef('pk')
+    ).order_by().values('review').annotate(value=Count('pk')).values('value')
+    return reviews.update(comments_count=Coalesce(
+        Subquery(comments_count, output_field=IntegerField()), 0
+    ))
+
+
+def rebuild_aggregates():
+    """Полный пересчет всех хранимых агрегатов."""
+    assign_bits()
+    return {
+        'titles': rebuild_ratings(),
+        'titles_genre_mask': rebuild_masks(),
+        'reviews': rebuild_comment_counts(),
+        **refresh_stats(full=True),
+    }
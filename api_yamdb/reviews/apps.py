@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReviewsConfig(AppConfig):
     name = 'reviews'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .genre_index import ensure_genre_index
+        from .search import ensure_search_indexes
+
+        post_migrate.connect(
+            lambda using, **kwargs: ensure_search_indexes(using),
+            sender=self,
+            weak=False
+        )
+        post_migrate.connect(
+            lambda using, **kwargs: ensure_genre_index(using),
+            sender=self,
+            weak=False
+        )
@@ -0,0 +1,107 @@
+import io
+import time
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+
+def batches(iterable, size):
+    """Разбивает поток на списки не длиннее size, не читая его целиком."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _copy_value(value):
+    """Значение для COPY ... (FORMAT csv): NULL - пустое поле без
+    кавычек, строки всегда в кавычках, чтобы отличать '' от NULL."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+class BulkLoader:
+    """Пакетная вставка объектов моделей в обход save() и сигналов.
+
+    Объекты вставляются в режиме raw, как при loaddata: значения полей
+    (в том числе auto_now_add) пишутся как есть. Каждый пакет
+    вставляется в своей транзакции. На PostgreSQL используется COPY,
+    на остальных СУБД - многострочные INSERT.
+    """
+
+    def __init__(self, batch_size=5000, using='default', use_copy=True):
+        self.batch_size = batch_size
+        self.using = using
+        self.connection = connections[using]
+        self.use_copy = use_copy and self.connection.vendor == 'postgresql'
+
+    def load(self, model, objects):
+        """Вставляет поток объектов с заданными pk, возвращает
+        число строк."""
+        fields = model._meta.concrete_fields
+        total = 0
+        for batch in batches(objects, self.batch_size):
+            with transaction.atomic(using=self.using):
+                if self.use_copy:
+                    self._copy(model, fields, batch)
+                else:
+                    self._insert(model, fields, batch)
+            total += len(batch)
+        return total
+
+    def _insert(self, model, fields, batch):
+        size = self.connection.ops.bulk_batch_size(fields, batch)
+        for chunk in batches(batch, max(size, 1)):
+            model._base_manager._insert(
+                chunk, fields=fields, raw=True, using=self.using
+            )
+
+    def _copy(self, model, fields, batch):
+        quote = self.connection.ops.quote_name
+        buffer = io.StringIO()
+        for obj in batch:
+            buffer.write(','.join(
+                _copy_value(field.get_db_prep_save(
+                    getattr(obj, field.attname), self.connection
+                ))
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+        sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields)
+        )
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
+
+    def reset_sequences(self, models):
+        """Сдвигает последовательности pk после вставки явных id."""
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), models
+        )
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+class Timer:
+    """Замер времени загрузки таблицы для отчета строк в секунду."""
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.monotonic() - self.started
+
+    def rate(self, rows):
+        return rows / self.elapsed if self.elapsed else float(rows)
@@ -0,0 +1,223 @@
+"""Индекс жанров произведений: фильтр по нескольким жанрам сводится
+к условию на колонку самого произведения, без join с GenreTitle и без
+повторяющихся строк.
+
+PostgreSQL: массив id жанров в колонке reviews_title.genre_ids
+с GIN-индексом; все жанры - genre_ids @> ids, любой - genre_ids && ids.
+Колонка и индекс создаются после migrate (ensure_genre_index), как
+индексы полнотекстового поиска, и число жанров не ограничено.
+
+Остальные СУБД: битовая маска Title.genre_mask. Каждому жанру
+назначается свой бит (Genre.mask_bit - степень двойки), маска
+произведения - сумма битов его жанров: все жанры -
+genre_mask & mask = mask, любой - genre_mask & mask <> 0. Битов
+MASK_BITS (знаковый bigint); жанры сверх этого числа остаются без
+бита и фильтруются подзапросом по GenreTitle.
+
+Индекс поддерживается инкрементально: добавление связи - UPDATE
+с объединением, удаление - пересчет по связям произведения.
+"""
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import BigIntegerField, F, Func, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Genre, GenreTitle, Title
+
+MASK_BITS = 63
+ARRAY_COLUMN = 'genre_ids'
+
+ALL = 'all'
+ANY = 'any'
+MODES = (ALL, ANY)
+
+
+def uses_genre_array(write=False):
+    """Массив id жанров (PostgreSQL) вместо битовой маски."""
+    route = router.db_for_write if write else router.db_for_read
+    return connections[route(Title)].vendor == 'postgresql'
+
+
+# PostgreSQL: массив id жанров с GIN-индексом.
+
+def _quoted(connection):
+    quote = connection.ops.quote_name
+    return quote(Title._meta.db_table), quote(ARRAY_COLUMN)
+
+
+def ensure_genre_index(using='default'):
+    """Создает колонку genre_ids с GIN-индексом на PostgreSQL и
+    заполняет ее, если колонки еще не было."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    table, column = _quoted(connection)
+    index = connection.ops.quote_name(Title._meta.db_table + '_genre_idx')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM information_schema.columns '
+            'WHERE table_schema = current_schema() '
+            'AND table_name = %s AND column_name = %s',
+            [Title._meta.db_table, ARRAY_COLUMN]
+        )
+        created = cursor.fetchone() is None
+        if created:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} integer[] "
+                f"NOT NULL DEFAULT '{{}}'"
+            )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index} '
+            f'ON {table} USING gin ({column})'
+        )
+    if created:
+        _rebuild_arrays(Title.objects.using(using).all(), connection)
+
+
+def _add_to_arrays(title_ids, genre_ids):
+    title_ids, genre_ids = list(title_ids), list(genre_ids)
+    if not title_ids or not genre_ids:
+        return
+    connection = connections[router.db_for_write(Title)]
+    table, column = _quoted(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET {column} = ARRAY('
+            f'SELECT DISTINCT unnest({column} || %s::integer[]) ORDER BY 1'
+            f') WHERE id = ANY(%s::integer[])',
+            [genre_ids, title_ids]
+        )
+
+
+def _rebuild_arrays(titles, connection=None):
+    connection = connection or connections[router.db_for_write(Title)]
+    table, column = _quoted(connection)
+    links = connection.ops.quote_name(GenreTitle._meta.db_table)
+    sql, params = titles.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET {column} = ARRAY('
+            f'SELECT DISTINCT genre_id FROM {links} '
+            f'WHERE title_id = {table}.id ORDER BY genre_id'
+            f') WHERE id IN ({sql})',
+            params
+        )
+        return cursor.rowcount
+
+
+def _filter_arrays(queryset, genre_ids, mode):
+    table, column = _quoted(connections[queryset.db])
+    operator = '@>' if mode == ALL else '&&'
+    return queryset.extra(
+        where=[f'{table}.{column} {operator} %s::integer[]'],
+        params=[sorted(genre_ids)]
+    )
+
+
+# Остальные СУБД: битовая маска.
+
+def combined_mask(genre_ids):
+    """Сумма битов жанров; жанры без бита не учитываются."""
+    return sum(Genre.objects.filter(
+        pk__in=genre_ids, mask_bit__isnull=False
+    ).values_list('mask_bit', flat=True).distinct())
+
+
+def add_genres(title_ids, genre_ids):
+    """Добавляет жанры в индекс произведений одним UPDATE."""
+    if uses_genre_array(write=True):
+        _add_to_arrays(title_ids, genre_ids)
+        return
+    mask = combined_mask(genre_ids)
+    if mask:
+        Title.objects.filter(pk__in=title_ids).update(
+            genre_mask=F('genre_mask').bitor(mask)
+        )
+
+
+def rebuild_masks(titles=None):
+    """Пересчитывает индекс жанров произведений по связям."""
+    if titles is None:
+        titles = Title.objects.all()
+    if uses_genre_array(write=True):
+        return _rebuild_arrays(titles)
+    # У разных жанров разные биты, поэтому сумма различных битов
+    # равна их побитовому OR, а повторные связи не учитываются.
+    # SUM без GROUP BY возвращает одну строку.
+    mask = GenreTitle.objects.filter(
+        title=OuterRef('pk'), genre__mask_bit__isnull=False
+    ).order_by().values(value=Func(
+        F('genre__mask_bit'), function='SUM',
+        template='%(function)s(DISTINCT %(expressions)s)'
+    ))
+    return titles.update(genre_mask=Coalesce(
+        Subquery(mask, output_field=BigIntegerField()), 0
+    ))
+
+
+def assign_bits():
+    """Назначает свободные биты жанрам без бита и добавляет их
+    в маски уже связанных с жанрами произведений. На PostgreSQL
+    биты не нужны."""
+    if uses_genre_array(write=True):
+        return 0
+    used = set(Genre.objects.filter(
+        mask_bit__isnull=False
+    ).values_list('mask_bit', flat=True))
+    free = [1 << bit for bit in range(MASK_BITS) if 1 << bit not in used]
+    genre_ids = Genre.objects.filter(
+        mask_bit__isnull=True
+    ).order_by('pk').values_list('pk', flat=True)[:len(free)]
+    assigned = 0
+    for genre_id, mask_bit in zip(list(genre_ids), free):
+        try:
+            with transaction.atomic():
+                updated = Genre.objects.filter(
+                    pk=genre_id, mask_bit__isnull=True
+                ).update(mask_bit=mask_bit)
+        except IntegrityError:
+            # Бит занят параллельным назначением; жанр получит
+            # другой при следующем вызове.
+            continue
+        if updated:
+            assigned += 1
+            Title.objects.filter(genre=genre_id).update(
+                genre_mask=F('genre_mask').bitor(mask_bit)
+            )
+    return assigned
+
+
+def filter_titles(queryset, slugs, mode=ALL):
+    """Произведения со всеми (ALL) или хотя бы одним (ANY) жанром
+    из slugs. id и биты жанров выбираются одним запросом к таблице
+    жанров.
+    """
+    slugs = set(slugs)
+    genres = dict(Genre.objects.filter(
+        slug__in=slugs
+    ).values_list('pk', 'mask_bit'))
+    if not genres or (mode == ALL and len(genres) < len(slugs)):
+        return queryset.none()
+    if uses_genre_array():
+        return _filter_arrays(queryset, genres, mode)
+    mask = sum(mask_bit for mask_bit in genres.values() if mask_bit)
+    unindexed = [pk for pk, mask_bit in genres.items() if not mask_bit]
+    if mask:
+        queryset = queryset.annotate(
+            genre_match=F('genre_mask').bitand(mask)
+        )
+    if mode == ALL:
+        if mask:
+            queryset = queryset.filter(genre_match=mask)
+        for genre_id in unindexed:
+            queryset = queryset.filter(pk__in=GenreTitle.objects.filter(
+                genre_id=genre_id
+            ).values('title_id'))
+        return queryset
+    condition = Q()
+    if mask:
+        condition |= ~Q(genre_match=0)
+    if unindexed:
+        condition |= Q(pk__in=GenreTitle.objects.filter(
+            genre_id__in=unindexed
+        ).values('title_id'))
+    return queryset.filter(condition)
@@ -0,0 +1,141 @@
+import csv
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from reviews.aggregates import rebuild_aggregates
+from reviews.bulk import BulkLoader, Timer
+from reviews.models import (Category, Comment, CustomUser, Genre, GenreTitle,
+                            Review, Title)
+from reviews.search import rebuild_search_index
+
+# Файл, модель, соответствие "колонка CSV - поле модели" и внешние ключи,
+# которые проверяются по уже загруженным id родительских таблиц.
+TABLES = (
+    ('users.csv', CustomUser, {
+        'id': 'id', 'username': 'username', 'email': 'email',
+        'role': 'role', 'bio': 'bio', 'first_name': 'first_name',
+        'last_name': 'last_name',
+    }, {}),
+    ('category.csv', Category, {
+        'id': 'id', 'name': 'name', 'slug': 'slug',
+    }, {}),
+    ('genre.csv', Genre, {
+        'id': 'id', 'name': 'name', 'slug': 'slug',
+    }, {}),
+    ('titles.csv', Title, {
+        'id': 'id', 'name': 'name', 'year': 'year', 'category': 'category_id',
+    }, {'category_id': Category}),
+    ('genre_title.csv', GenreTitle, {
+        'id': 'id', 'title_id': 'title_id', 'genre_id': 'genre_id',
+    }, {'title_id': Title, 'genre_id': Genre}),
+    ('review.csv', Review, {
+        'id': 'id', 'title_id': 'title_id', 'text': 'text',
+        'author': 'author_id', 'score': 'score', 'pub_date': 'pub_date',
+    }, {'title_id': Title, 'author_id': CustomUser}),
+    ('comments.csv', Comment, {
+        'id': 'id', 'review_id': 'review_id', 'text': 'text',
+        'author': 'author_id', 'pub_date': 'pub_date',
+    }, {'review_id': Review, 'author_id': CustomUser}),
+)
+PARENTS = {
+    parent for _, _, _, parents in TABLES for parent in parents.values()
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает данные из CSV пакетами (COPY на PostgreSQL), '
+        'затем сбрасывает последовательности и пересчитывает агрегаты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с CSV файлами.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Число строк в одном пакете (и одной транзакции).'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        loader = BulkLoader(
+            batch_size=options['batch_size'],
+            use_copy=not options['no_copy']
+        )
+        # id загруженных строк по моделям: по ним проверяются внешние
+        # ключи дочерних таблиц без запросов к базе.
+        self.known_ids = {}
+        for filename, model, columns, parents in TABLES:
+            path = os.path.join(options['path'], filename)
+            if not os.path.exists(path):
+                self.stdout.write(f'{filename}: файл не найден, пропущен')
+                continue
+            self.skipped = 0
+            with open(path, encoding='utf-8', newline='') as csvfile:
+                rows = csv.DictReader(csvfile)
+                with Timer() as timer:
+                    loaded = loader.load(
+                        model, self.read(rows, model, columns, parents)
+                    )
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.db_table}: {loaded} строк за '
+                f'{timer.elapsed:.2f} с ({timer.rate(loaded):.0f} строк/с), '
+                f'пропущено {self.skipped}'
+            ))
+
+        loader.reset_sequences([model for _, model, _, _ in TABLES])
+        rebuild_aggregates()
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            'Агрегаты и поисковый индекс пересчитаны.'
+        ))
+
+    def read(self, rows, model, columns, parents):
+        """Превращает строки CSV в объекты модели по одной, пропуская
+        строки со ссылками на отсутствующие записи."""
+        fields = {
+            attname: model._meta.get_field(attname)
+            for attname in columns.values()
+        }
+        # Проверяем только ссылки на таблицы, загруженные в этом запуске.
+        parents = {
+            attname: self.known_ids[parent]
+            for attname, parent in parents.items()
+            if parent in self.known_ids
+        }
+        known = None
+        if model in PARENTS:
+            known = self.known_ids[model] = set()
+        for row in rows:
+            values = {}
+            for column, attname in columns.items():
+                value = row[column]
+                field = fields[attname]
+                if value == '' and field.null:
+                    value = None
+                else:
+                    value = field.to_python(value)
+                if (isinstance(value, datetime) and not settings.USE_TZ
+                        and timezone.is_aware(value)):
+                    value = timezone.make_naive(value)
+                values[attname] = value
+            if any(
+                values[attname] is not None and values[attname] not in ids
+                for attname, ids in parents.items()
+            ):
+                self.skipped += 1
+                continue
+            if known is not None:
+                known.add(values['id'])
+            yield model(**values)
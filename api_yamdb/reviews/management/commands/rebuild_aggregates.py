@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from reviews.aggregates import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает хранимые агрегаты (рейтинги и маски жанров '
+        'произведений, число комментариев отзывов, статистику жанров '
+        'и категорий) с нуля.'
+    )
+
+    def handle(self, *args, **options):
+        for table, updated in rebuild_aggregates().items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{table}: пересчитано записей - {updated}'
+            ))
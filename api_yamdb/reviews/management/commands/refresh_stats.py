@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from reviews.stats import refresh_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает статистику жанров и категорий, помеченную '
+        'устаревшей; с --full - всю статистику.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать статистику всех жанров и категорий.'
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Работать постоянно, пересчитывая раз в столько секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] is None:
+            self.refresh(options['full'])
+            return
+        self.stopped = False
+
+        def stop(signum, frame):
+            self.stopped = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        full = options['full']
+        while not self.stopped:
+            self.refresh(full)
+            full = False
+            connection.close()
+            time.sleep(options['interval'])
+
+    def refresh(self, full):
+        for table, refreshed in refresh_stats(full=full).items():
+            if refreshed or full:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{table}: пересчитано записей - {refreshed}'
+                ))
@@ -0,0 +1,90 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from reviews.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди. По умолчанию работает постоянно, '
+        'опрашивая очередь; с --once отправляет готовые письма и выходит.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Отправить письма, готовые к отправке, и завершиться.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Писем в одном пакете.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунд.'
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=5,
+            help='Попыток отправки одного письма.'
+        )
+        parser.add_argument(
+            '--backoff', type=float, default=30,
+            help='Задержка перед первой повторной попыткой, секунд.'
+        )
+        parser.add_argument(
+            '--claim-timeout', type=float, default=600,
+            help='Через сколько секунд письма пакета, не отмеченные '
+                 'воркером (например, после его падения), отправляются '
+                 'повторно.'
+        )
+        parser.add_argument(
+            '--stats-interval', type=float, default=60,
+            help='Как часто выводить статистику очереди, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['max_attempts'] < 1:
+            raise CommandError(
+                '--batch-size и --max-attempts должны быть положительными.'
+            )
+        worker = OutboxWorker(
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+            backoff=options['backoff'],
+            claim_timeout=options['claim_timeout'],
+        )
+        try:
+            if options['once']:
+                worker.drain()
+            else:
+                self.run(worker, options)
+        finally:
+            worker.close()
+            self.report(worker)
+
+    def run(self, worker, options):
+        self.stopped = False
+
+        def stop(signum, frame):
+            self.stopped = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        reported = time.monotonic()
+        while not self.stopped:
+            if worker.drain() == 0:
+                # Соединение не держим открытым, пока очередь пуста.
+                worker.close()
+                time.sleep(options['interval'])
+            if time.monotonic() - reported >= options['stats_interval']:
+                self.report(worker)
+                reported = time.monotonic()
+
+    def report(self, worker):
+        stats = worker.stats()
+        self.stdout.write(
+            f'В очереди: {stats["pending"]}, отправлено: {stats["sent"]} '
+            f'({stats["sent_per_second"]:.1f} писем/с), '
+            f'повторов: {stats["retried"]}, ошибок: {stats["failed"]}'
+        )
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 from .validators import (
-    RegexUsernameValidator, validate_year, validate_username_not_me)
+    RegexUsernameValidator, validate_slug_not_reserved, validate_year,
+    validate_username_not_me)
 
 
 class CustomUser(AbstractUser):
@@ -52,6 +54,27 @@ class CustomUser(AbstractUser):
         return self.role == self.MODERATOR
 
 
+class StoredAggregatesMixin:
+    """Поля stored_aggregates меняются только запросами UPDATE
+    с F-выражениями (см. reviews/aggregates.py). Сохранение
+    существующей записи их не трогает: иначе значения, прочитанные
+    до сохранения, перетерли бы изменения, сделанные за это время."""
+
+    stored_aggregates = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.stored_aggregates
+            ]
+        super().save(*args, **kwargs)
+
+
 class CategoryGenreModel(models.Model):
     """Базовый класс для моделей Category и Genre."""
 
@@ -60,7 +83,8 @@ class CategoryGenreModel(models.Model):
         "Слаг",
         max_length=50,
         unique=True,
-        db_index=True
+        db_index=True,
+        validators=[validate_slug_not_reserved]
     )
 
     class Meta:
@@ -73,6 +97,16 @@ class CategoryGenreModel(models.Model):
 class Genre(CategoryGenreModel):
     """Модель для жанров произведений."""
 
+    # Бит жанра в Title.genre_mask (степень двойки), назначается
+    # при создании жанра; на PostgreSQL не используется
+    # (см. reviews/genre_index.py).
+    mask_bit = models.BigIntegerField(
+        'Бит в индексе жанров',
+        unique=True,
+        null=True,
+        editable=False
+    )
+
     class Meta:
         verbose_name = 'Жанр'
         verbose_name_plural = 'Жанры'
@@ -86,9 +120,13 @@ class Category(CategoryGenreModel):
         verbose_name_plural = 'Категории'
 
 
-class Title(models.Model):
+class Title(StoredAggregatesMixin, models.Model):
     """Модель произведений."""
 
+    stored_aggregates = (
+        'rating_sum', 'reviews_count', 'rating', 'genre_mask'
+    )
+
     name = models.TextField('Название произведения', db_index=True)
     description = models.TextField('Описание', null=True, blank=True)
     year = models.PositiveSmallIntegerField(
@@ -109,10 +147,61 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Жанр'
     )
+    # Агрегаты по отзывам хранятся в самой записи и обновляются
+    # инкрементально (см. reviews/aggregates.py), чтобы рейтинг
+    # читался без обращения к таблице отзывов.
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False
+    )
+    rating = models.PositiveSmallIntegerField(
+        'Рейтинг',
+        default=0,
+        editable=False
+    )
+    # Сумма битов жанров произведения: фильтр по нескольким жанрам
+    # без join с GenreTitle. На PostgreSQL вместо нее - массив id
+    # жанров с GIN-индексом (см. reviews/genre_index.py).
+    genre_mask = models.BigIntegerField(
+        'Битовая маска жанров',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        # Индексы сортировок списка (см. TitleViewSet): id в конце -
+        # это замыкающий ключ сортировки, поэтому индекс отдает строки
+        # в нужном порядке и для страниц с равными значениями.
+        indexes = [
+            models.Index(
+                fields=['-rating', 'name', 'id'],
+                name='title_rating_name_idx'
+            ),
+            models.Index(fields=['rating', 'id'], name='title_rating_idx'),
+            models.Index(fields=['year', 'id'], name='title_year_idx'),
+            models.Index(fields=['name', 'id'], name='title_name_idx'),
+            models.Index(
+                fields=['reviews_count', 'id'],
+                name='title_reviews_count_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем загруженную категорию: при ее смене статистика
+        прежней категории тоже устаревает (см. reviews/stats.py)."""
+        instance = super().from_db(db, field_names, values)
+        if 'category_id' in field_names:
+            instance._loaded_category_id = instance.category_id
+        return instance
 
     def __str__(self):
         return f'{self.name}, {self.year}'
@@ -139,9 +228,11 @@ class ReviewCommentModel(models.Model):
         ordering = ['-pub_date']
 
 
-class Review(ReviewCommentModel):
+class Review(StoredAggregatesMixin, ReviewCommentModel):
     """Модель для отзывов."""
 
+    stored_aggregates = ('comments_count',)
+
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -151,6 +242,14 @@ class Review(ReviewCommentModel):
         'Оценка',
         validators=[MinValueValidator(1), MaxValueValidator(10)]
     )
+    # Хранится в записи и обновляется инкрементально
+    # (см. reviews/aggregates.py): список отзывов показывает число
+    # комментариев без запросов к таблице комментариев.
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
     FIELDS_INFO = (
         'Текст: {text};'
         'Автор: {author};'
@@ -159,6 +258,15 @@ class Review(ReviewCommentModel):
         'Оценка: {score}.'
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем загруженные произведение и оценку, чтобы при
+        сохранении пересчитать рейтинг на разницу, а не целиком."""
+        instance = super().from_db(db, field_names, values)
+        if 'title_id' in field_names and 'score' in field_names:
+            instance._loaded_rating = (instance.title_id, instance.score)
+        return instance
+
     def __str__(self):
         return self.FIELDS_INFO.format(
             text=self.text,
@@ -178,6 +286,20 @@ class Review(ReviewCommentModel):
                 name='author_title_connection'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            ),
+            models.Index(
+                fields=['title', '-comments_count', '-id'],
+                name='review_title_comments_idx'
+            ),
+            models.Index(
+                fields=['title', '-score', '-id'],
+                name='review_title_score_idx'
+            ),
+        ]
 
 
 class Comment(ReviewCommentModel):
@@ -196,6 +318,15 @@ class Comment(ReviewCommentModel):
         'Обзор: {review}.'
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем загруженный отзыв, чтобы при переносе комментария
+        поправить число комментариев обоих отзывов."""
+        instance = super().from_db(db, field_names, values)
+        if 'review_id' in field_names:
+            instance._loaded_review_id = instance.review_id
+        return instance
+
     def __str__(self):
         return self.FIELDS_INFO.format(
             text=self.text,
@@ -208,6 +339,12 @@ class Comment(ReviewCommentModel):
         default_related_name = 'comments'
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
 
 
 class GenreTitle(models.Model):
@@ -224,3 +361,192 @@ class GenreTitle(models.Model):
 
     def __str__(self):
         return f'{self.genre} - {self.title}'
+
+
+class GroupStats(models.Model):
+    """Базовый класс предрассчитанной статистики жанра или категории.
+
+    Записи помечаются устаревшими при изменении отзывов, произведений
+    и их жанров и пересчитываются командой refresh_stats
+    (см. reviews/stats.py).
+    """
+
+    titles_count = models.PositiveIntegerField(
+        'Количество произведений',
+        default=0
+    )
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0
+    )
+    rating_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    top_titles = models.TextField(
+        'Лучшие произведения (JSON)',
+        default='[]'
+    )
+    dirty = models.BooleanField(
+        'Требует пересчета',
+        default=True,
+        db_index=True
+    )
+    updated = models.DateTimeField('Пересчитано', null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def group(self):
+        raise NotImplementedError
+
+    @property
+    def average_score(self):
+        """Средняя оценка по всем отзывам группы."""
+        if not self.reviews_count:
+            return None
+        return round(self.rating_sum / self.reviews_count, 2)
+
+    def __str__(self):
+        return f'{self.group}: {self.titles_count}'
+
+
+class GenreStats(GroupStats):
+    """Статистика жанра."""
+
+    genre = models.OneToOneField(
+        Genre,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Жанр'
+    )
+
+    class Meta(GroupStats.Meta):
+        verbose_name = 'Статистика жанра'
+        verbose_name_plural = 'Статистика жанров'
+
+    @property
+    def group(self):
+        return self.genre
+
+
+class CategoryStats(GroupStats):
+    """Статистика категории."""
+
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Категория'
+    )
+
+    class Meta(GroupStats.Meta):
+        verbose_name = 'Статистика категории'
+        verbose_name_plural = 'Статистика категорий'
+
+    @property
+    def group(self):
+        return self.category
+
+
+class SearchToken(models.Model):
+    """Обратный индекс для полнотекстового поиска на СУБД без
+    встроенного полнотекстового поиска (SQLite).
+
+    На PostgreSQL не заполняется: там используются GIN-индексы
+    по tsvector (см. reviews/search.py).
+    """
+
+    TITLE = 'title'
+    REVIEW = 'review'
+    KINDS = (
+        (TITLE, 'Произведение'),
+        (REVIEW, 'Отзыв'),
+    )
+
+    kind = models.CharField('Тип объекта', max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField('id объекта')
+    token = models.CharField('Слово', max_length=64)
+    weight = models.PositiveSmallIntegerField('Вес', default=1)
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        indexes = [
+            models.Index(
+                fields=['kind', 'token', 'object_id'],
+                name='search_token_idx'
+            ),
+            models.Index(
+                fields=['kind', 'object_id'],
+                name='search_object_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id} {self.token}'
+
+
+class OutgoingEmail(models.Model):
+    """Исходящее письмо в очереди отправки (см. reviews/outbox.py).
+
+    Письма отправляются фоновым процессом send_queued_emails, поэтому
+    запрос, поставивший письмо в очередь, не ждет почтовый сервер.
+    """
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    to = models.EmailField('Получатель', max_length=254)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток отправки', default=0)
+    next_attempt = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt'],
+                name='outgoing_email_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
+
+
+class ReplicationHeartbeat(models.Model):
+    """Отметка времени, которую периодически обновляет основная база.
+
+    По ее значению на реплике оценивается отставание реплики
+    (см. api_yamdb/replicas.py).
+    """
+
+    beat = models.DateTimeField('Отметка')
+
+    class Meta:
+        verbose_name = 'Отметка репликации'
+        verbose_name_plural = 'Отметки репликации'
+
+    def __str__(self):
+        return str(self.beat)
@@ -0,0 +1,130 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue_email(subject, body, to):
+    """Ставит письмо в очередь отправки."""
+    return OutgoingEmail.objects.create(subject=subject, body=body, to=to)
+
+
+class OutboxWorker:
+    """Отправляет письма из очереди пакетами через одно соединение
+    с почтовым сервером.
+
+    Пакет захватывается в короткой транзакции с
+    select_for_update(skip_locked=True): попытка засчитывается, а
+    следующая переносится на claim_timeout секунд, поэтому другие
+    воркеры пакет не берут. Письма отправляются уже вне транзакции,
+    и каждое отмечается отдельно: сбой посреди пакета не откатывает
+    отметки об уже доставленных письмах, а незавершенные письма
+    после claim_timeout берет следующий воркер.
+
+    Неудачная отправка повторяется с экспоненциальной задержкой
+    backoff * 2^n; после max_attempts попыток письмо помечается как
+    неотправленное.
+    """
+
+    def __init__(self, batch_size=100, max_attempts=5, backoff=30,
+                 claim_timeout=600):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.claim_timeout = claim_timeout
+        self.connection = None
+        self.started = time.monotonic()
+        self.sent = self.failed = self.retried = 0
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            finally:
+                self.connection = None
+
+    def claim_batch(self):
+        """Захватывает пакет готовых к отправке писем."""
+        now = timezone.now()
+        with transaction.atomic():
+            pks = list(OutgoingEmail.objects.select_for_update(
+                skip_locked=True
+            ).filter(
+                status=OutgoingEmail.PENDING,
+                next_attempt__lte=now
+            ).order_by('next_attempt', 'pk').values_list(
+                'pk', flat=True
+            )[:self.batch_size])
+            OutgoingEmail.objects.filter(pk__in=pks).update(
+                attempts=F('attempts') + 1,
+                next_attempt=now + timedelta(seconds=self.claim_timeout)
+            )
+        return list(OutgoingEmail.objects.filter(pk__in=pks).order_by('pk'))
+
+    def send_batch(self):
+        """Отправляет очередной пакет, возвращает число писем в нем."""
+        batch = self.claim_batch()
+        for email in batch:
+            self.deliver(email)
+            email.save(update_fields=(
+                'status', 'next_attempt', 'last_error', 'sent_at'
+            ))
+        return len(batch)
+
+    def deliver(self, email):
+        try:
+            EmailMessage(
+                email.subject, email.body, to=[email.to],
+                connection=self.get_connection()
+            ).send()
+        except Exception as error:
+            # Соединение могло оборваться: следующее письмо
+            # откроет новое.
+            self.close()
+            email.last_error = f'{type(error).__name__}: {error}'
+            if email.attempts >= self.max_attempts:
+                email.status = OutgoingEmail.FAILED
+                self.failed += 1
+            else:
+                email.next_attempt = timezone.now() + timedelta(
+                    seconds=self.backoff * 2 ** (email.attempts - 1)
+                )
+                self.retried += 1
+            return
+        email.status = OutgoingEmail.SENT
+        email.sent_at = timezone.now()
+        email.last_error = ''
+        self.sent += 1
+
+    def drain(self):
+        """Отправляет все готовые к отправке письма."""
+        total = 0
+        while True:
+            count = self.send_batch()
+            total += count
+            if count < self.batch_size:
+                return total
+
+    def stats(self):
+        """Глубина очереди и скорость отправки с запуска воркера."""
+        elapsed = time.monotonic() - self.started
+        return {
+            'pending': OutgoingEmail.objects.filter(
+                status=OutgoingEmail.PENDING
+            ).count(),
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'sent_per_second': self.sent / elapsed if elapsed else 0.0,
+        }
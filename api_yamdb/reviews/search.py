@@ -0,0 +1,176 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.expressions import RawSQL
+
+from .bulk import batches
+from .models import Review, SearchToken, Title
+
+TOKEN_RE = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+
+# Индексируемые поля и их веса. Для PostgreSQL веса переводятся
+# в классы A-D для setweight.
+DOCUMENTS = {
+    Title: (SearchToken.TITLE, (('name', 3, 'A'), ('description', 1, 'B'))),
+    Review: (SearchToken.REVIEW, (('text', 1, 'B'),)),
+}
+
+
+def uses_native_search(model):
+    db = router.db_for_read(model)
+    return connections[db].vendor == 'postgresql'
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре."""
+    return [
+        token[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) >= MIN_TOKEN_LENGTH
+    ]
+
+
+# PostgreSQL: tsvector по выражению и GIN-индекс по тому же выражению.
+# Индекс обновляется самой СУБД при любой записи в таблицу.
+
+def _document_sql(model, qualified=True):
+    """tsvector документа; в запросах колонки уточняются именем
+    таблицы (возможны join'ы), в определении индекса - нет."""
+    config = settings.SEARCH_CONFIG
+    prefix = ''
+    if qualified:
+        quote = connections['default'].ops.quote_name
+        prefix = quote(model._meta.db_table) + '.'
+    return ' || '.join(
+        f"setweight(to_tsvector('{config}', "
+        f"coalesce({prefix}{field}, '')), '{label}')"
+        for field, _, label in DOCUMENTS[model][1]
+    )
+
+
+def ensure_search_indexes(using='default'):
+    """Создает GIN-индексы полнотекстового поиска на PostgreSQL."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in DOCUMENTS:
+            table = model._meta.db_table
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS '
+                f'{quote(table + "_search_idx")} ON {quote(table)} '
+                f'USING gin (({_document_sql(model, qualified=False)}))'
+            )
+
+
+def _native_search(queryset, query):
+    document = _document_sql(queryset.model)
+    ts_query = f"plainto_tsquery('{settings.SEARCH_CONFIG}', %s)"
+    return queryset.extra(
+        where=[f'({document}) @@ {ts_query}'], params=[query]
+    ).annotate(
+        search_rank=RawSQL(f'ts_rank({document}, {ts_query})', (query,))
+    )
+
+
+# Остальные СУБД: обратный индекс в таблице SearchToken,
+# обновляется сигналами при сохранении и удалении объектов.
+
+def _object_tokens(instance):
+    kind, fields = DOCUMENTS[type(instance)]
+    weights = Counter()
+    for field, weight, _ in fields:
+        for token in tokenize(getattr(instance, field)):
+            weights[token] += weight
+    return [
+        SearchToken(
+            kind=kind, object_id=instance.pk, token=token, weight=weight
+        )
+        for token, weight in weights.items()
+    ]
+
+
+def index_objects(instances):
+    """Переиндексирует пакет объектов одной модели, например после
+    bulk_create, когда сигналы post_save не отправляются."""
+    instances = list(instances)
+    if not instances or uses_native_search(type(instances[0])):
+        return
+    kind = DOCUMENTS[type(instances[0])][0]
+    with transaction.atomic():
+        SearchToken.objects.filter(
+            kind=kind, object_id__in=[obj.pk for obj in instances]
+        ).delete()
+        SearchToken.objects.bulk_create(
+            token for obj in instances for token in _object_tokens(obj)
+        )
+
+
+def index_object(instance):
+    """Переиндексирует объект после сохранения."""
+    index_objects([instance])
+
+
+def unindex_object(instance):
+    """Удаляет объект из индекса."""
+    if uses_native_search(type(instance)):
+        return
+    SearchToken.objects.filter(
+        kind=DOCUMENTS[type(instance)][0], object_id=instance.pk
+    ).delete()
+
+
+def _indexed_search(queryset, query):
+    terms = set(tokenize(query))
+    if not terms:
+        return queryset.none()
+    # Объект подходит, если в нем есть все слова запроса;
+    # релевантность - сумма весов найденных слов.
+    matches = SearchToken.objects.filter(
+        kind=DOCUMENTS[queryset.model][0], token__in=terms
+    ).values('object_id').annotate(
+        matched=Count('token', distinct=True), rank=Sum('weight')
+    ).filter(matched=len(terms)).order_by()
+    return queryset.filter(
+        pk__in=matches.values('object_id')
+    ).annotate(search_rank=Subquery(
+        matches.filter(object_id=OuterRef('pk')).values('rank'),
+        output_field=IntegerField()
+    ))
+
+
+def search(queryset, query):
+    """Фильтрует queryset по поисковому запросу и сортирует по
+    релевантности, сохраняя прежний порядок для равных."""
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    if uses_native_search(queryset.model):
+        queryset = _native_search(queryset, query)
+    else:
+        queryset = _indexed_search(queryset, query)
+    return queryset.order_by('-search_rank', *ordering)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Полностью перестраивает поисковый индекс."""
+    if uses_native_search(Title):
+        ensure_search_indexes()
+        return 0
+    indexed = 0
+    with transaction.atomic():
+        SearchToken.objects.all().delete()
+        for model in DOCUMENTS:
+            objects = model.objects.only(
+                'pk', *(field for field, _, _ in DOCUMENTS[model][1])
+            ).order_by().iterator(chunk_size=batch_size)
+            for batch in batches(objects, batch_size):
+                SearchToken.objects.bulk_create(
+                    token for obj in batch for token in _object_tokens(obj)
+                )
+                indexed += len(batch)
+    return indexed
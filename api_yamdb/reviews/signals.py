@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .aggregates import (apply_comments_delta, apply_rating_delta,
+                         recalculate_rating)
+from .genre_index import add_genres, assign_bits, rebuild_masks
+from .models import Comment, Genre, GenreTitle, Review, Title
+from .search import index_object, unindex_object
+from .stats import mark_stale
+
+bulk_links = ContextVar('bulk_genre_links', default=False)
+
+
+@contextmanager
+def bulk_genre_links():
+    """Массовое изменение связей GenreTitle: построчные обработчики
+    связей не выполняются, индекс жанров и статистику вызывающий
+    обновляет сам одним запросом на все строки."""
+    token = bulk_links.set(True)
+    try:
+        yield
+    finally:
+        bulk_links.reset(token)
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    """Инкрементально обновляет рейтинг произведения после сохранения."""
+    loaded = getattr(instance, '_loaded_rating', None)
+    if created:
+        apply_rating_delta(instance.title_id, instance.score, 1)
+    elif loaded is None:
+        # Исходная оценка неизвестна (например, loaddata) -
+        # пересчитываем рейтинг произведения целиком.
+        recalculate_rating(instance.title_id)
+    else:
+        old_title_id, old_score = loaded
+        if old_title_id != instance.title_id:
+            apply_rating_delta(old_title_id, -old_score, -1)
+            apply_rating_delta(instance.title_id, instance.score, 1)
+        elif old_score != instance.score:
+            apply_rating_delta(
+                instance.title_id, instance.score - old_score, 0
+            )
+    instance._loaded_rating = (instance.title_id, instance.score)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    """Убирает оценку удаленного отзыва из рейтинга произведения."""
+    apply_rating_delta(instance.title_id, -instance.score, -1)
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count_on_save(sender, instance, created, **kwargs):
+    """Инкрементально обновляет число комментариев отзыва."""
+    loaded = getattr(instance, '_loaded_review_id', None)
+    if created:
+        apply_comments_delta(instance.review_id, 1)
+    elif loaded is not None and loaded != instance.review_id:
+        apply_comments_delta(loaded, -1)
+        apply_comments_delta(instance.review_id, 1)
+    instance._loaded_review_id = instance.review_id
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_count_on_delete(sender, instance, **kwargs):
+    """В том числе при каскадном удалении автора комментария."""
+    apply_comments_delta(instance.review_id, -1)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+def update_search_index(sender, instance, **kwargs):
+    """Поддерживает поисковый индекс в актуальном состоянии."""
+    index_object(instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+@receiver(post_save, sender=Title)
+def mark_stats_on_title_save(sender, instance, **kwargs):
+    """Название, год и категория произведения входят в статистику
+    его жанров и категорий (в том числе прежней категории)."""
+    loaded = getattr(instance, '_loaded_category_id', None)
+    moved = loaded is not None and loaded != instance.category_id
+    mark_stale(titles=[instance.pk], categories=[loaded] if moved else None)
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(pre_delete, sender=Title)
+def mark_stats_on_title_delete(sender, instance, **kwargs):
+    # До удаления, пока связи с жанрами еще существуют.
+    mark_stale(titles=[instance.pk])
+
+
+@receiver(post_save, sender=Genre)
+def assign_genre_bit(sender, instance, created, **kwargs):
+    if created:
+        assign_bits()
+
+
+@receiver(post_save, sender=GenreTitle)
+def update_genre_mask_on_link_save(sender, instance, **kwargs):
+    if bulk_links.get():
+        return
+    add_genres([instance.title_id], [instance.genre_id])
+
+
+@receiver(post_delete, sender=GenreTitle)
+def update_genre_mask_on_link_delete(sender, instance, **kwargs):
+    """Удаление связей (remove, clear, set, каскад) всегда проходит
+    через post_delete GenreTitle, поэтому m2m_changed нужен только
+    для добавления."""
+    if bulk_links.get():
+        return
+    rebuild_masks(Title.objects.filter(pk=instance.title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def update_genre_mask_on_genres_add(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        add_genres(pk_set, [instance.pk])
+    else:
+        add_genres([instance.pk], pk_set)
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def mark_stats_on_link_change(sender, instance, **kwargs):
+    if bulk_links.get():
+        return
+    mark_stale(genres=[instance.genre_id])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def mark_stats_on_genres_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            mark_stale(genres=[instance.pk])
+        else:
+            mark_stale(titles=[instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        mark_stale(genres=[instance.pk] if reverse else pk_set)
@@ -0,0 +1,124 @@
+import json
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import (Category, CategoryStats, Genre, GenreStats, GenreTitle,
+                     Title)
+
+# Сколько записей статистики пересчитывается за один проход.
+REFRESH_BATCH_SIZE = 500
+STATS_FIELDS = (
+    'titles_count', 'reviews_count', 'rating_sum', 'top_titles', 'updated'
+)
+
+
+def mark_stale(titles=None, genres=None, categories=None):
+    """Помечает статистику для пересчета.
+
+    titles - id или queryset произведений: устаревает статистика их
+    жанров и категорий. genres, categories - id жанров и категорий.
+    Уже помеченные записи не обновляются, чтобы частые изменения
+    не блокировали строки популярных жанров.
+    """
+    stale = []
+    if titles is not None:
+        stale.append(GenreStats.objects.filter(genre__titles__in=titles))
+        stale.append(
+            CategoryStats.objects.filter(category__titles__in=titles)
+        )
+    if genres:
+        stale.append(GenreStats.objects.filter(pk__in=genres))
+    if categories:
+        stale.append(CategoryStats.objects.filter(pk__in=categories))
+    for queryset in stale:
+        queryset.filter(dirty=False).update(dirty=True)
+
+
+def create_missing_stats():
+    """Создает записи статистики для новых жанров и категорий
+    (они сразу помечены для пересчета)."""
+    GenreStats.objects.bulk_create(
+        [GenreStats(genre_id=pk) for pk in Genre.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)],
+        ignore_conflicts=True
+    )
+    CategoryStats.objects.bulk_create(
+        [CategoryStats(category_id=pk) for pk in Category.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)],
+        ignore_conflicts=True
+    )
+
+
+def genre_totals(ids):
+    return GenreTitle.objects.filter(genre_id__in=ids).order_by().values_list(
+        'genre_id'
+    ).annotate(
+        Count('title_id'), Sum('title__reviews_count'),
+        Sum('title__rating_sum')
+    )
+
+
+def category_totals(ids):
+    return Title.objects.filter(category_id__in=ids).order_by().values_list(
+        'category_id'
+    ).annotate(Count('pk'), Sum('reviews_count'), Sum('rating_sum'))
+
+
+def top_titles(titles, size):
+    """Лучшие по рейтингу произведения с отзывами."""
+    return list(titles.filter(reviews_count__gt=0).order_by(
+        '-rating', 'name'
+    ).values('id', 'name', 'year', 'rating')[:size])
+
+
+def refresh_group(model, ids, totals, titles, top_size):
+    # Флаг снимается до пересчета: изменения, пришедшие во время
+    # пересчета, снова пометят запись, и она не потеряется.
+    model.objects.filter(pk__in=ids).update(dirty=False)
+    sums = {group: rest for group, *rest in totals(ids)}
+    now = timezone.now()
+    rows = []
+    for pk in ids:
+        titles_count, reviews_count, rating_sum = sums.get(pk, (0, 0, 0))
+        rows.append(model(
+            pk=pk,
+            titles_count=titles_count,
+            reviews_count=reviews_count or 0,
+            rating_sum=rating_sum or 0,
+            top_titles=json.dumps(
+                top_titles(titles(pk), top_size), ensure_ascii=False
+            ),
+            updated=now
+        ))
+    model.objects.bulk_update(rows, STATS_FIELDS)
+
+
+def refresh_stats(full=False, top_size=None):
+    """Пересчитывает статистику помеченных (full - всех) жанров
+    и категорий по хранимым агрегатам произведений, без обращения
+    к таблице отзывов. Возвращает число пересчитанных записей."""
+    if top_size is None:
+        top_size = settings.STATS_TOP_TITLES
+    create_missing_stats()
+    refreshed = {}
+    for model, totals, titles in (
+        (GenreStats, genre_totals,
+         lambda pk: Title.objects.filter(genre=pk)),
+        (CategoryStats, category_totals,
+         lambda pk: Title.objects.filter(category=pk)),
+    ):
+        stats = model.objects.all() if full else model.objects.filter(
+            dirty=True
+        )
+        ids = list(stats.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+            refresh_group(
+                model, ids[start:start + REFRESH_BATCH_SIZE], totals,
+                titles, top_size
+            )
+        refreshed[model._meta.db_table] = len(ids)
+    return refreshed
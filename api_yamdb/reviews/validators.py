@@ -18,6 +18,15 @@ def validate_username_not_me(value):
     return value
 
 
+def validate_slug_not_reserved(value):
+    """Запрет слагов, совпадающих с путями API жанров и категорий
+    (/genres/stats/, /categories/stats/)."""
+
+    if value == 'stats':
+        raise ValidationError(f"Слаг '{value}' зарезервирован!")
+    return value
+
+
 def validate_year(value):
     """Проверка, что год выхода произведения не позднее текущего."""
 
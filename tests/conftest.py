@@ -1,9 +1,50 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    """Тесты с базой данных запускаются на SQLite в памяти.
+
+    Настройки проекта не меняются (их проверяет test_settings),
+    подменяется только конфигурация соединений.
+    """
+    from django.db import connections
+
+    connections.databases = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+    if hasattr(connections._connections, 'default'):
+        delattr(connections._connections, 'default')
+
+
+@pytest.fixture(scope='session')
+def django_db_use_migrations():
+    # Миграции не хранятся в репозитории и создаются при деплое.
+    return False
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from django.core.cache import caches
+
+    from api.authentication import user_cache
+
+    yield
+    for cache in caches.all():
+        cache.clear()
+    # id пользователей повторяются между тестами.
+    user_cache.clear()
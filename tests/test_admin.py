@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, CustomUser, Review, Title
+
+
+@pytest.fixture
+def superuser_client(client):
+    superuser = CustomUser.objects.create_superuser(
+        username='root', email='root@yamdb.fake', password='secret')
+    client.force_login(superuser)
+    return client
+
+
+def create_rows(count, category):
+    """count произведений, у каждого отзыв и комментарий своего автора."""
+    start = Title.objects.count()
+    for number in range(start, start + count):
+        author = CustomUser.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake')
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category)
+        review = Review.objects.create(
+            title=title, author=author, text='Текст', score=5)
+        Comment.objects.create(review=review, author=author, text='Текст')
+
+
+def changelist(client, model, params=None):
+    url = f'/admin/reviews/{model}/'
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params or {})
+    assert response.status_code == 200
+    return response, [query['sql'] for query in context.captured_queries]
+
+
+@pytest.mark.django_db
+class TestAdminChangelists:
+
+    @pytest.mark.parametrize('model', (
+        'review', 'comment', 'title', 'customuser', 'genre', 'category',
+    ))
+    def test_queries_do_not_depend_on_rows(self, superuser_client, category,
+                                           model):
+        create_rows(1, category)
+        _, small = changelist(superuser_client, model)
+        create_rows(20, category)
+        _, large = changelist(superuser_client, model)
+        assert len(small) == len(large), large
+        assert len(large) <= 8, large
+
+    def test_related_filters_show_selected_only(self, superuser_client,
+                                                category):
+        create_rows(3, category)
+        review = Review.objects.select_related('author').first()
+        response, _ = changelist(superuser_client, 'review')
+        # Боковая панель не перечисляет авторов и произведения.
+        assert [
+            spec.title for spec in response.context['cl'].filter_specs
+        ] == ['Дата публикации']
+
+        response, _ = changelist(
+            superuser_client, 'review', {'author': review.author_id})
+        assert response.context['cl'].result_count == 1
+        assert [
+            choice['display']
+            for choice in response.context['cl'].filter_specs[0].choices(
+                response.context['cl'])
+        ] == ['Все', review.author.username]
+        response, _ = changelist(
+            superuser_client, 'comment', {'review': review.pk})
+        assert response.context['cl'].result_count == 1
+
+    def test_estimated_count(self, superuser_client, category, settings):
+        create_rows(3, category)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        settings.ADMIN_ESTIMATED_COUNT_FROM = 2
+        response, queries = changelist(superuser_client, 'review')
+        assert response.context['cl'].result_count == 3
+        assert not any('COUNT(' in sql for sql in queries), queries
+
+        # С фильтром число строк считается точно.
+        response, queries = changelist(
+            superuser_client, 'review', {'score': 5})
+        assert response.context['cl'].result_count == 3
+        assert any('COUNT(' in sql for sql in queries)
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from benchmarks.generator import DatasetGenerator
+from benchmarks.harness import Harness, compare_reports, percentile
+from django.db.models import Count, Sum
+from rest_framework.test import APIClient
+from reviews.models import Comment, CustomUser, Review, Title
+
+
+@pytest.mark.django_db
+def test_generator_is_consistent():
+    counts = DatasetGenerator(
+        users=20, titles=10, reviews=60, comments=100, genres=4,
+        categories=2, batch_size=7
+    ).generate()
+
+    assert counts['customuser'] == 20
+    assert counts['title'] == 10
+    assert counts['comment'] == 100
+    assert counts['review'] == Review.objects.count() > 0
+    # Один отзыв автора на произведение.
+    assert not Review.objects.values('title', 'author').annotate(
+        total=Count('id')
+    ).filter(total__gt=1).exists()
+    # Популярность скошена к первым произведениям.
+    first, last = Title.objects.order_by('pk')[::9]
+    assert first.reviews_count > last.reviews_count
+    # Хранимые рейтинги пересчитаны после загрузки; рейтинг - целая
+    # часть среднего (reviews/aggregates.py).
+    totals = Review.objects.filter(title=first).aggregate(
+        scores=Sum('score'), count=Count('id')
+    )
+    assert first.rating == totals['scores'] // totals['count']
+
+
+@pytest.mark.django_db
+def test_generator_is_reproducible():
+    DatasetGenerator(users=5, titles=3, reviews=6, comments=5,
+                     genres=2, categories=1, seed=7).generate()
+    first = list(Comment.objects.order_by('pk').values_list(
+        'review_id', 'text'
+    ))
+    Comment.objects.all().delete()
+    Review.objects.all().delete()
+    DatasetGenerator(users=5, titles=3, reviews=6, comments=5,
+                     genres=2, categories=1, seed=7).generate()
+    second = list(Comment.objects.order_by('pk').values_list(
+        'review_id', 'text'
+    ))
+    assert [text for _, text in first] == [text for _, text in second]
+
+
+@pytest.mark.django_db
+def test_harness_uses_real_routes():
+    DatasetGenerator(users=5, titles=3, reviews=6, comments=10,
+                     genres=2, categories=1).generate()
+    sent = []
+
+    def send(method, path, data, token):
+        sent.append((method, path, data, token))
+        return 200
+
+    report = Harness(concurrency=4, send=send).run(total=200)
+
+    assert report['requests'] == 200
+    assert set(report['endpoints']) == {
+        'titles_list', 'title_detail', 'reviews_list', 'comments_list',
+        'auth_signup', 'auth_token', 'review_create', 'comment_create',
+    }
+    for metrics in report['endpoints'].values():
+        assert metrics['p50_ms'] <= metrics['p95_ms'] <= metrics['p99_ms']
+
+    # Запросы, построенные сценариями, действительно обрабатываются API.
+    client = APIClient()
+    for method, path, data, token in sent[:40]:
+        if token:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        else:
+            client.credentials()
+        response = client.generic(
+            method, path, data=json.dumps(data) if data else None,
+            content_type='application/json'
+        )
+        assert response.status_code not in (404, 500), (path, response.data)
+
+
+def test_percentile_and_compare():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+    report = {'endpoints': {'titles_list': {
+        'p95_ms': 12.0, 'throughput_rps': 150.0
+    }}}
+    baseline = {'endpoints': {'titles_list': {
+        'p95_ms': 10.0, 'throughput_rps': 100.0
+    }}}
+    assert compare_reports(report, baseline) == {
+        'titles_list': {'p95_ms': 2.0, 'throughput_rps': 50.0}
+    }
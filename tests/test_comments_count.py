@@ -0,0 +1,99 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Comment, Review
+
+
+@pytest.fixture
+def review(title, user):
+    return Review.objects.create(title=title, author=user, text='Т', score=5)
+
+
+def comments_count(review):
+    return Review.objects.get(pk=review.pk).comments_count
+
+
+@pytest.mark.django_db
+class TestCommentsCount:
+
+    def test_follows_comment_writes(self, review, user, another_user):
+        comment = Comment.objects.create(
+            review=review, author=user, text='Первый')
+        Comment.objects.create(review=review, author=another_user, text='Да')
+        assert comments_count(review) == 2
+
+        comment.delete()
+        assert comments_count(review) == 1
+
+    def test_author_deletion_cascades(self, review, title, user,
+                                      another_user):
+        other = Review.objects.create(
+            title=title, author=another_user, text='Т', score=3)
+        Comment.objects.create(review=review, author=another_user, text='1')
+        Comment.objects.create(review=review, author=user, text='2')
+        Comment.objects.create(review=other, author=user, text='3')
+
+        another_user.delete()
+        assert comments_count(review) == 1
+        assert not Review.objects.filter(pk=other.pk).exists()
+
+    def test_moving_comment_updates_both_reviews(self, review, title,
+                                                 another_user):
+        other = Review.objects.create(
+            title=title, author=another_user, text='Т', score=3)
+        comment = Comment.objects.create(
+            review=review, author=another_user, text='Т')
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.review = other
+        comment.save()
+        assert (comments_count(review), comments_count(other)) == (0, 1)
+
+    def test_review_save_keeps_count(self, review, user):
+        stale = Review.objects.get(pk=review.pk)
+        Comment.objects.create(review=review, author=user, text='Т')
+        stale.text = 'Исправлено'
+        stale.save()
+        assert comments_count(review) == 1
+
+    def test_rebuild_command(self, review, user):
+        Comment.objects.create(review=review, author=user, text='Т')
+        Review.objects.update(comments_count=0)
+        call_command('rebuild_aggregates')
+        assert comments_count(review) == 1
+
+
+@pytest.mark.django_db
+class TestReviewsApi:
+
+    def test_count_in_list_and_ordering(self, client, user_client, review,
+                                        title, user, another_user):
+        other = Review.objects.create(
+            title=title, author=another_user, text='Т', score=3)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert client.get(url).data['results'][0]['comments_count'] == 0
+
+        response = user_client.post(
+            f'{url}{review.pk}/comments/', {'text': 'Согласен'})
+        assert response.status_code == 201
+        # Версия списка отзывов сброшена комментарием.
+        results = client.get(url).data['results']
+        assert {item['id']: item['comments_count'] for item in results} == {
+            review.pk: 1, other.pk: 0
+        }
+
+        for ordering, expected in (
+            ('-comments_count', [review.pk, other.pk]),
+            ('comments_count', [other.pk, review.pk]),
+        ):
+            results = client.get(url, {'ordering': ordering}).data['results']
+            assert [item['id'] for item in results] == expected
+
+    def test_list_queries_do_not_depend_on_comments(
+            self, client, review, user, django_assert_max_num_queries):
+        Comment.objects.bulk_create([
+            Comment(review=review, author=user, text=str(number))
+            for number in range(5)
+        ])
+        with django_assert_max_num_queries(3):
+            response = client.get(
+                f'/api/v1/titles/{review.title_id}/reviews/')
+        assert response.status_code == 200
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from api.cache import get_shared_cache
+from reviews.models import Comment, Review
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Время версий и проверки Last-Modified задается тестом."""
+    clock = SimpleNamespace(now=1000.2)
+    fake = SimpleNamespace(time=lambda: clock.now)
+    monkeypatch.setattr('api.cache.time', fake)
+    monkeypatch.setattr('api.conditional.time', fake)
+    return clock
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_not_modified_without_queries(self, client, title):
+        url = f'/api/v1/titles/{title.pk}/'
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert len(context) == 0
+
+    def test_if_modified_since(self, client, title, clock):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        client.get(url)
+        clock.now = 1001.5
+        last_modified = client.get(url)['Last-Modified']
+        assert last_modified == http_date(1000)
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    def test_writes_in_same_second(self, client, title, user, another_user,
+                                   clock):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        Review.objects.create(title=title, author=user, text='Т', score=5)
+        clock.now = 1000.5
+        response = client.get(url)
+        assert response.status_code == 200
+        # Секунда не прошла: после следующей записи в ту же секунду
+        # Last-Modified совпал бы.
+        assert 'Last-Modified' not in response
+        etag = response['ETag']
+
+        clock.now = 1000.7
+        Review.objects.create(
+            title=title, author=another_user, text='Т', score=7)
+        clock.now = 1001.5
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 2
+        assert response['Last-Modified'] == http_date(1000)
+
+    def test_review_write_changes_etags(self, user_client, client, title):
+        title_url = f'/api/v1/titles/{title.pk}/'
+        reviews_url = f'{title_url}reviews/'
+        title_etag = client.get(title_url)['ETag']
+        reviews_etag = client.get(reviews_url)['ETag']
+
+        response = user_client.post(
+            reviews_url, {'text': 'Отлично', 'score': 9}, format='json')
+        assert response.status_code == 201
+
+        response = client.get(title_url, HTTP_IF_NONE_MATCH=title_etag)
+        assert response.status_code == 200
+        assert response.json()['rating'] == 9
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == 200
+
+    def test_comment_write_changes_etag(self, client, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Текст', score=5)
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        etag = client.get(url)['ETag']
+        Comment.objects.create(review=review, author=user, text='Коммент')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    @pytest.mark.parametrize('path, namespace', [
+        ('/api/v1/titles/{missing}/', 'title:{missing}'),
+        ('/api/v1/titles/{missing}/reviews/', 'reviews:{missing}'),
+        ('/api/v1/titles/{title}/reviews/{missing}/comments/',
+         'comments:{missing}'),
+    ])
+    def test_missing_object_creates_no_versions(self, client, title, path,
+                                                namespace):
+        ids = {'title': title.pk, 'missing': title.pk + 1000}
+        assert client.get(path.format(**ids)).status_code == 404
+        assert get_shared_cache().get(
+            'version:' + namespace.format(**ids)) is None
+
+    def test_versions_expire(self, client, title, settings, monkeypatch):
+        settings.API_CACHE_VERSION_TIMEOUT = 60
+        cache = get_shared_cache()
+        timeouts = []
+        add = cache.add
+        monkeypatch.setattr(cache, 'add', lambda key, value, timeout: (
+            timeouts.append(timeout) or add(key, value, timeout)))
+        assert client.get(
+            f'/api/v1/titles/{title.pk}/reviews/').status_code == 200
+        assert timeouts == [60]
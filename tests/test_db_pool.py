@@ -0,0 +1,200 @@
+import gc
+import itertools
+import socket
+import sqlite3
+import threading
+import time
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+from django.db import OperationalError
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from api_yamdb import db
+
+
+@pytest.fixture
+def pool(settings):
+    settings.DATABASE_POOL = {
+        'MAX_CONNECTIONS': 1, 'TIMEOUT': 0.05, 'HEALTH_CHECK_AFTER': 1,
+    }
+    db.pool_stats.reset()
+    db.connection_slots.reset()
+    yield settings.DATABASE_POOL
+    db.pool_stats.reset()
+    db.connection_slots.reset()
+
+
+@pytest.fixture
+def make_connection(tmp_path, django_db_blocker):
+    """Соединения с отдельной базой SQLite, минуя тестовую."""
+    created = weakref.WeakSet()
+    numbers = itertools.count()
+
+    def make():
+        connection = DatabaseWrapper({
+            'ENGINE': db.SQLITE,
+            'NAME': str(tmp_path / 'pool.sqlite3'),
+            'OPTIONS': db.connection_options(db.SQLITE),
+            'ATOMIC_REQUESTS': False,
+            'AUTOCOMMIT': True,
+            'CONN_MAX_AGE': 300,
+            'TIME_ZONE': None,
+            'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+            'TEST': {},
+        }, alias=f'pool{next(numbers)}')
+        created.add(connection)
+        return connection
+
+    with django_db_blocker.unblock():
+        yield make
+        # Брошенные соединения других потоков закрывать нельзя.
+        gc.collect()
+        for connection in list(created):
+            connection.close()
+
+
+class Handler:
+    """Заменяет django.db.connections для check_connections."""
+
+    def __init__(self, *connections):
+        self.connections = connections
+
+    def all(self):
+        return list(self.connections)
+
+
+class TestConnectionLimit:
+
+    def test_limit_per_process(self, pool, make_connection):
+        first, second = make_connection(), make_connection()
+        first.ensure_connection()
+        with pytest.raises(OperationalError):
+            second.ensure_connection()
+        assert db.pool_stats.snapshot()['waits'] == 1
+        assert db.pool_stats.snapshot()['timeouts'] == 1
+
+        first.close()
+        second.ensure_connection()
+        stats = db.pool_stats.snapshot()
+        assert stats['open'] == 1
+        assert stats['connects'] == 2
+        assert stats['closes'] == 1
+
+    def test_waits_for_free_slot(self, pool, make_connection):
+        pool['TIMEOUT'] = 5
+        first, second = make_connection(), make_connection()
+        opened = threading.Event()
+
+        def hold_connection():
+            # Соединения Django привязаны к потоку, где созданы.
+            first.inc_thread_sharing()
+            first.ensure_connection()
+            opened.set()
+            time.sleep(0.05)
+            first.close()
+
+        thread = threading.Thread(target=hold_connection)
+        thread.start()
+        opened.wait()
+        second.ensure_connection()
+        thread.join()
+        stats = db.pool_stats.snapshot()
+        assert stats['waits'] == 1
+        assert stats['timeouts'] == 0
+        assert stats['open'] == 1
+
+    def test_abandoned_connections_free_slots(self, pool, make_connection):
+        pool['TIMEOUT'] = 0.5
+        local = threading.local()
+        errors = []
+
+        def use_and_exit():
+            # Как соединение Django в потоке, завершившемся без close().
+            local.connection = make_connection()
+            try:
+                local.connection.ensure_connection()
+            except OperationalError as error:
+                errors.append(error)
+
+        for _ in range(3):
+            thread = threading.Thread(target=use_and_exit)
+            thread.start()
+            thread.join()
+        assert errors == []
+        stats = db.pool_stats.snapshot()
+        assert stats['connects'] == 3
+        assert stats['waits'] == 2
+        assert stats['timeouts'] == 0
+        assert stats['closes'] == 2
+        assert stats['open'] == 1
+
+    def test_postgres_connection_failure_frees_slot(self, pool,
+                                                    make_connection):
+        factory = db.connection_options(db.POSTGRESQL)['connection_factory']
+        assert issubclass(factory, psycopg2.extensions.connection)
+        # Порт, на котором гарантированно никто не слушает.
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with pytest.raises(psycopg2.OperationalError):
+            psycopg2.connect(
+                host='127.0.0.1', port=port, dbname='postgres',
+                connect_timeout=1, connection_factory=factory
+            )
+        assert db.pool_stats.snapshot()['open'] == 0
+        make_connection().ensure_connection()
+        assert db.pool_stats.snapshot()['open'] == 1
+
+
+class TestHealthCheck:
+
+    def test_idle_connection_checked_and_replaced(self, pool, monkeypatch,
+                                                  make_connection):
+        connection = make_connection()
+        connection.ensure_connection()
+        monkeypatch.setattr('django.db.connections', Handler(connection))
+        connection.pool_released_at = time.monotonic() - 10
+        # Соединение разорвано на стороне сервера.
+        sqlite3.Connection.close(connection.connection)
+
+        db.check_connections()
+        assert connection.connection is None
+        stats = db.pool_stats.snapshot()
+        assert stats['health_checks'] == 1
+        assert stats['reconnects'] == 1
+        assert stats['open'] == 0
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert db.pool_stats.snapshot()['connects'] == 2
+
+    def test_recently_used_connection_reused(self, pool, monkeypatch,
+                                             make_connection):
+        connection = make_connection()
+        connection.ensure_connection()
+        raw = connection.connection
+        monkeypatch.setattr('django.db.connections', Handler(connection))
+        db.release_connections()
+
+        db.check_connections()
+        assert connection.connection is raw
+        stats = db.pool_stats.snapshot()
+        assert stats['checkouts'] == 1
+        assert stats['health_checks'] == 0
+
+        connection.pool_released_at = time.monotonic() - 10
+        db.check_connections()
+        assert connection.connection is raw
+        assert db.pool_stats.snapshot()['health_checks'] == 1
+
+
+@pytest.mark.django_db
+def test_pool_stats_endpoint(admin_client, user_client):
+    assert user_client.get('/api/v1/db-pool/').status_code == 403
+    response = admin_client.get('/api/v1/db-pool/')
+    assert response.status_code == 200
+    assert {'pid', 'max_connections', 'open', 'checkouts', 'waits',
+            'reconnects'} <= set(response.data)
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from reviews.models import OutgoingEmail
+from reviews.outbox import OutboxWorker, enqueue_email
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_signup_enqueues_email(self, client, mailoutbox):
+        response = client.post('/api/v1/auth/signup/', {
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'
+        })
+        assert response.status_code == 200
+        assert mailoutbox == []
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'newbie@yamdb.fake'
+        assert email.status == OutgoingEmail.PENDING
+
+        call_command('send_queued_emails', once=True, stdout=mock.Mock())
+        assert len(mailoutbox) == 1
+        assert mailoutbox[0].to == ['newbie@yamdb.fake']
+        assert 'newbie' in mailoutbox[0].body
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+        assert email.sent_at is not None
+
+    def test_batches_reuse_connection(self, mailoutbox):
+        for number in range(5):
+            enqueue_email('Тема', 'Текст', f'user{number}@yamdb.fake')
+        worker = OutboxWorker(batch_size=2)
+        with mock.patch(
+            'reviews.outbox.get_connection', wraps=mail.get_connection
+        ) as get_connection:
+            assert worker.drain() == 5
+        assert get_connection.call_count == 1
+        assert len(mailoutbox) == 5
+        assert worker.stats()['pending'] == 0
+        assert worker.stats()['sent'] == 5
+
+    def test_retry_with_backoff(self, mailoutbox):
+        email = enqueue_email('Тема', 'Текст', 'user@yamdb.fake')
+        worker = OutboxWorker(max_attempts=2, backoff=10)
+        with mock.patch(
+            'reviews.outbox.EmailMessage.send',
+            side_effect=ConnectionError('down')
+        ):
+            assert worker.drain() == 1
+            email.refresh_from_db()
+            assert email.status == OutgoingEmail.PENDING
+            assert email.attempts == 1
+            assert 'down' in email.last_error
+            assert email.next_attempt > timezone.now() + timedelta(seconds=9)
+            # Пока не подошло время повтора, письмо не отправляется.
+            assert worker.drain() == 0
+
+            OutgoingEmail.objects.update(next_attempt=timezone.now())
+            worker.drain()
+            email.refresh_from_db()
+            assert email.status == OutgoingEmail.FAILED
+            assert email.attempts == 2
+        assert (worker.retried, worker.failed) == (1, 1)
+        assert mailoutbox == []
+
+    def test_failure_keeps_delivered_marks(self, mailoutbox):
+        first = enqueue_email('Тема', 'Текст', 'first@yamdb.fake')
+        second = enqueue_email('Тема', 'Текст', 'second@yamdb.fake')
+        worker = OutboxWorker(claim_timeout=60)
+        send = mail.EmailMessage.send
+
+        def send_once(message, *args, **kwargs):
+            if mailoutbox:
+                raise KeyboardInterrupt
+            return send(message, *args, **kwargs)
+
+        with mock.patch('reviews.outbox.EmailMessage.send', send_once):
+            with pytest.raises(KeyboardInterrupt):
+                worker.send_batch()
+        first.refresh_from_db()
+        assert first.status == OutgoingEmail.SENT
+        # Прерванное письмо захвачено до истечения claim_timeout.
+        second.refresh_from_db()
+        assert second.status == OutgoingEmail.PENDING
+        assert second.attempts == 1
+        assert second.next_attempt > timezone.now() + timedelta(seconds=50)
+        assert OutboxWorker().drain() == 0
+
+        OutgoingEmail.objects.filter(pk=second.pk).update(
+            next_attempt=timezone.now())
+        assert OutboxWorker().drain() == 1
+        assert [message.to for message in mailoutbox] == [
+            ['first@yamdb.fake'], ['second@yamdb.fake']]
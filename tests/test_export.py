@@ -0,0 +1,124 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review, Title
+
+
+def content(response):
+    body = b''.join(response.streaming_content)
+    if response.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body.decode('utf-8')
+
+
+def ndjson(response):
+    return [json.loads(line) for line in content(response).splitlines()]
+
+
+@pytest.fixture
+def titles(category, genres):
+    drama, comedy = genres
+    created = []
+    for number in range(5):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000 + number,
+            category=category
+        )
+        title.genre.set([comedy, drama] if number % 2 else [drama])
+        created.append(title)
+    return created
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_only_admin(self, client, user_client):
+        assert client.get('/api/v1/export/titles/').status_code == 401
+        assert user_client.get('/api/v1/export/titles/').status_code == 403
+
+    def test_unknown_resource(self, admin_client):
+        assert admin_client.get('/api/v1/export/users/').status_code == 404
+
+    def test_titles_ndjson_in_chunks(self, admin_client, titles, settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        response = admin_client.get('/api/v1/export/titles/')
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'].startswith('application/x-ndjson')
+
+        with CaptureQueriesContext(connection) as context:
+            rows = ndjson(response)
+        # Три порции по pk и по запросу жанров на каждую.
+        assert len(context) == 6
+        assert [row['id'] for row in rows] == [title.pk for title in titles]
+        assert rows[1] == {
+            'id': titles[1].pk, 'name': 'Произведение 1', 'year': 2001,
+            'description': None, 'category': 'movie', 'rating': 0,
+            'reviews_count': 0, 'genre': ['comedy', 'drama'],
+        }
+
+    def test_titles_csv_since_id(self, admin_client, titles):
+        response = admin_client.get(
+            '/api/v1/export/titles/',
+            {'output': 'csv', 'since_id': titles[2].pk}
+        )
+        assert response['Content-Type'].startswith('text/csv')
+        assert 'titles.csv' in response['Content-Disposition']
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert [int(row['id']) for row in rows] == [
+            title.pk for title in titles[3:]
+        ]
+        assert rows[0]['genre'] == 'comedy,drama'
+
+    def test_gzip(self, admin_client, titles):
+        response = admin_client.get(
+            '/api/v1/export/titles/', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert len(ndjson(response)) == len(titles)
+
+    def test_reviews_and_comments_since(self, admin_client, title, user,
+                                        admin):
+        old = Review.objects.create(
+            title=title, author=user, text='Старый', score=5
+        )
+        new = Review.objects.create(
+            title=title, author=admin, text='Новый', score=7
+        )
+        Review.objects.filter(pk=old.pk).update(pub_date='2020-01-01')
+        Comment.objects.create(review=new, author=user, text='Согласен')
+
+        rows = ndjson(admin_client.get(
+            '/api/v1/export/reviews/', {'since': '2021-01-01'}
+        ))
+        assert [row['id'] for row in rows] == [new.pk]
+        assert rows[0]['author'] == admin.username
+        assert rows[0]['title'] == title.pk
+
+        rows = ndjson(admin_client.get('/api/v1/export/comments/'))
+        assert rows[0]['review'] == new.pk
+        assert rows[0]['title'] == title.pk
+        assert rows[0]['text'] == 'Согласен'
+
+    @pytest.mark.parametrize('params', [
+        {'output': 'xml'},
+        {'since_id': 'abc'},
+        {'since_id': '²'},
+        {'since': 'вчера'},
+    ])
+    def test_invalid_params(self, admin_client, params):
+        response = admin_client.get('/api/v1/export/reviews/', params)
+        assert response.status_code == 400
+        assert set(response.data) == set(params)
+
+    def test_titles_have_no_date_filter(self, admin_client):
+        response = admin_client.get(
+            '/api/v1/export/titles/', {'since': '2021-01-01'}
+        )
+        assert response.status_code == 400
@@ -0,0 +1,146 @@
+import pytest
+from django.core.management import call_command
+from reviews import genre_index
+from reviews.models import Genre, GenreTitle, Title
+
+
+def mask(*slugs):
+    return sum(Genre.objects.filter(
+        slug__in=slugs).values_list('mask_bit', flat=True))
+
+
+def genre_mask(title):
+    return Title.objects.get(pk=title.pk).genre_mask
+
+
+@pytest.fixture
+def catalog(title, genres, category):
+    drama, comedy = genres
+    horror = Genre.objects.create(name='Ужасы', slug='horror')
+    scary = Title.objects.create(name='Страшное', year=2001, category=category)
+    scary.genre.set([drama, horror])
+    funny = Title.objects.create(name='Смешное', year=2002, category=category)
+    funny.genre.set([comedy])
+    return title, scary, funny
+
+
+def names(client, params):
+    response = client.get('/api/v1/titles/', params)
+    assert response.status_code == 200, response.data
+    return sorted(item['name'] for item in response.data['results'])
+
+
+@pytest.mark.django_db
+class TestGenreMask:
+
+    def test_bits_are_distinct(self, genres):
+        bits = list(Genre.objects.values_list('mask_bit', flat=True))
+        assert len(set(bits)) == 2
+        assert all(bit and bit & (bit - 1) == 0 for bit in bits)
+
+    def test_follows_link_writes(self, catalog, genres):
+        title, scary, _ = catalog
+        drama, comedy = genres
+        assert genre_mask(title) == mask('drama', 'comedy')
+        assert genre_mask(scary) == mask('drama', 'horror')
+
+        title.genre.remove(drama)
+        assert genre_mask(title) == mask('comedy')
+        GenreTitle.objects.create(title=title, genre=drama)
+        assert genre_mask(title) == mask('drama', 'comedy')
+        drama.titles.clear()
+        assert genre_mask(title) == mask('comedy')
+        assert genre_mask(scary) == mask('horror')
+
+        comedy.delete()
+        assert genre_mask(title) == 0
+
+    def test_title_save_keeps_mask(self, title):
+        stale = Title.objects.get(pk=title.pk)
+        title.genre.clear()
+        stale.name = 'Другое'
+        stale.save()
+        assert genre_mask(title) == 0
+
+    def test_write_api_updates_mask(self, admin_client, title):
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/',
+            {'genre': [{'name': 'Ужасы', 'slug': 'horror'},
+                       {'name': 'Драма', 'slug': 'drama'}]},
+            format='json'
+        )
+        assert response.status_code == 200, response.data
+        assert genre_mask(title) == mask('horror', 'drama')
+
+        response = admin_client.post('/api/v1/titles/bulk/', [{
+            'name': 'Новое', 'year': 2020, 'category': 'movie',
+            'genre': [{'name': 'Мюзикл', 'slug': 'musical'}],
+        }], format='json')
+        assert response.status_code == 201, response.data
+        created = Title.objects.get(name='Новое')
+        assert genre_mask(created) == mask('musical') != 0
+
+    def test_rebuild_command(self, title):
+        Genre.objects.update(mask_bit=None)
+        Title.objects.update(genre_mask=0)
+        call_command('rebuild_aggregates')
+        assert genre_mask(title) == mask('drama', 'comedy') != 0
+
+
+@pytest.mark.django_db
+class TestGenreFilter:
+
+    def test_any_and_all(self, client, catalog):
+        assert names(client, {'genre': 'drama'}) == ['Начало', 'Страшное']
+        assert names(client, {'genre': 'comedy,horror'}) == [
+            'Начало', 'Смешное', 'Страшное'
+        ]
+        assert names(client, {
+            'genre': 'drama,comedy', 'genre_mode': 'all'
+        }) == ['Начало']
+        assert names(client, {
+            'genre': 'drama,unknown', 'genre_mode': 'all'
+        }) == []
+        assert names(client, {'genre': 'drama,unknown'}) == [
+            'Начало', 'Страшное'
+        ]
+
+    def test_genres_without_bit(self, client, catalog):
+        # Жанры сверх числа битов фильтруются подзапросом.
+        Genre.objects.filter(slug='horror').update(mask_bit=None)
+        assert names(client, {
+            'genre': 'drama,horror', 'genre_mode': 'all'
+        }) == ['Страшное']
+        assert names(client, {'genre': 'comedy,horror'}) == [
+            'Начало', 'Смешное', 'Страшное'
+        ]
+
+    def test_single_query_without_join(self, client, catalog,
+                                       django_assert_num_queries):
+        with django_assert_num_queries(4) as context:
+            names(client, {'genre': 'drama,comedy', 'genre_mode': 'all'})
+        title_query = next(
+            query['sql'] for query in context.captured_queries
+            if 'genre_mask' in query['sql'] and 'COUNT' in query['sql']
+        )
+        assert 'reviews_genretitle' not in title_query
+
+    def test_postgres_filters_genre_array(self, catalog, monkeypatch):
+        monkeypatch.setattr(
+            genre_index, 'uses_genre_array', lambda write=False: True)
+        # Бит не нужен: число жанров не ограничено.
+        Genre.objects.filter(slug='horror').update(mask_bit=None)
+        for mode, operator in ((genre_index.ALL, '@>'),
+                               (genre_index.ANY, '&&')):
+            sql = str(genre_index.filter_titles(
+                Title.objects.all(), ['drama', 'horror'], mode
+            ).query)
+            where = sql.split(' WHERE ', 1)[1]
+            assert where.startswith(f'("reviews_title"."genre_ids" {operator} ')
+            assert 'genre_mask' not in where
+            assert 'reviews_genretitle' not in sql
+
+    def test_invalid_mode(self, client, catalog):
+        response = client.get(
+            '/api/v1/titles/', {'genre': 'drama', 'genre_mode': 'both'})
+        assert response.status_code == 400
@@ -0,0 +1,54 @@
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Comment, CustomUser, Review, Title
+
+FILES = {
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,reader,reader@yamdb.fake,user,,,\n'
+        '101,critic,critic@yamdb.fake,moderator,"Пишет ""рецензии""",,\n'
+    ),
+    'category.csv': 'id,name,slug\n1,Фильм,movie\n',
+    'genre.csv': 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n',
+    'titles.csv': (
+        'id,name,year,category\n'
+        '1,Начало,2010,1\n'
+        '2,Без категории,1999,\n'
+    ),
+    'genre_title.csv': 'id,title_id,genre_id\n1,1,1\n2,1,2\n3,1,99\n',
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,Хорошо,100,8,2019-09-24T21:08:21.567Z\n'
+        '2,1,Плохо,101,3,2019-09-24T21:09:21.567Z\n'
+        '3,5,Нет произведения,100,3,2019-09-24T21:09:21.567Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '1,1,Согласен,101,2019-09-25T21:08:21.567Z\n'
+    ),
+}
+
+
+@pytest.mark.django_db
+def test_import_csv(tmp_path):
+    for name, content in FILES.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+
+    call_command('import_csv', path=str(tmp_path), batch_size=2)
+
+    assert CustomUser.objects.get(pk=101).bio == 'Пишет "рецензии"'
+    assert Title.objects.get(pk=2).category is None
+    assert list(
+        Title.objects.get(pk=1).genre.values_list('slug', flat=True)
+    ) == ['drama', 'comedy']
+    assert Review.objects.count() == 2
+    assert Review.objects.get(pk=1).pub_date.year == 2019
+    assert Comment.objects.get(pk=1).review_id == 1
+
+    title = Title.objects.get(pk=1)
+    assert (title.reviews_count, title.rating) == (2, 5)
+
+    # Последовательности сдвинуты: новые записи не конфликтуют с id.
+    user = CustomUser.objects.create(username='new', email='new@yamdb.fake')
+    assert user.pk > 101
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+from benchmarks.projections import compare_paths
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture
+def catalog(title, user, another_user, admin, genres):
+    Title.objects.create(name='Без категории', year=1999)
+    other = Title.objects.create(
+        name='Начало конца', year=2020, description='Описание',
+        category=title.category
+    )
+    other.genre.set(genres[1:])
+    for number, author in enumerate((user, another_user, admin)):
+        review = Review.objects.create(
+            title=title, author=author, text=f'Отзыв {number} начало',
+            score=number + 5,
+        )
+        # Одинаковая дата у двух отзывов проверяет порядок по id.
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=datetime(2020, 1, 1 + number // 2, 12, 30, 15, 123456)
+        )
+        for comment in range(3):
+            Comment.objects.create(
+                review=review, author=user, text=f'Комментарий {comment}'
+            )
+    return title
+
+
+def fetch(client, settings, url, enabled):
+    settings.API_PROJECTIONS = enabled
+    caches['api'].clear()
+    response = client.get(url)
+    return response.status_code, response.content
+
+
+@pytest.mark.django_db
+class TestProjectionCompatibility:
+
+    def assert_identical(self, client, settings, url):
+        fast = fetch(client, settings, url, True)
+        slow = fetch(client, settings, url, False)
+        assert fast == slow, url
+        return fast
+
+    def test_titles(self, client, settings, catalog):
+        for query in ('', '?genre=comedy', '?category=movie', '?year=2010',
+                      '?name=кон', '?search=начало', '?page=2'):
+            self.assert_identical(client, settings, f'/api/v1/titles/{query}')
+
+    def test_reviews(self, client, settings, catalog):
+        url = f'/api/v1/titles/{catalog.pk}/reviews/'
+        for query in ('', '?search=начало', '?pagination=cursor'):
+            self.assert_identical(client, settings, url + query)
+
+    def test_comments(self, client, settings, catalog):
+        review = catalog.reviews.first()
+        url = f'/api/v1/titles/{catalog.pk}/reviews/{review.pk}/comments/'
+        status, _ = self.assert_identical(client, settings, url)
+        assert status == 200
+
+    def test_comment_queries_do_not_grow(self, client, settings, catalog):
+        settings.API_PROJECTIONS = True
+        review = catalog.reviews.first()
+        url = f'/api/v1/titles/{catalog.pk}/reviews/{review.pk}/comments/'
+        with CaptureQueriesContext(connection) as small:
+            client.get(url)
+        for number in range(5):
+            Comment.objects.create(
+                review=review, author=review.author, text=str(number)
+            )
+        caches['api'].clear()
+        with CaptureQueriesContext(connection) as large:
+            client.get(url)
+        assert len(small) == len(large)
+
+
+@pytest.mark.django_db
+def test_compare_paths(catalog):
+    results = compare_paths(page_sizes=(10,), repeat=1)
+    assert {result['endpoint'] for result in results} == {
+        'titles', 'reviews', 'comments'
+    }
+    for result in results:
+        assert result['projection_rows_per_second'] > 0
@@ -0,0 +1,59 @@
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def refresh(self, title):
+        return Title.objects.get(pk=title.pk)
+
+    def test_rating_follows_review_writes(self, title, user, another_user):
+        review = Review.objects.create(
+            title=title, author=user, text='Хорошо', score=8)
+        Review.objects.create(
+            title=title, author=another_user, text='Плохо', score=3)
+        title = self.refresh(title)
+        assert (title.rating_sum, title.reviews_count, title.rating) == (
+            11, 2, 5
+        )
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 10
+        review.save()
+        title = self.refresh(title)
+        assert (title.rating_sum, title.rating) == (13, 6)
+
+        Review.objects.all().delete()
+        title = self.refresh(title)
+        assert (title.rating_sum, title.reviews_count, title.rating) == (
+            0, 0, 0
+        )
+
+    def test_moving_review_updates_both_titles(self, title, category, user):
+        other = Title.objects.create(name='Другое', year=2000,
+                                     category=category)
+        review = Review.objects.create(
+            title=title, author=user, text='Текст', score=7)
+        review = Review.objects.get(pk=review.pk)
+        review.title = other
+        review.save()
+        assert self.refresh(title).reviews_count == 0
+        assert self.refresh(other).rating == 7
+
+    def test_rebuild_command(self, title, user):
+        Review.objects.create(title=title, author=user, text='Т', score=9)
+        Title.objects.update(rating_sum=0, reviews_count=0, rating=0)
+        call_command('rebuild_aggregates')
+        title = self.refresh(title)
+        assert (title.rating_sum, title.reviews_count, title.rating) == (
+            9, 1, 9
+        )
+
+    def test_api_returns_stored_rating(self, client, title, user):
+        Review.objects.create(title=title, author=user, text='Т', score=4)
+        response = client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 200
+        assert response.json()['rating'] == 4
@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.utils import timezone
+from reviews.models import ReplicationHeartbeat, Title
+
+from api.middleware import sticky_cache
+from api_yamdb.replicas import replicas
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def replica(db, settings, tmp_path, django_db_blocker):
+    """Вторая база SQLite в роли реплики. Репликации нет: данные
+    на нее тесты пишут сами."""
+    connections.databases['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    connections.ensure_defaults('replica')
+    connections.prepare_test_settings('replica')
+    with django_db_blocker.unblock():
+        call_command(
+            'migrate', database='replica', run_syncdb=True, verbosity=0
+        )
+        ReplicationHeartbeat.objects.using('replica').create(
+            pk=1, beat=timezone.now()
+        )
+    settings.DATABASE_REPLICAS = {
+        **settings.DATABASE_REPLICAS,
+        'ALIASES': ['replica'],
+        'CHECK_INTERVAL': 0,
+        'MAX_LAG_SECONDS': 60,
+    }
+    replicas.reset()
+    yield 'replica'
+    replicas.reset()
+    connections['replica'].close()
+    del connections.databases['replica']
+    if hasattr(connections._connections, 'replica'):
+        delattr(connections._connections, 'replica')
+
+
+def title_names(client, params=None):
+    response = client.get('/api/v1/titles/', params)
+    assert response.status_code == 200
+    return [title['name'] for title in response.data['results']]
+
+
+def test_reads_go_to_replica(client, title, replica):
+    Title.objects.using(replica).bulk_create([
+        Title(name='С реплики', year=2000)
+    ])
+    assert title_names(client) == ['С реплики']
+
+
+def test_recent_changes_not_cached_from_replica(client, title, replica):
+    # Версии данных только что изменились: реплика могла их не увидеть.
+    for _ in range(2):
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+        assert 'ETag' not in response
+
+
+def test_writes_stick_to_primary(user_client, client, title, replica):
+    url = f'/api/v1/titles/{title.pk}/reviews/'
+    user_client.credentials(HTTP_AUTHORIZATION='Bearer token')
+    # На реплике произведения еще нет.
+    assert user_client.get(url).status_code == 404
+
+    response = user_client.post(url, {'text': 'Отлично', 'score': 9})
+    assert response.status_code == 201, response.data
+    assert 'primary_reads' in response.cookies
+
+    response = user_client.get(url)
+    assert response.status_code == 200
+    assert response.data['count'] == 1
+
+    # Клиент без cookie узнается по заголовку Authorization.
+    user_client.cookies.clear()
+    assert user_client.get(url).status_code == 200
+    # Остальные клиенты читают с реплики.
+    assert client.get(url).status_code == 404
+
+
+def test_sticky_mark_without_cache(user_client, client, title, replica,
+                                   settings):
+    url = f'/api/v1/titles/{title.pk}/reviews/'
+    user_client.credentials(HTTP_AUTHORIZATION='Bearer token')
+    response = user_client.post(url, {'text': 'Отлично', 'score': 9})
+    assert response.status_code == 201, response.data
+    mark = response['X-Primary-Reads']
+    # Запись общего хранилища потеряна (или не видна этому воркеру).
+    sticky_cache().clear()
+    assert user_client.get(url).status_code == 200
+
+    user_client.cookies.clear()
+    assert user_client.get(url).status_code == 404
+    response = user_client.get(url, HTTP_X_PRIMARY_READS=mark)
+    assert response.status_code == 200
+    # Подделанная и просроченная отметки не принимаются.
+    assert client.get(
+        url, HTTP_X_PRIMARY_READS='primary:forged').status_code == 404
+    settings.DATABASE_REPLICAS = {
+        **settings.DATABASE_REPLICAS, 'STICKY_SECONDS': 1
+    }
+    time.sleep(2.1)
+    assert user_client.get(url, HTTP_X_PRIMARY_READS=mark).status_code == 404
+
+
+def test_lagging_replica_skipped(client, title, replica):
+    now = timezone.now()
+    ReplicationHeartbeat.objects.create(pk=1, beat=now)
+    ReplicationHeartbeat.objects.using(replica).update(
+        beat=now - timedelta(hours=1)
+    )
+    assert title_names(client) == [title.name]
+    assert replicas.available() == []
+
+    ReplicationHeartbeat.objects.using(replica).update(beat=now)
+    assert title_names(client, {'page': 1}) == []
+    assert replicas.available() == [replica]
+
+
+def test_failed_replica_removed(client, title, replica):
+    connections[replica].close()
+    connections.databases[replica]['NAME'] = '/nonexistent/replica.sqlite3'
+    assert title_names(client) == [title.name]
+    assert replicas.available() == []
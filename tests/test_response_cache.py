@@ -0,0 +1,47 @@
+import pytest
+
+from api.cache import get_stats
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_hit_after_miss(self, client, title):
+        url = '/api/v1/titles/?year=2010&page=1'
+        first = client.get(url)
+        assert first['X-Cache'] == 'MISS'
+        # Порядок параметров не влияет на ключ.
+        second = client.get('/api/v1/titles/?page=1&year=2010')
+        assert second['X-Cache'] == 'HIT'
+        assert second.json() == first.json()
+        assert get_stats() == {'hits': 1, 'misses': 1}
+
+    def test_hit_runs_no_queries(self, client, title,
+                                 django_assert_num_queries):
+        # Общее хранилище по умолчанию не в базе: ни версии, ни
+        # ограничение частоты запросов не обращаются к ней.
+        client.get('/api/v1/titles/')
+        with django_assert_num_queries(0):
+            assert client.get('/api/v1/titles/')['X-Cache'] == 'HIT'
+
+    def test_review_invalidates_title(self, client, title, user):
+        url = f'/api/v1/titles/{title.pk}/'
+        client.get(url)
+        Review.objects.create(title=title, author=user, text='Т', score=6)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 6
+
+    def test_genre_change_invalidates_lists(self, client, title, genres):
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/titles/')
+        genres[0].name = 'Трагедия'
+        genres[0].save()
+        assert client.get('/api/v1/genres/')['X-Cache'] == 'MISS'
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+
+    def test_unrelated_namespace_kept(self, client, title, category):
+        client.get('/api/v1/genres/')
+        Title.objects.create(name='Новое', year=2020, category=category)
+        assert client.get('/api/v1/genres/')['X-Cache'] == 'HIT'
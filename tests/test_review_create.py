@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review
+
+
+def post(client, url, data):
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, data, format='json')
+    return response, context.captured_queries
+
+
+def selects(queries, table):
+    return sum(
+        query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        for query in queries
+    )
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def test_title_loaded_once(self, user_client, title):
+        response, queries = post(
+            user_client, f'/api/v1/titles/{title.pk}/reviews/',
+            {'text': 'Отлично', 'score': 9}
+        )
+        assert response.status_code == 201, response.data
+        assert selects(queries, 'reviews_title') == 1
+        assert selects(queries, 'reviews_review') == 0
+        title.refresh_from_db()
+        assert title.rating == 9
+
+    def test_duplicate_review_is_rejected(self, user_client, title, user):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert user_client.post(
+            url, {'text': 'Первый', 'score': 5}
+        ).status_code == 201
+        response = user_client.post(url, {'text': 'Второй', 'score': 1})
+        assert response.status_code == 400
+        assert response.data == {
+            'non_field_errors': [
+                'Вы уже оставляли отзыв на это произведение.'
+            ]
+        }
+        assert Review.objects.filter(title=title, author=user).count() == 1
+        title.refresh_from_db()
+        assert (title.reviews_count, title.rating) == (1, 5)
+
+    def test_missing_title(self, user_client):
+        response = user_client.post(
+            '/api/v1/titles/999/reviews/', {'text': 'Текст', 'score': 5}
+        )
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestCommentCreate:
+
+    def test_review_loaded_once(self, user_client, title, another_user):
+        review = Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=7
+        )
+        response, queries = post(
+            user_client,
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/',
+            {'text': 'Согласен'}
+        )
+        assert response.status_code == 201, response.data
+        assert selects(queries, 'reviews_review') == 1
+        assert Comment.objects.get().review == review
+
+    def test_review_of_another_title(self, user_client, title, category,
+                                     another_user):
+        review = Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=7
+        )
+        response = user_client.post(
+            f'/api/v1/titles/{title.pk + 1}/reviews/{review.pk}/comments/',
+            {'text': 'Согласен'}
+        )
+        assert response.status_code == 404
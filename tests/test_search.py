@@ -0,0 +1,63 @@
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Review, SearchToken, Title
+
+
+@pytest.fixture
+def catalog(category):
+    return [
+        Title.objects.create(
+            name='Космическая одиссея', year=1968, category=category,
+            description='Фильм о путешествии к Юпитеру'),
+        Title.objects.create(
+            name='Солярис', year=1972, category=category,
+            description='Космическая станция над океаном'),
+        Title.objects.create(name='Сталкер', year=1979, category=category),
+    ]
+
+
+def result_ids(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return [item['id'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestFullTextSearch:
+
+    def test_ranked_by_relevance(self, client, catalog):
+        ids = result_ids(client, '/api/v1/titles/?search=Космическая')
+        # Совпадение в названии весит больше, чем в описании.
+        assert ids == [catalog[0].id, catalog[1].id]
+
+    def test_all_words_required(self, client, catalog):
+        ids = result_ids(client, '/api/v1/titles/?search=космическая океаном')
+        assert ids == [catalog[1].id]
+
+    def test_combined_with_filters(self, client, catalog):
+        ids = result_ids(
+            client, '/api/v1/titles/?search=космическая&year=1972')
+        assert ids == [catalog[1].id]
+
+    def test_index_follows_writes(self, client, catalog):
+        catalog[2].name = 'Сталкер космическая версия'
+        catalog[2].save()
+        catalog[0].delete()
+        ids = result_ids(client, '/api/v1/titles/?search=космическая')
+        assert set(ids) == {catalog[1].id, catalog[2].id}
+
+    def test_review_search(self, client, title, user, another_user):
+        Review.objects.create(
+            title=title, author=user, text='Отличный сюжет', score=9)
+        review = Review.objects.create(
+            title=title, author=another_user, text='Скучный сюжет', score=2)
+        ids = result_ids(
+            client, f'/api/v1/titles/{title.pk}/reviews/?search=скучный')
+        assert ids == [review.id]
+
+    def test_rebuild_command(self, client, catalog):
+        SearchToken.objects.all().delete()
+        call_command('rebuild_search_index')
+        ids = result_ids(client, '/api/v1/titles/?search=солярис')
+        assert ids == [catalog[1].id]
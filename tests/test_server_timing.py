@@ -0,0 +1,75 @@
+import json
+import logging
+
+import pytest
+
+from reviews.models import Review, Title
+
+MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+
+def metrics(response):
+    return {
+        item.split(';')[0]: item
+        for item in response['Server-Timing'].split(', ')
+    }
+
+
+@pytest.mark.django_db
+class TestServerTiming:
+
+    @pytest.fixture(autouse=True)
+    def enable_timing(self, settings):
+        settings.PERFORMANCE_TIMING = True
+        settings.PERFORMANCE_DUPLICATE_QUERIES = 3
+        settings.MIDDLEWARE = MIDDLEWARE
+
+    def test_header_and_log(self, user_client, title, caplog):
+        with caplog.at_level(logging.INFO, logger='api.performance'):
+            response = user_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert {'total', 'db', 'view', 'render'} <= set(metrics(response))
+        assert 'n1' not in metrics(response)
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['path'] == '/api/v1/titles/'
+        assert record['queries'] > 0
+
+    def test_auth_is_timed(self, client, user):
+        from api.utils import get_token_for_user
+
+        token = get_token_for_user(user)['token']
+        response = client.get(
+            '/api/v1/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert response.status_code == 200
+        assert 'auth' in metrics(response)
+
+    def test_repeated_queries_flagged(self, client, category, user, caplog,
+                                      settings):
+        # Быстрый путь списков выбирает авторов join'ом - N+1 остается
+        # только у сериализаторов.
+        settings.API_PROJECTIONS = False
+        titles = [
+            Title.objects.create(name=f'Т{number}', year=2000,
+                                 category=category)
+            for number in range(4)
+        ]
+        review = Review.objects.create(
+            title=titles[0], author=user, text='Т', score=5)
+        # Комментарии без select_related автора дают запрос на строку.
+        for number in range(4):
+            review.comments.create(author=user, text=f'К{number}')
+        with caplog.at_level(logging.INFO, logger='api.performance'):
+            response = client.get(
+                f'/api/v1/titles/{titles[0].pk}/reviews/{review.pk}/'
+                'comments/')
+        assert 'n1' in metrics(response)
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['duplicates'][0]['count'] >= 3
+
+    def test_disabled_by_setting(self, client, title, settings):
+        settings.PERFORMANCE_TIMING = False
+        response = client.get('/api/v1/titles/')
+        assert 'Server-Timing' not in response
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+
+from api.cache import get_versions, new_version
+
+TABLE = 'yamdb_shared_cache'
+
+
+@pytest.fixture
+def shared_db_cache(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        settings.SHARED_CACHE_ALIAS: {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': TABLE,
+        },
+    }
+    call_command('createcachetable')
+
+
+def repo_root():
+    return Path(__file__).resolve().parent.parent
+
+
+def other_worker():
+    """Общее хранилище, каким его видит другой воркер: отдельный
+    экземпляр бэкенда без общего с этим процессом состояния."""
+    return DatabaseCache(TABLE, {})
+
+
+@pytest.mark.django_db
+class TestSharedVersions:
+
+    def test_default_backend_skips_database(self):
+        from api_yamdb import settings
+
+        backend = settings.CACHES[settings.SHARED_CACHE_ALIAS]['BACKEND']
+        assert backend.endswith('LocMemCache')
+
+    def test_compose_uses_redis(self):
+        env = (repo_root() / 'infra' / '.env-example').read_text()
+        assert 'SHARED_CACHE_BACKEND=django_redis.cache.RedisCache' in env
+
+    def test_versions_visible_to_other_workers(self, client, title,
+                                               shared_db_cache):
+        client.get('/api/v1/titles/')
+        assert other_worker().get('version:titles') == get_versions(
+            'titles')[0]
+
+    def test_write_in_other_worker_invalidates(self, client, title,
+                                               shared_db_cache):
+        url = '/api/v1/titles/'
+        assert client.get(url)['X-Cache'] == 'MISS'
+        assert client.get(url)['X-Cache'] == 'HIT'
+        # Тела ответов остались в памяти этого воркера, а версию
+        # сбросил другой.
+        other_worker().set('version:titles', new_version(), None)
+        assert client.get(url)['X-Cache'] == 'MISS'
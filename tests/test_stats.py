@@ -0,0 +1,150 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import CategoryStats, GenreStats, Review, Title
+from reviews.stats import refresh_stats
+
+
+def stats(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+@pytest.fixture
+def rated_titles(title, genres, category, user, another_user):
+    drama, _ = genres
+    other = Title.objects.create(name='Другое', year=2001, category=category)
+    other.genre.set([drama])
+    Review.objects.create(title=title, author=user, text='Да', score=8)
+    Review.objects.create(title=title, author=another_user, text='Да', score=6)
+    Review.objects.create(title=other, author=user, text='Нет', score=3)
+    return title, other
+
+
+@pytest.mark.django_db
+class TestGroupStats:
+
+    def test_refresh_and_serve(self, client, rated_titles, genres):
+        title, other = rated_titles
+        assert refresh_stats() == {
+            'reviews_genrestats': 2, 'reviews_categorystats': 1
+        }
+        data = stats(client, '/api/v1/genres/drama/stats/')
+        assert data['stale'] is False
+        assert data['updated'] is not None
+        assert data['titles_count'] == 2
+        assert data['reviews_count'] == 3
+        assert data['average_score'] == round(17 / 3, 2)
+        assert [item['id'] for item in data['top_titles']] == [
+            title.pk, other.pk
+        ]
+        assert data['top_titles'][0] == {
+            'id': title.pk, 'name': title.name, 'year': title.year,
+            'rating': 7,
+        }
+
+        data = stats(client, '/api/v1/categories/movie/stats/')
+        assert data['titles_count'] == 2
+        assert data['reviews_count'] == 3
+
+        data = stats(client, '/api/v1/genres/stats/')
+        assert data['count'] == 2
+        assert [item['slug'] for item in data['results']] == [
+            'comedy', 'drama'
+        ]
+
+    def test_changes_mark_stale(self, client, rated_titles, genres, admin):
+        title, other = rated_titles
+        refresh_stats()
+        drama, comedy = genres
+
+        Review.objects.create(title=other, author=admin, text='Да', score=10)
+        assert GenreStats.objects.get(pk=drama.pk).dirty
+        assert not GenreStats.objects.get(pk=comedy.pk).dirty
+        assert stats(client, '/api/v1/genres/drama/stats/')['stale'] is True
+
+        # Пересчитываются только помеченные записи.
+        assert refresh_stats() == {
+            'reviews_genrestats': 1, 'reviews_categorystats': 1
+        }
+        data = stats(client, '/api/v1/genres/drama/stats/')
+        assert data['stale'] is False
+        assert data['reviews_count'] == 4
+        assert data['top_titles'][1] == {
+            'id': other.pk, 'name': other.name, 'year': other.year,
+            'rating': 6,
+        }
+
+        other.genre.add(comedy)
+        assert GenreStats.objects.get(pk=comedy.pk).dirty
+        refresh_stats()
+        assert stats(
+            client, '/api/v1/genres/comedy/stats/'
+        )['titles_count'] == 2
+
+    def test_title_write_paths_mark_stale(self, admin_client, rated_titles,
+                                          genres, category):
+        title, _ = rated_titles
+        refresh_stats()
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/',
+            {'genre': [{'name': 'Horror', 'slug': 'horror'}]},
+            format='json'
+        )
+        assert response.status_code == 200, response.data
+        assert set(GenreStats.objects.filter(dirty=True).values_list(
+            'genre__slug', flat=True
+        )) == {'drama', 'comedy'}
+        refresh_stats()
+        assert stats(
+            admin_client, '/api/v1/genres/horror/stats/'
+        )['titles_count'] == 1
+
+        response = admin_client.post('/api/v1/titles/bulk/', [{
+            'name': 'Новое', 'year': 2020, 'category': 'movie',
+            'genre': [{'name': 'Horror', 'slug': 'horror'}],
+        }], format='json')
+        assert response.status_code == 201, response.data
+        assert GenreStats.objects.get(genre__slug='horror').dirty
+        assert CategoryStats.objects.get(pk=category.pk).dirty
+
+    def test_category_change_marks_previous(self, rated_titles, category):
+        title, _ = rated_titles
+        refresh_stats()
+        title = Title.objects.get(pk=title.pk)
+        title.category = None
+        title.save()
+        assert CategoryStats.objects.get(pk=category.pk).dirty
+
+    def test_missing_stats_are_stale(self, client, genres):
+        data = stats(client, '/api/v1/genres/drama/stats/')
+        assert data['stale'] is True
+        assert data['titles_count'] == 0
+        assert data['average_score'] is None
+        assert data['top_titles'] == []
+
+    def test_full_rebuild_command(self, rated_titles, genres):
+        refresh_stats()
+        GenreStats.objects.update(titles_count=100)
+        call_command('refresh_stats')
+        assert GenreStats.objects.get(genre__slug='drama').titles_count == 100
+        call_command('refresh_stats', '--full')
+        assert GenreStats.objects.get(genre__slug='drama').titles_count == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', ('/api/v1/genres/', '/api/v1/categories/'))
+def test_stats_slug_is_reserved(admin_client, url):
+    response = admin_client.post(url, {'name': 'Статистика', 'slug': 'stats'})
+    assert response.status_code == 400
+    assert 'slug' in response.data
+
+
+@pytest.mark.django_db
+def test_stats_slug_reserved_for_title_genres(admin_client, category):
+    response = admin_client.post('/api/v1/titles/', {
+        'name': 'Новое', 'year': 2020, 'category': category.slug,
+        'genre': [{'name': 'Статистика', 'slug': 'stats'}],
+    }, format='json')
+    assert response.status_code == 400
+    assert 'genre' in response.data
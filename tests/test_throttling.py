@@ -0,0 +1,131 @@
+from unittest import mock
+
+import pytest
+from api.throttling import bucket_store, database_latency, take_token
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    yield
+    database_latency.reset()
+    bucket_store.local.clear()
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates
+            },
+        }
+    return set_rates
+
+
+def test_token_bucket():
+    state = None
+    for _ in range(2):
+        allowed, wait, state = take_token(state, 2, 60, now=100)
+        assert allowed and wait == 0
+    allowed, wait, state = take_token(state, 2, 60, now=100)
+    assert not allowed
+    assert wait == 30
+    allowed, _, state = take_token(state, 2, 60, now=130)
+    assert allowed
+    # Корзина не наполняется больше своего размера.
+    allowed, _, state = take_token(state, 2, 60, now=10000)
+    assert state[0] == 1
+
+
+@pytest.mark.django_db
+class TestRateLimits:
+
+    def signup(self, client, number, **extra):
+        return client.post('/api/v1/auth/signup/', {
+            'username': f'user{number}', 'email': f'user{number}@yamdb.fake'
+        }, **extra)
+
+    def test_auth_endpoints_limited_per_ip(self, client, rates):
+        rates(auth='2/min')
+        assert self.signup(client, 1).status_code == 200
+        assert self.signup(client, 2).status_code == 200
+        response = self.signup(client, 3)
+        assert response.status_code == 429
+        assert int(response['Retry-After']) == 30
+        response = client.post('/api/v1/auth/token/', {
+            'username': 'user1', 'confirmation_code': 'wrong'
+        })
+        assert response.status_code == 429
+
+    def test_writes_limited_per_user(self, user_client, admin_client, title,
+                                     rates):
+        rates(write='2/min')
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert user_client.post(
+            url, {'text': 'Текст', 'score': 5}).status_code == 201
+        assert user_client.post(
+            url, {'text': 'Текст', 'score': 5}).status_code == 400
+        assert user_client.post(
+            url, {'text': 'Текст', 'score': 5}).status_code == 429
+        assert user_client.get(url).status_code == 200
+        # У другого пользователя своя корзина.
+        assert admin_client.post(
+            url, {'text': 'Текст', 'score': 5}).status_code == 201
+
+    def test_client_address_from_proxy(self, client, rates, settings):
+        rates(auth='1/min')
+        assert settings.REST_FRAMEWORK['THROTTLE_CACHE_ALIAS'] == (
+            settings.SHARED_CACHE_ALIAS
+        )
+        assert self.signup(
+            client, 1, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code == 200
+        # Подставленный клиентом адрес стоит перед адресом от nginx.
+        assert self.signup(
+            client, 2, HTTP_X_FORWARDED_FOR='10.0.0.2, 10.0.0.1'
+        ).status_code == 429
+        assert self.signup(
+            client, 3, HTTP_X_FORWARDED_FOR='10.0.0.3').status_code == 200
+
+    def test_in_process_fallback(self, client, rates):
+        rates(auth='1/min')
+        with mock.patch.object(
+            bucket_store, 'get_cache', side_effect=ConnectionError
+        ):
+            assert self.signup(client, 1).status_code == 200
+            assert self.signup(client, 2).status_code == 429
+        assert bucket_store.local
+
+
+@pytest.mark.django_db
+class TestLoadShedding:
+
+    def test_low_priority_writes_are_shed(self, client, user_client,
+                                          admin_client, title):
+        database_latency.record(1.0)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = user_client.post(url, {'text': 'Текст', 'score': 5})
+        assert response.status_code == 503
+        assert response['Retry-After'] == '5'
+        response = client.post('/api/v1/auth/signup/', {
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'
+        })
+        assert response.status_code == 503
+
+        assert user_client.get(url).status_code == 200
+        assert admin_client.post(
+            url, {'text': 'Текст', 'score': 5}).status_code == 201
+        response = client.post('/api/v1/auth/token/', {
+            'username': 'nobody', 'confirmation_code': 'code'
+        })
+        assert response.status_code == 404
+
+    def test_latency_is_measured(self, client, title):
+        assert database_latency.current() is None
+        client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert 0 < database_latency.current() < 0.2
+
+    def test_stale_latency_is_ignored(self):
+        database_latency.record(1.0, now=100)
+        assert database_latency.current(now=105) == 1.0
+        assert database_latency.current(now=200) is None
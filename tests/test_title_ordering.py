@@ -0,0 +1,115 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title
+
+ORDERINGS = (
+    '-rating,name', 'rating,-name', 'rating', '-rating', 'year', '-year',
+    'name', '-name', 'reviews_count', '-reviews_count', 'id', '-id',
+)
+RANGES = (
+    {'year_min': 2001, 'year_max': 2003},
+    {'rating_min': 4},
+    {'rating_max': 6, 'year_min': 2002},
+)
+
+
+@pytest.fixture
+def titles(category, user, another_user):
+    Title.objects.bulk_create(
+        Title(name=name, year=year, category=category)
+        for name, year in (('В', 2001), ('А', 2003), ('Б', 2002), ('Г', 2004))
+    )
+    titles = list(Title.objects.order_by('pk'))
+    for title, scores in zip(titles, ((5, 7), (9,), (5,), ())):
+        for author, score in zip((user, another_user), scores):
+            Review.objects.create(
+                title=title, author=author, text='Т', score=score)
+    return titles
+
+
+def ids(client, params):
+    response = client.get('/api/v1/titles/', params)
+    assert response.status_code == 200, response.data
+    return [item['id'] for item in response.data['results']]
+
+
+def list_query_plans(client, params):
+    """Планы запросов списка: выборка страницы и COUNT."""
+    with CaptureQueriesContext(connection) as context:
+        assert client.get('/api/v1/titles/', params).status_code == 200
+    plans = []
+    with connection.cursor() as cursor:
+        for query in context.captured_queries:
+            if 'FROM "reviews_title"' not in query['sql']:
+                continue
+            cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+            plans.append((
+                query['sql'], [row[-1] for row in cursor.fetchall()]
+            ))
+    assert plans
+    return plans
+
+
+def full_scans(plan):
+    """Чтение таблицы без индекса. SCAN reviews_title без INDEX -
+    это и чтение в порядке первичного ключа (сортировка по id)."""
+    return [
+        step for step in plan
+        if step.startswith('SCAN') and 'reviews_title' in step
+        and 'INDEX' not in step
+    ]
+
+
+def sorts(plan):
+    return [step for step in plan if 'TEMP B-TREE' in step]
+
+
+@pytest.mark.django_db
+class TestTitleOrdering:
+
+    def test_orderings(self, client, titles):
+        first, second, third, fourth = [title.pk for title in titles]
+        # По умолчанию: рейтинг по убыванию, затем название.
+        assert ids(client, {}) == [second, first, third, fourth]
+        assert ids(client, {'ordering': 'year'}) == [
+            first, third, second, fourth
+        ]
+        assert ids(client, {'ordering': '-reviews_count'}) == [
+            first, third, second, fourth
+        ]
+        assert ids(client, {'ordering': 'name'}) == [
+            second, third, first, fourth
+        ]
+        assert ids(client, {'ordering': '-id'}) == [
+            fourth, third, second, first
+        ]
+
+    def test_unsupported_combination_uses_default(self, client, titles):
+        default = ids(client, {})
+        assert ids(client, {'ordering': 'year,name'}) == default
+        assert ids(client, {'ordering': 'description'}) == default
+
+    def test_ranges(self, client, titles):
+        first, second, third, _ = [title.pk for title in titles]
+        assert ids(client, {
+            'year_min': 2001, 'year_max': 2002, 'ordering': 'year'
+        }) == [first, third]
+        assert ids(client, {'rating_min': 6}) == [second, first]
+        assert ids(client, {'rating_max': 5, 'rating_min': 1}) == [third]
+
+    @pytest.mark.parametrize('ordering', ORDERINGS)
+    def test_ordering_reads_index(self, client, titles, ordering):
+        for _, plan in list_query_plans(client, {'ordering': ordering}):
+            assert not sorts(plan), plan
+
+    @pytest.mark.parametrize('ranges', RANGES)
+    @pytest.mark.parametrize('ordering', ('-rating,name', 'year', '-id'))
+    def test_ranges_use_index(self, client, titles, ranges, ordering):
+        params = {**ranges, 'ordering': ordering}
+        for sql, plan in list_query_plans(client, params):
+            if 'COUNT(' in sql:
+                assert not full_scans(plan), plan
+            else:
+                assert not (full_scans(plan) and sorts(plan)), plan
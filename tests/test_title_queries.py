@@ -0,0 +1,58 @@
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+
+from reviews.models import Review, Title
+
+
+def create_titles(count, category, genres, author):
+    for number in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category)
+        title.genre.set(genres)
+        Review.objects.create(
+            title=title, author=author, text='Текст', score=number % 10 + 1)
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context), response.json()
+
+
+@pytest.mark.django_db
+class TestTitleQueryBudget:
+
+    @mock.patch.object(PageNumberPagination, 'page_size', 100)
+    def test_list_query_count_is_flat(self, client, category, genres, user):
+        create_titles(1, category, genres, user)
+        small, data = count_queries(client, '/api/v1/titles/')
+        assert len(data['results']) == 1
+
+        create_titles(99, category, genres, user)
+        large, data = count_queries(client, '/api/v1/titles/')
+        assert len(data['results']) == 100
+        assert small == large, (
+            'Число запросов к /titles/ должно быть постоянным, '
+            f'получено {small} и {large}'
+        )
+        assert large <= 3
+
+    def test_genre_filter_has_no_duplicates(self, client, title, genres):
+        Title.objects.create(name='Другое', year=2001)
+        _, data = count_queries(
+            client, f'/api/v1/titles/?genre={genres[0].slug}')
+        assert data['count'] == 1
+        assert [item['id'] for item in data['results']] == [title.id]
+
+    def test_retrieve_query_count(self, client, title):
+        queries, data = count_queries(client, f'/api/v1/titles/{title.pk}/')
+        assert queries <= 2
+        assert {genre['slug'] for genre in data['genre']} == {
+            'drama', 'comedy'
+        }
+        assert data['category']['slug'] == 'movie'
@@ -0,0 +1,225 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Genre, GenreTitle, Title
+
+
+def title_data(name, genres, category='movie'):
+    return {
+        'name': name, 'year': 2001, 'description': 'Описание',
+        'category': category,
+        'genre': [{'name': slug.title(), 'slug': slug} for slug in genres],
+    }
+
+
+def post(client, url, data, **kwargs):
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, data, **kwargs)
+    return response, len(context)
+
+
+@pytest.mark.django_db
+class TestTitleCreate:
+
+    def test_create_resolves_genres_in_bulk(self, admin_client, category,
+                                            genres):
+        response, few = post(admin_client, '/api/v1/titles/', title_data(
+            'Первое', ['drama']), format='json')
+        assert response.status_code == 201, response.data
+
+        response, many = post(admin_client, '/api/v1/titles/', title_data(
+            'Второе', ['drama', 'comedy', 'drama']), format='json')
+        assert response.status_code == 201, response.data
+        assert few == many, 'Число запросов не должно зависеть от жанров'
+
+        title = Title.objects.get(name='Второе')
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+        assert title.category == category
+
+    def test_create_adds_new_genres(self, admin_client, category, genres):
+        response = admin_client.post('/api/v1/titles/', title_data(
+            'Новое', ['drama', 'horror']), format='json')
+        assert response.status_code == 201, response.data
+        assert Genre.objects.get(slug='horror').name == 'Horror'
+        assert Genre.objects.count() == 3
+        assert {genre['slug'] for genre in response.data['genre']} == {
+            'drama', 'horror'
+        }
+
+    def test_create_requires_existing_category(self, admin_client, genres):
+        response = admin_client.post('/api/v1/titles/', title_data(
+            'Новое', ['drama'], category='missing'), format='json')
+        assert response.status_code == 400
+        assert 'category' in response.data
+
+
+@pytest.mark.django_db
+class TestTitleBulk:
+    url = '/api/v1/titles/bulk/'
+
+    def test_bulk_json(self, admin_client, category, genres):
+        items = [
+            title_data(f'Произведение {number}', ['drama', 'thriller'])
+            for number in range(50)
+        ]
+        response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 201, response.data
+        assert len(response.data) == 50
+        assert Title.objects.count() == 50
+        assert GenreTitle.objects.count() == 100
+        assert Genre.objects.filter(slug='thriller').count() == 1
+        assert response.data[0]['category']['slug'] == 'movie'
+
+    def test_bulk_batches_lookups_and_links(self, admin_client, category,
+                                            genres):
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.url, [
+                title_data(f'Произведение {number}', ['drama', 'comedy'])
+                for number in range(20)
+            ], format='json')
+        assert response.status_code == 201, response.data
+
+        def count(statement):
+            return sum(
+                query['sql'].startswith(statement)
+                for query in context.captured_queries
+            )
+
+        assert count('SELECT "reviews_category"') == 1
+        assert count('SELECT "reviews_genre"') == 1
+        assert count('INSERT INTO "reviews_genretitle"') == 1
+        assert GenreTitle.objects.count() == 40
+
+    def test_bulk_ndjson(self, admin_client, category, genres):
+        body = '\n'.join(json.dumps(title_data(name, ['drama']))
+                         for name in ('Один', 'Два')) + '\n\n'
+        response = admin_client.post(
+            self.url, body, content_type='application/x-ndjson'
+        )
+        assert response.status_code == 201, response.data
+        assert [item['name'] for item in response.data] == ['Один', 'Два']
+
+    def test_bulk_reports_errors_per_item(self, admin_client, category,
+                                          genres):
+        items = [
+            title_data('Хорошее', ['drama']),
+            title_data('Плохая категория', ['drama'], category='missing'),
+            {**title_data('Без года', ['drama']), 'year': 'год'},
+        ]
+        response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 400
+        assert [error['index'] for error in response.data['errors']] == [1, 2]
+        assert 'category' in response.data['errors'][0]['errors']
+        assert 'year' in response.data['errors'][1]['errors']
+        assert not Title.objects.exists()
+
+    def test_bulk_rejects_invalid_payload(self, admin_client):
+        response = admin_client.post(self.url, {'name': 'x'}, format='json')
+        assert response.status_code == 400
+        response = admin_client.post(
+            self.url, '{"name": "x"}\n{oops', content_type='application/x-ndjson'
+        )
+        assert response.status_code == 400
+
+    def test_bulk_is_admin_only(self, user_client, category):
+        response = user_client.post(
+            self.url, [title_data('Одно', [])], format='json'
+        )
+        assert response.status_code == 403
+        assert not Title.objects.exists()
+
+
+@pytest.mark.django_db
+class TestTitleUpdate:
+
+    def statements(self, context, statement):
+        return sum(
+            query['sql'].startswith(statement)
+            for query in context.captured_queries
+        )
+
+    def test_genres_replaced_by_diff(self, admin_client, title, genres):
+        kept = GenreTitle.objects.get(title=title, genre__slug='drama')
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.patch(
+                f'/api/v1/titles/{title.pk}/',
+                {'genre': [{'name': 'Драма', 'slug': 'drama'},
+                           {'name': 'Ужасы', 'slug': 'horror'}]},
+                format='json'
+            )
+        assert response.status_code == 200, response.data
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'horror'
+        }
+        assert GenreTitle.objects.filter(pk=kept.pk).exists()
+        assert self.statements(
+            context, 'INSERT INTO "reviews_genretitle"') == 1
+        assert self.statements(
+            context, 'DELETE FROM "reviews_genretitle"') == 1
+        assert {genre['slug'] for genre in response.data['genre']} == {
+            'drama', 'horror'
+        }
+
+    def patch_genres(self, client, title, slugs):
+        with CaptureQueriesContext(connection) as context:
+            response = client.patch(
+                f'/api/v1/titles/{title.pk}/',
+                {'genre': [{'name': slug, 'slug': slug} for slug in slugs]},
+                format='json'
+            )
+        assert response.status_code == 200, response.data
+        assert set(title.genre.values_list('slug', flat=True)) == set(slugs)
+        return len(context)
+
+    def test_queries_do_not_depend_on_genres(self, admin_client, title,
+                                             genres):
+        Genre.objects.bulk_create(
+            Genre(name=f'g{number}', slug=f'g{number}')
+            for number in range(20)
+        )
+        self.patch_genres(admin_client, title, [])
+        few = [f'g{number}' for number in range(2)]
+        many = [f'g{number}' for number in range(2, 12)]
+        added_few = self.patch_genres(admin_client, title, few)
+        removed_few = self.patch_genres(admin_client, title, [])
+        added_many = self.patch_genres(admin_client, title, many)
+        removed_many = self.patch_genres(admin_client, title, [])
+        # Связи удаляются одним DELETE, индекс жанров и статистика
+        # обновляются один раз, а не на каждую связь.
+        assert added_few == added_many <= 18
+        assert removed_few == removed_many <= 18
+
+    def test_same_genres_are_untouched(self, admin_client, title, genres):
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.patch(
+                f'/api/v1/titles/{title.pk}/',
+                {'genre': [{'name': 'Комедия', 'slug': 'comedy'},
+                           {'name': 'Драма', 'slug': 'drama'}]},
+                format='json'
+            )
+        assert response.status_code == 200, response.data
+        assert self.statements(context, 'INSERT INTO "reviews_genretitle"') == 0
+        assert self.statements(context, 'DELETE FROM "reviews_genretitle"') == 0
+
+    def test_update_without_genres_keeps_links(self, admin_client, title):
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/', {'year': 2011}, format='json'
+        )
+        assert response.status_code == 200, response.data
+        title.refresh_from_db()
+        assert title.year == 2011
+        assert title.genre.count() == 2
+
+    def test_put_replaces_all_fields(self, admin_client, title, category):
+        response = admin_client.put(
+            f'/api/v1/titles/{title.pk}/',
+            title_data('Переименовано', ['comedy']), format='json'
+        )
+        assert response.status_code == 200, response.data
+        title.refresh_from_db()
+        assert title.name == 'Переименовано'
+        assert list(title.genre.values_list('slug', flat=True)) == ['comedy']
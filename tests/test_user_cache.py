@@ -0,0 +1,144 @@
+from unittest import mock
+
+import pytest
+from api.authentication import (JWTAuthentication, UserCache,
+                                bump_user_version, user_cache)
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+    )
+    return client
+
+
+def user_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, sum(
+        '"reviews_customuser"' in query['sql']
+        for query in context.captured_queries
+    )
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+
+    def test_user_loaded_once(self, user):
+        client = token_client(user)
+        response, first = user_queries(client, '/api/v1/users/me/')
+        assert response.status_code == 200
+        assert first == 1
+        response, second = user_queries(client, '/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.data['username'] == 'user'
+        assert second == 0
+        stats = user_cache.stats()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+        assert stats['hit_rate'] == 0.5
+
+    def test_role_demotion_via_api(self, admin, django_user_model):
+        other_admin = django_user_model.objects.create_user(
+            username='boss', email='boss@yamdb.fake', role='admin'
+        )
+        client = token_client(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+
+        response = token_client(other_admin).patch(
+            '/api/v1/users/admin/', {'role': 'user'}
+        )
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/').status_code == 403
+
+    def test_role_demotion_via_model_save(self, admin):
+        client = token_client(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+        # Так сохраняет пользователя и админка.
+        admin.role = 'user'
+        admin.save()
+        assert client.get('/api/v1/users/').status_code == 403
+
+    def test_role_change_via_queryset_update(self, admin,
+                                             django_user_model):
+        client = token_client(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+        assert client.get('/api/v1/users/').status_code == 200
+        # update() не отправляет сигналов; администратор не кешируется.
+        django_user_model.objects.filter(pk=admin.pk).update(role='user')
+        assert client.get('/api/v1/users/').status_code == 403
+
+        moderator = django_user_model.objects.create_user(
+            username='moder', email='moder@yamdb.fake', role='moderator')
+        client = token_client(moderator)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        django_user_model.objects.filter(pk=moderator.pk).update(
+            is_active=False)
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_change_in_other_worker(self, user):
+        client = token_client(user)
+        user_queries(client, '/api/v1/users/me/')
+        assert user_queries(client, '/api/v1/users/me/')[1] == 0
+        # Сохранение в другом воркере меняет только общую версию.
+        bump_user_version(user.pk)
+        assert user_queries(client, '/api/v1/users/me/')[1] == 1
+        assert user_queries(client, '/api/v1/users/me/')[1] == 0
+
+    def test_deactivated_and_deleted_users(self, user):
+        client = token_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401
+        user.delete()
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_request_user_is_a_copy(self, user):
+        authentication = JWTAuthentication()
+        token = AccessToken.for_user(user)
+        first = authentication.get_user(token)
+        first.role = 'admin'
+        second = authentication.get_user(token)
+        assert second is not first
+        assert second.role == 'user'
+
+
+class TestUserCache:
+
+    def test_lru_eviction(self):
+        cache = UserCache(max_size=2, ttl=60)
+        cache.set(1, 'first')
+        cache.set(2, 'second')
+        assert cache.get(1) == 'first'
+        cache.set(3, 'third')
+        assert cache.get(2) is None
+        assert cache.get(1) == 'first'
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl(self):
+        cache = UserCache(max_size=10, ttl=60)
+        with mock.patch('api.authentication.time.monotonic') as monotonic:
+            monotonic.return_value = 100
+            cache.set(1, 'user')
+            monotonic.return_value = 159
+            assert cache.get(1) == 'user'
+            monotonic.return_value = 161
+            assert cache.get(1) is None
+        assert cache.stats()['size'] == 0
+
+    def test_version_mismatch(self):
+        cache = UserCache(max_size=10, ttl=60)
+        cache.set(1, 'user', version='a')
+        assert cache.get(1, 'a') == 'user'
+        assert cache.get(1, 'b') is None
+        assert cache.get(1) is None
+
+    def test_disabled(self):
+        cache = UserCache(max_size=0, ttl=60)
+        cache.set(1, 'user')
+        assert cache.get(1) is None
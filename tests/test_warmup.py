@@ -0,0 +1,36 @@
+from unittest import mock
+
+import pytest
+from api.warmup import warm_up
+from benchmarks.startup import parse_importtime
+
+
+@pytest.mark.django_db
+def test_warm_up_fills_response_cache(client, category, genres):
+    timings = warm_up()
+    assert set(timings) == {
+        'resolver', 'serializers', 'filtersets', 'connections', 'caches'
+    }
+    response = client.get('/api/v1/categories/')
+    assert response.status_code == 200
+    assert response['X-Cache'] == 'HIT'
+
+
+def test_warm_up_without_database():
+    with mock.patch('api.warmup.connections') as connections:
+        timings = warm_up(database=False)
+    assert set(timings) == {'resolver', 'serializers', 'filtersets'}
+    connections.close_all.assert_called_once_with()
+
+
+def test_parse_importtime():
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       120 |        120 |   _io\n'
+        'import time:      2500 |      10500 | django.db\n'
+        'Traceback or other output\n'
+    )
+    assert parse_importtime(output) == {
+        '_io': (0.00012, 0.00012),
+        'django.db': (0.0025, 0.0105),
+    }